@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import os
 import logging
 import sqlite3
+import time
+import uuid
 
 log = logging.getLogger('custodian.cache')
 
@@ -32,11 +34,14 @@ def factory(config):
             log.debug("Using in-memory cache")
             CACHE_NOTIFY = True
         return InMemoryCache(config)
-    return SqlKvCache(config)
+    return SqlResourceCache(config)
 
 
 class Cache:
 
+    # whether resource sets can be saved as they're streamed, see stream
+    streamable = False
+
     def __init__(self, config):
         self.config = config
 
@@ -46,9 +51,31 @@ class Cache:
     def get(self, key):
         pass
 
-    def save(self, key, data):
+    def get_resources(self, key, ids):
+        """Return a mapping of id to resource for fresh cached ids in a resource set.
+
+        Ids recorded as absent from the resource set map to None.
+
+        Returns None if the cache doesn't support partial lookups, or
+        the resource set isn't cached.
+        """
+        return None
+
+    def save(self, key, data, id_key=None):
         pass
 
+    def update(self, key, resources, id_key, ids=()):
+        """Refresh individual resources within a cached resource set.
+
+        Any of the given ids without a resource are recorded as absent.
+        """
+
+    def stream(self, key, id_key=None):
+        """Return a writer saving a resource set in batches, or None.
+
+        The resource set is saved when the writer is closed.
+        """
+
     def size(self):
         return 0
 
@@ -64,7 +91,8 @@ class Cache:
 
 
 class NullCache(Cache):
-    pass
+
+    streamable = True
 
 
 class InMemoryCache(Cache):
@@ -82,13 +110,33 @@ class InMemoryCache(Cache):
     def get(self, key):
         return self.data.get(encode(key))
 
-    def save(self, key, data):
+    def save(self, key, data, id_key=None):
         self.data[encode(key)] = data
 
     def size(self):
         return sum(map(len, self.data.values()))
 
 
+SHARED_CACHES = {}
+
+
+def shared_factory(config):
+    """Return the process shared cache tier if configured, else None.
+
+    The shared cache is configured with a `shared_cache` path option,
+    instances are reused within a process. As with the resource cache,
+    a zero cache period disables it.
+    """
+    path = config and getattr(config, 'shared_cache', None)
+    cache_period = config and getattr(config, 'cache_period', 0)
+    if not path or not cache_period:
+        return None
+    path = resolve_path(path)
+    if path not in SHARED_CACHES:
+        SHARED_CACHES[path] = SharedCache(path, cache_period)
+    return SHARED_CACHES[path]
+
+
 def encode(key):
     return pickle.dumps(key, protocol=pickle.HIGHEST_PROTOCOL)  # nosemgrep
 
@@ -155,7 +203,7 @@ class SqlKvCache(Cache):
                 return None
             return pickle.loads(value)  # nosec nosemgrep
 
-    def save(self, key, data, timestamp=None):
+    def save(self, key, data, timestamp=None, id_key=None):
         with self.conn as cursor:
             timestamp = timestamp or datetime.utcnow()
             cursor.execute(
@@ -169,3 +217,352 @@ class SqlKvCache(Cache):
         if self.conn:
             self.conn.close()
             self.conn = None
+
+
+class SqlResourceCache(SqlKvCache):
+    """Sqlite cache storing resource sets as one row per resource.
+
+    Resource sets (lists) are stored with a row per resource keyed by the
+    resource set key and the resource id, along with a per row timestamp.
+    This allows for retrieving a subset of resources by id without
+    deserializing the entire set, and for refreshing individual stale
+    resources without refetching the entire set.
+
+    Non list values are stored in the key value table.
+    """
+
+    streamable = True
+
+    create_sets_table = """
+    create table if not exists c7n_resource_sets (
+        key blob primary key,
+        create_date timestamp
+    )
+    """
+
+    create_resources_table = """
+    create table if not exists c7n_resources (
+        set_key blob,
+        rid text,
+        idx integer,
+        value blob,
+        create_date timestamp,
+        primary key (set_key, rid)
+    )
+    """
+
+    create_resources_index = """
+    create index if not exists c7n_resources_rid on c7n_resources (rid)
+    """
+
+    def init(self):
+        super().init()
+        self.conn.execute(self.create_sets_table)
+        self.conn.execute(self.create_resources_table)
+        self.conn.execute(self.create_resources_index)
+        with self.conn as cursor:
+            cutoff = self.get_cutoff()
+            cursor.execute('delete from c7n_resource_sets where create_date < ?', [cutoff])
+            result = cursor.execute('delete from c7n_resources where create_date < ?', [cutoff])
+            if result.rowcount:
+                log.debug('expired %d stale cached resources', result.rowcount)
+
+    def get_cutoff(self):
+        return datetime.utcnow() - timedelta(minutes=self.cache_period)
+
+    def is_fresh(self, create_date):
+        if isinstance(create_date, str):
+            create_date = sqlite3.converters['TIMESTAMP'](create_date.encode('utf8'))
+        return create_date >= self.get_cutoff()
+
+    def has_set(self, ekey):
+        row = self.conn.execute(
+            'select create_date from c7n_resource_sets where key = ?', [ekey]).fetchone()
+        return row is not None and self.is_fresh(row[0])
+
+    def get(self, key):
+        ekey = sqlite3.Binary(encode(key))
+        with self.conn as cursor:
+            if not self.has_set(ekey):
+                return super().get(key)
+            # absent ids are recorded without a value
+            rows = cursor.execute(
+                'select value from c7n_resources where set_key = ? '
+                'and value is not null order by idx', [ekey])
+            return [pickle.loads(value) for value, in rows]  # nosec nosemgrep
+
+    def get_resources(self, key, ids):
+        ekey = sqlite3.Binary(encode(key))
+        results = {}
+        with self.conn as cursor:
+            if not self.has_set(ekey):
+                return None
+            ids = [str(i) for i in ids]
+            # stay well under sqlite's max bound parameters
+            for idx in range(0, len(ids), 500):
+                id_set = ids[idx:idx + 500]
+                rows = cursor.execute(
+                    'select rid, value, create_date from c7n_resources '
+                    'where set_key = ? and rid in (%s) order by idx' % (
+                        ', '.join('?' * len(id_set))),
+                    [ekey, *id_set])
+                for rid, value, create_date in rows:
+                    if self.is_fresh(create_date):
+                        results[rid] = value and pickle.loads(value)  # nosec nosemgrep
+        return results
+
+    def save(self, key, data, timestamp=None, id_key=None):
+        if not isinstance(data, list):
+            return super().save(key, data, timestamp)
+        ekey = sqlite3.Binary(encode(key))
+        timestamp = timestamp or datetime.utcnow()
+        with self.conn as cursor:
+            cursor.execute('delete from c7n_resources where set_key = ?', [ekey])
+            cursor.execute(
+                'replace into c7n_resource_sets (key, create_date) values (?, ?)',
+                (ekey, timestamp))
+            cursor.executemany(
+                'replace into c7n_resources (set_key, rid, idx, value, create_date) '
+                'values (?, ?, ?, ?, ?)',
+                [(ekey, get_resource_id(r, id_key, idx), idx,
+                  sqlite3.Binary(encode(r)), timestamp)
+                 for idx, r in enumerate(data)])
+
+    def update(self, key, resources, id_key, ids=()):
+        ekey = sqlite3.Binary(encode(key))
+        timestamp = datetime.utcnow()
+        with self.conn as cursor:
+            if not self.has_set(ekey):
+                return
+            idx = cursor.execute(
+                'select coalesce(max(idx), -1) from c7n_resources where set_key = ?',
+                [ekey]).fetchone()[0]
+            rows = []
+            for r in resources:
+                rid = get_resource_id(r, id_key)
+                if rid is None:
+                    continue
+                existing = cursor.execute(
+                    'select idx from c7n_resources where set_key = ? and rid = ?',
+                    [ekey, rid]).fetchone()
+                if existing is None:
+                    idx += 1
+                rows.append((
+                    ekey, rid, existing[0] if existing else idx,
+                    sqlite3.Binary(encode(r)), timestamp))
+            found = {row[1] for row in rows}
+            rows.extend(
+                (ekey, str(i), None, None, timestamp) for i in ids if str(i) not in found)
+            cursor.executemany(
+                'replace into c7n_resources (set_key, rid, idx, value, create_date) '
+                'values (?, ?, ?, ?, ?)', rows)
+
+    def stream(self, key, id_key=None):
+        return ResourceSetWriter(self, key, id_key)
+
+
+class ResourceSetWriter:
+    """Save a resource set to a sqlite resource cache a batch at a time.
+
+    The set is only readable once the writer is closed, so an
+    interrupted stream isn't cached as a partial set.
+    """
+
+    def __init__(self, cache, key, id_key=None):
+        self.cache = cache
+        self.ekey = sqlite3.Binary(encode(key))
+        self.id_key = id_key
+        self.idx = 0
+        self.timestamp = datetime.utcnow()
+        with cache.conn as cursor:
+            cursor.execute('delete from c7n_resource_sets where key = ?', [self.ekey])
+            cursor.execute('delete from c7n_resources where set_key = ?', [self.ekey])
+
+    def write(self, resources):
+        rows = []
+        for r in resources:
+            rows.append((
+                self.ekey, get_resource_id(r, self.id_key, self.idx), self.idx,
+                sqlite3.Binary(encode(r)), self.timestamp))
+            self.idx += 1
+        with self.cache.conn as cursor:
+            cursor.executemany(
+                'replace into c7n_resources (set_key, rid, idx, value, create_date) '
+                'values (?, ?, ?, ?, ?)', rows)
+
+    def close(self):
+        with self.cache.conn as cursor:
+            cursor.execute(
+                'replace into c7n_resource_sets (key, create_date) values (?, ?)',
+                (self.ekey, self.timestamp))
+
+
+def get_resource_id(resource, id_key, idx=None):
+    """Row id for a cached resource, positional if the resource has no id."""
+    rid = None
+    if id_key and isinstance(resource, dict):
+        rid = resource.get(id_key)
+    if rid is not None:
+        return str(rid)
+    if idx is not None:
+        return '#%d' % idx
+
+
+class SharedCache:
+    """Cache shared across processes on the same host.
+
+    Backed by sqlite in write ahead log mode, so many readers may proceed
+    concurrently with a writer. Used for account independent data that
+    multiple worker processes would otherwise each fetch, ie. value_from
+    uri contents in c7n-org.
+
+    Supports single flight fetching via :meth:`get_or_fetch`, where a
+    lease row ensures only one process fetches a given key while others
+    wait for its result. Entries expire after the cache period, and the
+    least recently accessed entries are evicted when the cache exceeds
+    its max size.
+    """
+
+    create_tables = (
+        """
+        create table if not exists c7n_shared (
+            key blob primary key,
+            value blob,
+            size integer,
+            create_date real,
+            access_date real
+        )
+        """,
+        """
+        create table if not exists c7n_shared_leases (
+            key blob primary key,
+            owner text,
+            expires real
+        )
+        """
+    )
+
+    # minutes
+    cache_period = 15
+    # seconds a fetching process holds a key before others may take over.
+    lease_period = 120
+    poll_interval = 0.25
+    max_size = 256 * 1024 * 1024
+
+    def __init__(self, path, cache_period=None):
+        self.path = path
+        self.cache_period = cache_period or self.cache_period
+        self.owner = "%s-%s" % (os.getpid(), uuid.uuid4().hex)
+        self.conn = None
+        self.pid = None
+
+    def connect(self):
+        # connections aren't usable across a fork
+        if self.conn is not None and self.pid == os.getpid():
+            return self.conn
+        if not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute('pragma journal_mode=wal')
+        for t in self.create_tables:
+            self.conn.execute(t)
+        self.pid = os.getpid()
+        self.owner = "%s-%s" % (self.pid, uuid.uuid4().hex)
+        return self.conn
+
+    def get(self, key):
+        conn = self.connect()
+        ekey = sqlite3.Binary(encode(key))
+        row = conn.execute(
+            'select value, create_date from c7n_shared where key = ?', [ekey]).fetchone()
+        if row is None:
+            return None
+        value, create_date = row
+        now = time.time()
+        if now - create_date > self.cache_period * 60:
+            return None
+        conn.execute('update c7n_shared set access_date = ? where key = ?', (now, ekey))
+        return pickle.loads(value)  # nosec nosemgrep
+
+    def save(self, key, data):
+        conn = self.connect()
+        value = encode(data)
+        now = time.time()
+        conn.execute(
+            'replace into c7n_shared (key, value, size, create_date, access_date) '
+            'values (?, ?, ?, ?, ?)',
+            (sqlite3.Binary(encode(key)), sqlite3.Binary(value), len(value), now, now))
+        self.evict()
+
+    def evict(self):
+        conn = self.connect()
+        conn.execute('begin immediate')
+        try:
+            conn.execute(
+                'delete from c7n_shared where create_date < ?',
+                [time.time() - self.cache_period * 60])
+            total = conn.execute(
+                'select coalesce(sum(size), 0) from c7n_shared').fetchone()[0]
+            if total > self.max_size:
+                rows = conn.execute(
+                    'select key, size from c7n_shared order by access_date').fetchall()
+                for k, size in rows:
+                    conn.execute('delete from c7n_shared where key = ?', [k])
+                    total -= size
+                    if total <= self.max_size:
+                        break
+            conn.execute('commit')
+        except Exception:
+            conn.execute('rollback')
+            raise
+
+    def acquire(self, key):
+        """Attempt to take the fetch lease on a key."""
+        conn = self.connect()
+        ekey = sqlite3.Binary(encode(key))
+        now = time.time()
+        conn.execute('begin immediate')
+        try:
+            conn.execute(
+                'delete from c7n_shared_leases where key = ? and expires < ?', (ekey, now))
+            result = conn.execute(
+                'insert or ignore into c7n_shared_leases (key, owner, expires) '
+                'values (?, ?, ?)', (ekey, self.owner, now + self.lease_period))
+            conn.execute('commit')
+        except Exception:
+            conn.execute('rollback')
+            raise
+        return result.rowcount == 1
+
+    def release(self, key):
+        self.connect().execute(
+            'delete from c7n_shared_leases where key = ? and owner = ?',
+            (sqlite3.Binary(encode(key)), self.owner))
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch at most once across processes.
+
+        If another process holds the lease on the key, wait for it to
+        save a value. If the lease holder fails or its lease expires,
+        a waiting process takes over the fetch.
+        """
+        value = self.get(key)
+        while value is None:
+            if self.acquire(key):
+                try:
+                    value = self.get(key)
+                    if value is None:
+                        value = fetch()
+                        self.save(key, value)
+                finally:
+                    self.release(key)
+                break
+            time.sleep(self.poll_interval)
+            value = self.get(key)
+        return value
+
+    def close(self):
+        if self.conn is not None and self.pid == os.getpid():
+            self.conn.close()
+        self.conn = None
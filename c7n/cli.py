@@ -24,6 +24,7 @@ except ImportError:
 
 from c7n import deprecated
 from c7n.config import Config
+from c7n.output import RESOURCE_FORMATS
 
 DEFAULT_REGION = 'us-east-1'
 
@@ -231,6 +232,21 @@ def setup_parser():
         "--skip-validation",
         action="store_true",
         help="Skips validation of policies (assumes you've run the validate command seperately).")
+    run.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Fetch resources shared by multiple policies once, before executing policies.")
+    run.add_argument(
+        "--parallel", type=int, default=0, metavar="N",
+        help="Execute policies concurrently with N workers, bounded per region and service.")
+    run.add_argument(
+        "--columnar",
+        action="store_true",
+        help="Evaluate value and age filters over column arrays, requires numpy.")
+    run.add_argument(
+        "--resource-format", default="json", choices=RESOURCE_FORMATS,
+        help="Format of policy resource outputs, json lines formats are compressed "
+             "as they're written, jsonl.zst requires zstandard.")
 
     metrics_help = ("Emit metrics to provider metrics. Specify 'aws', 'gcp', or 'azure'. "
             "For more details on aws metrics options, see: "
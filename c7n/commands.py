@@ -15,12 +15,15 @@ import yaml
 from yaml.constructor import ConstructorError
 
 from c7n import deprecated
+from c7n.credentials import client_pool
 from c7n.exceptions import ClientError, PolicyValidationError
 from c7n.loader import SourceLocator
+from c7n.output import blob_uploads, zstandard
 from c7n.provider import clouds
 from c7n.policy import Policy, PolicyCollection, load as policy_load
 from c7n.schema import ElementSchema, StructureParser, generate
-from c7n.utils import load_file, local_session, SafeLoader, yaml_dump
+from c7n.utils import (
+    load_file, local_session, reset_run_caches, SafeLoader, yaml_dump)
 from c7n.config import Bag, Config
 from c7n.resources import (
     load_resources, load_available, load_providers, PROVIDER_NAMES)
@@ -196,6 +199,7 @@ def validate(options):
 
     used_policy_names = set()
     structure = StructureParser()
+    schema_cache = schema.SchemaCache.from_env()
     all_errors = {}
     found_deprecations = False
     footnotes = deprecated.Footnotes()
@@ -212,8 +216,9 @@ def validate(options):
 
         with open(config_file) as fh:
             if fmt in ('yml', 'yaml', 'json'):
+                content = fh.read()
                 # our loader is safe loader derived.
-                data = yaml.load(fh.read(), Loader=DuplicateKeyCheckLoader)  # nosec nosemgrep
+                data = yaml.load(content, Loader=DuplicateKeyCheckLoader)  # nosec nosemgrep
             else:
                 log.error("The config file must end in .json, .yml or .yaml.")
                 raise ValueError("The config file must end in .json, .yml or .yaml.")
@@ -226,9 +231,13 @@ def validate(options):
             all_errors[config_file] = e
             continue
 
-        load_resources(structure.get_resource_types(data))
-        schm = schema.generate()
-        errors += schema.validate(data, schm)
+        rtypes = structure.get_resource_types(data)
+        load_resources(rtypes, structure.get_element_types(data))
+        # unchanged files that previously validated cleanly are skipped
+        cached = schema_cache and schema_cache.is_valid('policy-file', rtypes, content)
+        if not cached:
+            schm = schema_cache and schema_cache.get_schema(rtypes) or schema.generate()
+            errors += schema.validate(data, schm)
         conf_policy_names = {
             p.get('name', 'unknown') for p in data.get('policies', ())}
         dupes = conf_policy_names.intersection(used_policy_names)
@@ -246,7 +255,8 @@ def validate(options):
             # line. At this stage we are only attempting to find line number for
             # policies in yaml files.
             source_locator = SourceLocator(config_file)
-        if not errors:
+        deprecations = False
+        if not errors and not cached:
             null_config = Config.empty(dryrun=True, account_id='na', region='na')
             for p in data.get('policies', ()):
                 try:
@@ -258,7 +268,7 @@ def validate(options):
                     if options.check_deprecations != deprecated.SKIP:
                         report = deprecated.report(policy)
                         if report:
-                            found_deprecations = True
+                            found_deprecations = deprecations = True
                             log.warning("deprecated usage found in policy\n" +
                                         report.format(
                                             source_locator=source_locator,
@@ -269,6 +279,9 @@ def validate(options):
                         p.get('name', 'unknown'), e)
                     errors.append(msg)
         if not errors:
+            if schema_cache and not cached and not deprecations and (
+                    options.check_deprecations != deprecated.SKIP):
+                schema_cache.set_valid('policy-file', rtypes, content)
             log.info("Configuration valid: {}".format(config_file))
             continue
 
@@ -302,21 +315,51 @@ def run(options, policies: List[Policy]) -> None:
             log.exception("Unable to assume role %s", options.assume_role)
             sys.exit(1)
 
+    if getattr(options, 'resource_format', 'json') == 'jsonl.zst' and zstandard is None:
+        log.error("The jsonl.zst resource format requires the zstandard package")
+        sys.exit(1)
+
+    reset_run_caches()
+
+    if getattr(options, 'prefetch', False):
+        from c7n.planner import FetchPlanner
+        FetchPlanner(policies).execute()
+
     errored_policies: List[str] = []
-    for policy in policies:
-        try:
-            policy()
-        except Exception:
+    if getattr(options, 'parallel', 0) > 1:
+        from c7n.scheduler import PolicyScheduler
+        # with debug, stop on the first error as serial execution does.
+        errors = PolicyScheduler(
+            policies, options.parallel, fail_fast=options.debug).run(lambda p: p())
+        if errors:
             exit_code = 2
-            errored_policies.append(policy.name)
+            errored_policies.extend(p.name for p, e in errors)
             if options.debug:
-                raise
-            log.exception(
-                "Error while executing policy %s, continuing" % (
-                    policy.name))
+                raise errors[0][1]
+    else:
+        for policy in policies:
+            try:
+                policy()
+            except Exception:
+                exit_code = 2
+                errored_policies.append(policy.name)
+                if options.debug:
+                    raise
+                log.exception(
+                    "Error while executing policy %s, continuing" % (
+                        policy.name))
+    upload_errors = blob_uploads.flush()
+    if upload_errors:
+        log.error("%d output file uploads failed", upload_errors)
+        exit_code = 2
+    log.debug(
+        "api clients created:%d reused:%d creation time:%0.2fs",
+        client_pool.stats['created'], client_pool.stats['reused'],
+        client_pool.stats['create_time'])
     if exit_code != 0:
-        log.error("The following policies had errors while executing\n - %s" % (
-            "\n - ".join(errored_policies)))
+        if errored_policies:
+            log.error("The following policies had errors while executing\n - %s" % (
+                "\n - ".join(errored_policies)))
         sys.exit(exit_code)
 
 
@@ -407,15 +450,18 @@ def schema_cmd(options):
     if components[0] in PROVIDER_NAMES:
         cloud_provider = components.pop(0)
         components[0] = '%s.%s' % (cloud_provider, components[0])
-        load_resources((components[0],))
+        # generic filters and actions are only imported on reference,
+        # the schema describes all of them.
+        load_resources((components[0],), ('*',))
         resource_mapping = schema.resource_vocabulary(
             cloud_provider, aliases=True)
     elif components[0] == 'mode':
-        load_available(resources=False)
+        for p in load_available(resources=False):
+            clouds[p].load_extensions(('*',))
         resource_mapping = schema.resource_vocabulary()
     else:  # compatibility, aws is default for provider
         components[0] = 'aws.%s' % components[0]
-        load_resources((components[0],))
+        load_resources((components[0],), ('*',))
         resource_mapping = schema.resource_vocabulary('aws', aliases=True)
 
     #
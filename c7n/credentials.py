@@ -3,16 +3,21 @@
 """
 Authentication utilities
 """
+from collections import Counter
+from functools import partial
 import threading
+import time
 import os
+import weakref
 
+from botocore.config import Config
 from botocore.credentials import RefreshableCredentials
 from botocore.session import get_session
 from boto3 import Session
 import json
 
 from c7n.version import version
-from c7n.utils import get_retry
+from c7n.utils import get_retry, rate_controller
 
 
 # we still have some issues (see #5023) to work through to switch to
@@ -21,45 +26,120 @@ USE_STS_REGIONAL = os.environ.get(
     'C7N_USE_STS_REGIONAL', '').lower() in ('yes', 'true')
 
 
-class CustodianSession(Session):
+# connections per pooled client, shared by the threads using it.
+MAX_POOL_CONNECTIONS = int(os.environ.get('C7N_MAX_POOL_CONNECTIONS', 25))
 
-    # track clients and return extant ones if present
-    _clients = {}
-    lock = threading.Lock()
 
-    def client(self, service_name, region_name=None, *args, **kw):
-        if kw.get('config'):
-            return super().client(service_name, region_name, *args, **kw)
+class ClientScope:
+    """Sessions with the same event handler subscribers and user agent.
 
-        key = self._cache_key(service_name, region_name)
-        client = self._clients.get(key)
-        if client is not None:
-            return client
+    Clients copy their session's event handlers (ie. api stats) and user
+    agent when created, so they can only be shared by sessions in the same
+    scope. A session factory's sessions, including the thread local ones of
+    executor threads, share a scope until the factory is updated for
+    another policy.
+    """
+
+    def __init__(self, subscribers=(), policy_name=""):
+        self.subscribers = tuple(subscribers)
+        self.policy_name = policy_name
+
+    def matches(self, subscribers, policy_name):
+        return self.subscribers == tuple(subscribers) and self.policy_name == policy_name
+
+
+class ClientPool:
+    """Process wide pool of api clients, shared across sessions and threads.
+
+    botocore clients are thread safe, so rather than constructing a new
+    client on each call, with the service model loading and http
+    connection pool that entails, a client is created once per session
+    scope, credentials, service, region and endpoint.
+
+    Scopes are weakly referenced, so a scope's clients are dropped with
+    the last session and factory using it.
+
+    Pooled clients are sized for concurrent use and keep their
+    connections alive, so established tls connections are reused
+    across threads and calls.
+    """
+
+    def __init__(self, max_pool_connections=MAX_POOL_CONNECTIONS):
+        self.max_pool_connections = max_pool_connections
+        self.lock = threading.Lock()
+        self.clients = weakref.WeakKeyDictionary()
+        self.stats = Counter()
 
+    def get_config(self):
+        return Config(
+            max_pool_connections=self.max_pool_connections, tcp_keepalive=True)
+
+    def get(self, scope, key, create):
         with self.lock:
-            client = self._clients.get(key)
+            client = self.clients.get(scope, {}).get(key)
             if client is not None:
+                self.stats['reused'] += 1
                 return client
-
-            client = super().client(service_name, region_name, *args, **kw)
-            self._clients[key] = client
+        # clients are created outside of the lock, as that loads service
+        # models, and published under it.
+        t = time.time()
+        client = create(config=self.get_config())
+        with self.lock:
+            self.stats['create_time'] += time.time() - t
+            clients = self.clients.setdefault(scope, {})
+            if key in clients:
+                # another thread created the client first
+                self.stats['reused'] += 1
+                client.close()
+                return clients[key]
+            self.stats['created'] += 1
+            clients[key] = client
             return client
 
-    def _cache_key(self, service_name, region_name):
-        region_name = region_name or self.region_name
+    def close(self):
+        with self.lock:
+            for clients in self.clients.values():
+                for c in clients.values():
+                    c.close()
+            self.clients = weakref.WeakKeyDictionary()
+            self.stats.clear()
+
+
+client_pool = ClientPool()
+
+
+class CustodianSession(Session):
+
+    # set by session factories, sessions without one are their own scope.
+    client_scope = None
+
+    def client(self, service_name, region_name=None, *args, **kw):
+        # clients with their own configuration aren't pooled
+        if args or set(kw).difference(('endpoint_url',)):
+            return self._create_client(service_name, region_name, *args, **kw)
+        return client_pool.get(
+            self.client_scope or self,
+            self._cache_key(service_name, region_name, kw.get('endpoint_url')),
+            partial(self._create_client, service_name, region_name, **kw))
+
+    def _create_client(self, service_name, region_name=None, *args, **kw):
+        client = super().client(service_name, region_name, *args, **kw)
+        # api rate limits are per credentials
+        rate_controller.register(client, self._get_access_key())
+        return client
+
+    def _get_access_key(self):
+        credentials = self.get_credentials()
+        return credentials and credentials.access_key
+
+    def _cache_key(self, service_name, region_name, endpoint_url=None):
         return (
-            # namedtuple so stable comparison
-            hash(self.get_credentials().get_frozen_credentials()),
-            service_name,
-            region_name
-        )
+            self._get_access_key(), service_name,
+            region_name or self.region_name, endpoint_url)
 
     @classmethod
     def close(cls):
-        with cls.lock:
-            for c in cls._clients.values():
-                c.close()
-            cls._clients = {}
+        client_pool.close()
 
 
 class SessionFactory:
@@ -77,6 +157,7 @@ class SessionFactory:
                 self.session_name, os.environ['C7N_SESSION_SUFFIX'])
         self._subscribers = []
         self._policy_name = ""
+        self._client_scope = ClientScope()
 
     def _set_policy_name(self, name):
         self._policy_name = name
@@ -85,12 +166,12 @@ class SessionFactory:
 
     def __call__(self, assume=True, region=None):
         if self.assume_role and assume:
-            session = Session(profile_name=self.profile)
+            session = CustodianSession(profile_name=self.profile)
             session = assumed_session(
                 self.assume_role, self.session_name, self.session_policy, session,
                 region or self.region, self.external_id)
         else:
-            session = Session(
+            session = CustodianSession(
                 region_name=region or self.region, profile_name=self.profile)
 
         return self.update(session)
@@ -104,6 +185,10 @@ class SessionFactory:
         for s in self._subscribers:
             s(session)
 
+        # extant clients don't see the updated user agent or subscriber handlers
+        if not self._client_scope.matches(self._subscribers, self._policy_name):
+            self._client_scope = ClientScope(self._subscribers, self._policy_name)
+        session.client_scope = self._client_scope
         return session
 
     def set_subscribers(self, subscribers):
@@ -166,7 +251,7 @@ def assumed_session(
     if region is None:
         region = s.get_config_variable('region') or 'us-east-1'
     s.set_config_variable('region', region)
-    return Session(botocore_session=s)
+    return CustodianSession(botocore_session=s)
 
 
 def get_sts_client(session, region):
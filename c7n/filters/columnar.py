@@ -0,0 +1,294 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Columnar filter evaluation.
+
+An opt in (``custodian run --columnar``) evaluation mode for compiled
+filter plans over large resource sets. The keys referenced by top
+level value and age filters are projected into typed numpy arrays,
+and comparisons, membership tests, and age and date math are evaluated
+over the whole column at once. Iso 8601 date strings are parsed by
+numpy rather than per resource with dateutil.
+
+Values that don't fit a column's type (missing values, non utc date
+strings, mixed types) are evaluated per resource through the compiled
+filter, as are boolean blocks and filters with configurations that
+aren't vectorized.
+"""
+import datetime
+from datetime import timedelta
+import re
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from c7n.filters.compiler import (
+    SENTINELS, AgeNode, CompiledStep, ValueNode, annotate, compile_key)
+from c7n.filters.core import OPERATORS, AgeFilter
+from c7n.utils import parse_date
+
+# below this many resources, building columns costs more than it saves.
+MIN_RESOURCES = 1000
+
+COMPARISONS = {
+    'eq', 'equal', 'ne', 'not-equal', 'gt', 'greater-than', 'ge', 'gte',
+    'le', 'lte', 'lt', 'less-than'}
+MEMBERSHIP = {'in': False, 'ni': True, 'not-in': True}
+
+# date strings numpy parses, with an optional utc designator.
+ISO_DATE = re.compile(
+    r'(\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)(Z|[+-]00:?00)?')
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# numbers a float64 column represents exactly
+MAX_EXACT = 2 ** 53
+
+
+class ColumnarStep(CompiledStep):
+    """A compiled step evaluated over column arrays."""
+
+    def __init__(self, nodes):
+        super().__init__(nodes)
+        self.vectors = [vectorize(n) for n in self.nodes]
+
+    def process(self, resources, event=None):
+        now = datetime.datetime.now(tz=EPOCH.tzinfo)
+        for node, vector in zip(self.nodes, self.vectors):
+            if not resources:
+                break
+            pred = node.bind(now)
+            if vector is None or len(resources) < MIN_RESOURCES:
+                resources = list(filter(pred, resources))
+            else:
+                resources = vector.process(resources, pred, now)
+        return resources
+
+
+def vectorize(node):
+    """Get a vectorized evaluation for a compiled node, None if not supported."""
+    if isinstance(node, AgeNode):
+        f = node.filter
+        if type(f).get_resource_date is not AgeFilter.get_resource_date:
+            return None
+        op = f.data.get('op', 'greater-than')
+        if op not in COMPARISONS:
+            return None
+        return AgeVector(f, op)
+    elif isinstance(node, ValueNode):
+        return ValueVector.compile(node)
+
+
+class Vector:
+    """Evaluate a filter for a column of resource values.
+
+    Subclasses define the column's type through ``project`` which returns
+    a resource value's column entry, or None to evaluate the resource
+    through the compiled filter, and ``compare``.
+    """
+
+    kind = None
+    annotate_key = None
+
+    def process(self, resources, pred, now):
+        rows = []
+        entries = []
+        matched = [False] * len(resources)
+        for idx, r in enumerate(resources):
+            if r is None:
+                continue
+            entry = self.project(r)
+            if entry is None:
+                matched[idx] = pred(r)
+            else:
+                rows.append(idx)
+                entries.append(entry)
+
+        column = None
+        if rows:
+            column = self.column(entries)
+        if column is None:
+            for idx in rows:
+                matched[idx] = pred(resources[idx])
+        else:
+            for idx in np.flatnonzero(self.compare(column, now)):
+                idx = rows[idx]
+                matched[idx] = True
+                if self.annotate_key is not None:
+                    annotate(resources[idx], self.annotate_key)
+        return [r for r, m in zip(resources, matched) if m]
+
+    def column(self, entries):
+        """Get a column array for entries, None if they can't be converted."""
+        if self.kind == 'date':
+            return date_column(entries)
+        elif self.kind == 'number':
+            return np.array(entries, dtype=np.float64)
+        return np.array(entries, dtype=np.str_)
+
+
+class AgeVector(Vector):
+
+    kind = 'date'
+
+    def __init__(self, f, op):
+        self.filter = f
+        self.op = OPERATORS[op]
+
+    def project(self, r):
+        # naive dates are utc for age filters
+        return project_date(r[self.filter.date_attribute], naive_utc=True)
+
+    def compare(self, column, now):
+        f = self.filter
+        if not f.threshold_date:
+            # see AgeFilter.__call__, resource dates are always tz aware.
+            f.threshold_date = now - timedelta(
+                days=f.data.get('days', 0),
+                hours=f.data.get('hours', 0),
+                minutes=f.data.get('minutes', 0))
+        return self.op(np.int64(to_micros(f.threshold_date)), column)
+
+
+class ValueVector(Vector):
+
+    def __init__(self, get, kind, vtype, op_name, value):
+        self.get = get
+        self.kind = kind
+        self.vtype = vtype
+        self.op_name = op_name
+        self.value = value
+
+    @classmethod
+    def compile(cls, node):
+        data = node.data
+        if len(data) == 1:
+            [(k, v)] = data.items()
+            op_name, vtype = 'eq', None
+        elif 'value_path' in data or 'value_regex' in data:
+            return None
+        else:
+            k = data.get('key')
+            op_name = data.get('op', 'eq')
+            vtype = data.get('value_type')
+            v = node.get_value()
+        if not isinstance(k, str):
+            return None
+        if isinstance(v, str) and v in SENTINELS:
+            return None
+
+        if op_name in MEMBERSHIP:
+            if not isinstance(v, (list, tuple, set, frozenset)) or not v:
+                return None
+            kinds = {value_kind(i) for i in v}
+            if len(kinds) != 1 or None in kinds or vtype is not None:
+                return None
+            kind = kinds.pop()
+            v = list(v)
+        elif op_name not in COMPARISONS:
+            return None
+        elif vtype in ('age', 'expiration'):
+            if isinstance(v, datetime.datetime):
+                if v.tzinfo is None:
+                    return None
+            elif value_kind(v) != 'number':
+                return None
+            kind = 'date'
+        elif vtype == 'date':
+            v = parse_date(v)
+            if v is None:
+                return None
+            kind = 'date'
+        elif vtype in (None, 'integer', 'float'):
+            kind = value_kind(v)
+            if kind is None or (vtype and kind != 'number'):
+                return None
+        else:
+            return None
+
+        vector = cls(compile_key(k), kind, vtype, op_name, v)
+        if node.filter.annotate:
+            vector.annotate_key = k
+        return vector
+
+    def project(self, r):
+        v = self.get(r)
+        if self.kind == 'date':
+            # naive dates are local time for value filters, see parse_date
+            return project_date(v, naive_utc=False)
+        elif self.kind == 'string':
+            if type(v) is str:
+                return v
+        # int(str(v)) for integer and float value types is v
+        elif type(v) is int and abs(v) <= MAX_EXACT:
+            return v
+        elif type(v) is float and self.vtype != 'integer':
+            return v
+        return None
+
+    def compare(self, column, now):
+        if self.op_name in MEMBERSHIP:
+            return np.isin(column, self.value, invert=MEMBERSHIP[self.op_name])
+
+        op = OPERATORS[self.op_name]
+        if self.kind != 'date':
+            return op(column, self.value)
+
+        # see ValueFilter.process_value_type for the order of comparisons
+        if self.vtype == 'date':
+            return op(column, np.int64(to_micros(self.value)))
+        sentinel = self.value
+        if self.vtype == 'age':
+            if not isinstance(sentinel, datetime.datetime):
+                sentinel = now - timedelta(sentinel)
+            return op(np.int64(to_micros(sentinel)), column)
+        if not isinstance(sentinel, datetime.datetime):
+            sentinel = now + timedelta(sentinel)
+        return op(column, np.int64(to_micros(sentinel)))
+
+
+def value_kind(v):
+    if (type(v) is int and abs(v) <= MAX_EXACT) or type(v) is float:
+        return 'number'
+    elif type(v) is str:
+        return 'string'
+
+
+def project_date(v, naive_utc):
+    """Get a date's column entry, microseconds since the epoch or an iso
+    8601 string for numpy to parse.
+    """
+    if isinstance(v, datetime.datetime):
+        if v.tzinfo is None:
+            if not naive_utc:
+                return None
+            v = v.replace(tzinfo=EPOCH.tzinfo)
+        return to_micros(v)
+    elif not isinstance(v, str):
+        return None
+    m = ISO_DATE.fullmatch(v)
+    if m is None or (m.group(2) is None and not naive_utc):
+        return None
+    return m.group(1)
+
+
+def date_column(entries):
+    column = np.empty(len(entries), dtype=np.int64)
+    strings = [idx for idx, e in enumerate(entries) if type(e) is str]
+    if len(strings) != len(entries):
+        column[:] = [0 if type(e) is str else e for e in entries]
+    if strings:
+        try:
+            parsed = np.array([entries[idx] for idx in strings], dtype='datetime64[us]')
+        except ValueError:
+            # out of range fields, eg. a month of 13
+            return None
+        column[strings] = parsed.astype(np.int64)
+    return column
+
+
+def to_micros(dt):
+    return (dt - EPOCH) // MICROSECOND
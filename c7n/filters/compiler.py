@@ -0,0 +1,489 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Compiled filter plans.
+
+The interpreted filter path re-derives a value filter's configuration
+(operator, value type, sentinel parsing, key expression) for every
+resource it evaluates. At policy validation we lower a policy's filter
+tree into specialized closures instead, with operators, value types,
+parsed dates, cidrs and versions, and simple dotted keys resolved once.
+
+Only value filters and boolean blocks of them are compiled, any other
+filter is processed as is, so a plan is a sequence of compiled steps
+interleaved with the original filters. Compiled steps evaluate each
+resource through the whole (sub)tree in turn, block annotation
+semantics match the interpreted And/Or/Not handling.
+"""
+import datetime
+from datetime import timedelta
+import ipaddress
+import re
+
+from dateutil.tz import tzutc
+
+from c7n.filters.core import (
+    ANNOTATION_KEY, OPERATORS, AgeFilter, And, ComparableVersion, Filter, Not, Or,
+    ValueFilter)
+from c7n.resolver import ValuesFrom
+from c7n.utils import (
+    compile_path, dumps, get_tag_value, parse_cidr, parse_date, parse_path)
+
+SENTINELS = ('absent', 'present', 'not-null', 'empty')
+
+ISO_DATE = re.compile(
+    r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d{1,6})?)?)?(Z|[+-]\d{2}:?\d{2})?$')
+UTC = tzutc()
+
+
+def compile_filters(filters, columnar=False):
+    """Compile a list of filters into a plan, None if nothing compiles.
+
+    With columnar, runs of compiled filters are evaluated over column
+    arrays where numpy is available, see :mod:`c7n.filters.columnar`.
+    """
+    step_class = CompiledStep
+    if columnar:
+        from c7n.filters.columnar import ColumnarStep, np
+        if np is not None:
+            step_class = ColumnarStep
+    steps = []
+    nodes = []
+    for f in filters:
+        node = compile_node(f)
+        if node is not None:
+            nodes.append(node)
+            continue
+        if nodes:
+            steps.append(step_class(nodes))
+            nodes = []
+        steps.append(f)
+    if nodes:
+        steps.append(step_class(nodes))
+    if not any(isinstance(s, CompiledStep) for s in steps):
+        return None
+    return FilterPlan(filters, steps)
+
+
+def compile_node(f):
+    if type(f) is ValueFilter:
+        if f.data.get('value_type') == 'resource_count':
+            return None
+        return ValueNode(f)
+    if isinstance(f, AgeFilter):
+        return AgeNode.compile(f)
+    if type(f) not in (And, Or, Not) or not f.manager:
+        return None
+    children = [compile_node(cf) for cf in f.filters]
+    if None in children:
+        return None
+    return {And: AndNode, Or: OrNode, Not: NotNode}[type(f)](children)
+
+
+class FilterPlan:
+    """A policy's filters lowered into compiled steps and uncompiled filters."""
+
+    def __init__(self, filters, steps):
+        self.filters = list(filters)
+        self.steps = steps
+
+    def is_current(self, filters):
+        # runtime filters may be trimmed from the policy after validation.
+        return self.filters == filters
+
+
+class CompiledStep:
+    """A run of top level filters evaluated as a single predicate."""
+
+    type = 'compiled'
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    @property
+    def data(self):
+        return [n.data for n in self.nodes]
+
+    def __repr__(self):
+        return "<CompiledStep %s>" % dumps(self.data, indent=None)
+
+    def process(self, resources, event=None):
+        now = datetime.datetime.now(tz=UTC)
+        preds = [n.bind(now) for n in self.nodes]
+        if len(preds) == 1:
+            return list(filter(preds[0], resources))
+        return [r for r in resources if all(p(r) for p in preds)]
+
+
+# Compiled blocks only contain value filters, whose only side effect is
+# appending to the matched filters annotation, so restoring a resource's
+# annotations on a block mismatch (see AnnotationSweeper) only needs to
+# truncate that annotation.
+
+def snapshot(r):
+    if ANNOTATION_KEY not in r:
+        return None
+    v = r[ANNOTATION_KEY]
+    return len(v) if isinstance(v, list) else -1
+
+
+def restore(r, mark):
+    if mark is None:
+        r.pop(ANNOTATION_KEY, None)
+    elif mark >= 0:
+        del r[ANNOTATION_KEY][mark:]
+
+
+def annotate(r, k):
+    if ANNOTATION_KEY not in r:
+        r[ANNOTATION_KEY] = [k]
+    elif isinstance(r[ANNOTATION_KEY], list):
+        r[ANNOTATION_KEY].append(k)
+
+
+class AndNode:
+
+    def __init__(self, children):
+        self.children = children
+
+    @property
+    def data(self):
+        return {'and': [c.data for c in self.children]}
+
+    def bind(self, now):
+        preds = [c.bind(now) for c in self.children]
+
+        def match(r):
+            mark = snapshot(r)
+            for p in preds:
+                if not p(r):
+                    restore(r, mark)
+                    return False
+            return True
+        return match
+
+
+class OrNode(AndNode):
+
+    @property
+    def data(self):
+        return {'or': [c.data for c in self.children]}
+
+    def bind(self, now):
+        preds = [c.bind(now) for c in self.children]
+
+        def match(r):
+            # no short circuit, every matching child annotates.
+            matched = False
+            for p in preds:
+                if p(r):
+                    matched = True
+            return matched
+        return match
+
+
+class NotNode(AndNode):
+
+    @property
+    def data(self):
+        return {'not': [c.data for c in self.children]}
+
+    def bind(self, now):
+        preds = [c.bind(now) for c in self.children]
+
+        def match(r):
+            mark = snapshot(r)
+            matched = True
+            for p in preds:
+                if not p(r):
+                    matched = False
+                    break
+            restore(r, mark)
+            return not matched
+        return match
+
+
+class AgeNode:
+    """An age filter, evaluated as is."""
+
+    def __init__(self, f):
+        self.filter = f
+        self.data = f.data
+
+    @classmethod
+    def compile(cls, f):
+        # subclasses only configure the date attribute, any that change
+        # how it's evaluated aren't compiled.
+        klass = type(f)
+        if (klass.__call__ is not AgeFilter.__call__ or
+                klass.process is not Filter.process or not f.date_attribute):
+            return None
+        return cls(f)
+
+    def bind(self, now):
+        return self.filter
+
+
+def compile_key(k, regex=None):
+    """Compile a value filter key into a resource value accessor."""
+    if k.startswith('tag:'):
+        tk = k.split(':', 1)[1]
+
+        def get(i):
+            return get_tag_value(i, tk)
+    elif parse_path(k) == [k]:
+        def get(i):
+            return i.get(k)
+    else:
+        expr = compile_path(k)
+
+        def get(i):
+            if k in i:
+                return i[k]
+            return expr.search(i)
+
+    if not regex:
+        return get
+
+    pattern = re.compile(regex)
+
+    def get_regex(i):
+        r = get(i)
+        if r is None:
+            return r
+        try:
+            capture = pattern.match(r)
+        except (ValueError, TypeError):
+            return None
+        if capture is None:
+            return None
+        return capture.group(1)
+    return get_regex
+
+
+def compile_op(name, v):
+    """Specialize an operator for a fixed comparison value."""
+    op = OPERATORS[name]
+    if name in ('regex', 'regex-case') and isinstance(v, str):
+        pattern = re.compile(v, name == 'regex' and re.IGNORECASE or 0)
+
+        def op(r, v):
+            if not isinstance(r, str):
+                return False
+            return bool(pattern.match(r))
+    elif name in ('in', 'ni', 'not-in') and isinstance(v, (list, tuple, set, frozenset)):
+        try:
+            members = frozenset(v)
+        except TypeError:
+            return op
+        negate = name != 'in'
+
+        def op(r, v):
+            try:
+                found = r in members
+            except TypeError:
+                found = r in v
+            return found is not negate
+    return op
+
+
+class ValueNode:
+    """A value filter specialized to its configuration."""
+
+    def __init__(self, f):
+        self.filter = f
+        self.data = f.data
+        self.resolved = False
+        self.value = None
+
+    def get_value(self):
+        # value_from is resolved at first use, as with the interpreted filter.
+        if not self.resolved:
+            if 'value_from' in self.data:
+                self.value = ValuesFrom(
+                    self.data['value_from'], self.filter.manager).get_values()
+            else:
+                self.value = self.data.get('value')
+            self.resolved = True
+        return self.value
+
+    def bind(self, now):
+        data = self.data
+        if len(data) == 1:
+            [(k, v)] = data.items()
+            op_name = vtype = regex = None
+        else:
+            # per resource value paths, and malformed filters (missing key)
+            # are left to the filter itself.
+            if 'value_path' in data or not isinstance(data.get('key'), str):
+                return self.filter
+            k = data['key']
+            op_name = data.get('op')
+            vtype = data.get('value_type')
+            regex = data.get('value_regex')
+            v = self.get_value()
+        try:
+            match = self.compile_match(k, v, op_name, vtype, regex, now)
+        except Exception:
+            return self.filter
+        if not self.filter.annotate:
+            return lambda i: i is not None and bool(match(i))
+
+        def predicate(i):
+            if i is None:
+                return False
+            if match(i):
+                annotate(i, k)
+                return True
+            return False
+        return predicate
+
+    def compile_match(self, k, v, op_name, vtype, regex, now):
+        get = compile_key(k, regex)
+        if op_name in ('in', 'not-in'):
+            get = wrap(get, lambda r: () if r is None else r)
+
+        if vtype is None:
+            return self.compile_static_compare(get, v, op_name)
+        elif vtype in VALUE_CONVERSIONS:
+            # conversions that leave the sentinel unchanged wrap the accessor
+            return self.compile_static_compare(
+                wrap(get, VALUE_CONVERSIONS[vtype]), v, op_name)
+
+        convert = self.compile_value_type(v, vtype, regex, now)
+        op = op_name and OPERATORS[op_name] or None
+
+        def match(i):
+            sv, r = convert(get(i), i)
+            return compare(sv, r, op)
+        return match
+
+    def compile_static_compare(self, get, v, op_name):
+        if isinstance(v, str) and v in SENTINELS:
+            op = op_name and OPERATORS[op_name] or None
+            return lambda i: compare(v, get(i), op)
+
+        if op_name:
+            op = compile_op(op_name, v)
+
+            def match(i):
+                try:
+                    return op(get(i), v)
+                except TypeError:
+                    return False
+            return match
+        return lambda i: get(i) == v
+
+    def compile_value_type(self, sentinel, vtype, regex, now):
+        """Return a (resource value, resource) -> (sentinel, value) conversion."""
+        if vtype == 'expr':
+            get_sentinel = compile_key(sentinel, regex)
+            return lambda r, i: (get_sentinel(i), r)
+        elif vtype == 'swap':
+            return lambda r, i: (r, sentinel)
+        elif vtype == 'date':
+            parsed = parse_date(sentinel)
+            return lambda r, i: (parsed, parse_resource_date(r))
+        elif vtype == 'age':
+            threshold = sentinel
+            if not isinstance(sentinel, datetime.datetime):
+                threshold = now - timedelta(sentinel)
+            # age comparisons are reversed, see ValueFilter.process_value_type
+            return lambda r, i: (parse_resource_date(r) or 0, threshold)
+        elif vtype == 'expiration':
+            threshold = sentinel
+            if not isinstance(sentinel, datetime.datetime):
+                threshold = now + timedelta(sentinel)
+            return lambda r, i: (threshold, parse_resource_date(r) or 0)
+        elif vtype == 'cidr':
+            parsed = parse_cidr(sentinel)
+
+            def convert(r, i):
+                v = parse_cidr(r)
+                if (isinstance(parsed, ipaddress._BaseAddress) and
+                        isinstance(v, ipaddress._BaseNetwork)):
+                    return v, parsed
+                return parsed, v
+            return convert
+        elif vtype == 'version':
+            parsed = ComparableVersion(sentinel)
+            return lambda r, i: (parsed, ComparableVersion(r))
+        return lambda r, i: (sentinel, r)
+
+
+def wrap(get, convert):
+    return lambda i: convert(get(i))
+
+
+def parse_resource_date(value):
+    """parse_date, with a fast path for the iso 8601 dates apis typically return."""
+    if isinstance(value, str) and ISO_DATE.match(value):
+        try:
+            return datetime.datetime.fromisoformat(value).astimezone(UTC)
+        except ValueError:
+            pass
+    return parse_date(value)
+
+
+def to_number(kind, value, default):
+    try:
+        return kind(str(value).strip())
+    except ValueError:
+        return default
+
+
+def size(value):
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def unique_size(value):
+    try:
+        return len(set(value))
+    except TypeError:
+        return 0
+
+
+def cidr_size(value):
+    cidr = parse_cidr(value)
+    if cidr:
+        return cidr.prefixlen
+    return 0
+
+
+def normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+VALUE_CONVERSIONS = {
+    'normalize': normalize,
+    'integer': lambda v: to_number(int, v, 0),
+    'float': lambda v: to_number(float, v, 0.0),
+    'size': size,
+    'unique_size': unique_size,
+    'cidr_size': cidr_size,
+}
+
+
+def compare(v, r, op):
+    """Match a converted resource value, see ValueFilter.match"""
+    if r is None and v == 'absent':
+        return True
+    elif r is not None and v == 'present':
+        return True
+    elif v == 'not-null' and r:
+        return True
+    elif v == 'empty' and not r:
+        return True
+    elif op:
+        try:
+            return op(r, v)
+        except TypeError:
+            return False
+    elif r == v:
+        return True
+    return False
@@ -3,7 +3,7 @@
 """
 Resource Filtering Logic
 """
-import copy
+import contextlib
 import datetime
 from datetime import timedelta
 import fnmatch
@@ -11,6 +11,7 @@ import ipaddress
 import logging
 import operator
 import re
+import threading
 
 from dateutil.tz import tzutc
 from dateutil.parser import parse
@@ -28,7 +29,9 @@ from c7n.utils import (
     parse_cidr,
     parse_date,
     jmespath_search,
-    jmespath_compile
+    jmespath_compile,
+    compile_path,
+    get_tag_value,
 )
 from c7n.manager import iter_filters
 
@@ -189,6 +192,22 @@ def trim_runtime(filters):
             remove_filter(f)
 
 
+def is_streamable_filter(f):
+    """Whether a filter evaluates each resource independently.
+
+    Such filters produce the same results when processing a resource
+    set in batches as they do on the full set, filters which operate
+    on the whole set (reduce, resource_count, etc) do not.
+    """
+    if isinstance(f, BooleanGroupFilter):
+        return all(map(is_streamable_filter, f.filters))
+    if type(f).process is Filter.process:
+        return True
+    if isinstance(f, ValueFilter) and type(f).process is ValueFilter.process:
+        return f.data.get('value_type') != 'resource_count'
+    return False
+
+
 # Really should be an abstract base class (abc) or
 # zope.interface
 
@@ -243,28 +262,13 @@ class BaseValueFilter(Filter):
         self.expr = {}
 
     def get_resource_value(self, k, i, regex=None):
-        r = None
         if k.startswith('tag:'):
-            tk = k.split(':', 1)[1]
-            if 'Tags' in i:
-                for t in i.get("Tags", []):
-                    if t.get('Key') == tk:
-                        r = t.get('Value')
-                        break
-            # GCP schema: 'labels': {'key': 'value'}
-            elif 'labels' in i:
-                r = i.get('labels', {}).get(tk, None)
-            # GCP has a secondary form of labels called tags
-            # as labels without values.
-            # Azure schema: 'tags': {'key': 'value'}
-            elif 'tags' in i:
-                r = (i.get('tags', {}) or {}).get(tk, None)
+            r = get_tag_value(i, k.split(':', 1)[1])
         elif k in i:
             r = i.get(k)
-        elif k not in self.expr:
-            self.expr[k] = jmespath_compile(k)
-            r = self.expr[k].search(i)
         else:
+            if k not in self.expr:
+                self.expr[k] = compile_path(k)
             r = self.expr[k].search(i)
 
         if regex:
@@ -345,6 +349,53 @@ class BooleanGroupFilter(Filter):
         return deprecations
 
 
+class BlockContext:
+    """Resource ids shared by the block filters of a filter tree.
+
+    Ids are extracted once per resource rather than by each nested
+    block in turn.
+    """
+
+    def __init__(self, id_key):
+        self.id_key = id_key
+        self.expr = None
+        if '.' in id_key:
+            self.expr = jmespath_compile(id_key)
+        # id(resource) -> (resource, resource id)
+        self.ids = {}
+
+    def resource_id(self, r):
+        entry = self.ids.get(id(r))
+        if entry is None or entry[0] is not r:
+            if self.expr:
+                rid = self.expr.search(r)
+            else:
+                rid = r[self.id_key]
+            # holding the resource ensures its object id isn't reused.
+            entry = self.ids[id(r)] = (r, rid)
+        return entry[1]
+
+    def resource_ids(self, resources):
+        return {self.resource_id(r) for r in resources}
+
+
+BLOCK_CONTEXT = threading.local()
+
+
+@contextlib.contextmanager
+def block_context(id_key):
+    """Share a block context with any nested block filters."""
+    current = getattr(BLOCK_CONTEXT, 'context', None)
+    if current is not None and current.id_key == id_key:
+        yield current
+        return
+    BLOCK_CONTEXT.context = BlockContext(id_key)
+    try:
+        yield BLOCK_CONTEXT.context
+    finally:
+        BLOCK_CONTEXT.context = current
+
+
 class Or(BooleanGroupFilter):
 
     def process(self, resources, event=None):
@@ -360,38 +411,29 @@ class Or(BooleanGroupFilter):
         return False
 
     def process_set(self, resources, event):
-        rtype_id = self.get_resource_type_id()
-        compiled = None
-        if '.' in rtype_id:
-            compiled = jmespath_compile(rtype_id)
-            resource_map = {compiled.search(r): r for r in resources}
-        else:
-            resource_map = {r[rtype_id]: r for r in resources}
-        results = set()
-        for f in self.filters:
-            if compiled:
-                results = results.union([
-                    compiled.search(r) for r in f.process(resources, event)])
-            else:
-                results = results.union([
-                    r[rtype_id] for r in f.process(resources, event)])
-        return [resource_map[r_id] for r_id in results]
+        with block_context(self.get_resource_type_id()) as ctx:
+            results = set()
+            for f in self.filters:
+                results.update(ctx.resource_ids(f.process(resources, event)))
+            return [r for r in resources if ctx.resource_id(r) in results]
 
 
 class And(BooleanGroupFilter):
 
     def process(self, resources, events=None):
-        if self.manager:
-            sweeper = AnnotationSweeper(self.get_resource_type_id(), resources)
+        if not self.manager:
+            return self.process_filters(resources, events)
+        with block_context(self.get_resource_type_id()) as ctx:
+            sweeper = AnnotationSweeper(ctx.id_key, resources, ctx)
+            resources = self.process_filters(resources, events)
+            sweeper.sweep(resources)
+        return resources
 
+    def process_filters(self, resources, events):
         for f in self.filters:
             resources = f.process(resources, events)
             if not resources:
                 break
-
-        if self.manager:
-            sweeper.sweep(resources)
-
         return resources
 
 
@@ -413,29 +455,16 @@ class Not(BooleanGroupFilter):
         return False
 
     def process_set(self, resources, event):
-        rtype_id = self.get_resource_type_id()
-        compiled = None
-        if '.' in rtype_id:
-            compiled = jmespath_compile(rtype_id)
-            resource_map = {compiled.search(r): r for r in resources}
-        else:
-            resource_map = {r[rtype_id]: r for r in resources}
-        sweeper = AnnotationSweeper(rtype_id, resources)
-
-        for f in self.filters:
-            resources = f.process(resources, event)
-            if not resources:
-                break
-
-        before = set(resource_map.keys())
-        if compiled:
-            after = {compiled.search(r) for r in resources}
-        else:
-            after = {r[rtype_id] for r in resources}
-        results = before - after
-        sweeper.sweep([])
-
-        return [resource_map[r_id] for r_id in results]
+        with block_context(self.get_resource_type_id()) as ctx:
+            sweeper = AnnotationSweeper(ctx.id_key, resources, ctx)
+            matched = resources
+            for f in self.filters:
+                matched = f.process(matched, event)
+                if not matched:
+                    break
+            after = ctx.resource_ids(matched)
+            sweeper.sweep([])
+            return [r for r in resources if ctx.resource_id(r) not in after]
 
 
 class AnnotationSweeper:
@@ -443,38 +472,35 @@ class AnnotationSweeper:
 
     See https://github.com/cloud-custodian/cloud-custodian/issues/2116
     """
-    def __init__(self, id_key, resources):
+    def __init__(self, id_key, resources, context=None):
         self.id_key = id_key
-        ra_map = {}
-        resource_map = {}
-        compiled = None
-        if '.' in id_key:
-            compiled = jmespath_compile(self.id_key)
+        self.context = context = context or BlockContext(id_key)
+        # Annotations are replaced or have their list/dict value updated
+        # in place, so a one level copy of each is enough to restore them.
+        self.ra_map = {}
         for r in resources:
-            if compiled:
-                id_ = compiled.search(r)
-            else:
-                id_ = r[self.id_key]
-            ra_map[id_] = {k: v for k, v in r.items() if k.startswith('c7n')}
-            resource_map[id_] = r
-        # We keep a full copy of the annotation keys to allow restore.
-        self.ra_map = copy.deepcopy(ra_map)
-        self.resource_map = resource_map
+            self.ra_map[context.resource_id(r)] = (r, {
+                k: snapshot_annotation(v) for k, v in r.items() if k.startswith('c7n')})
 
     def sweep(self, resources):
-        compiled = None
-        if '.' in self.id_key:
-            compiled = jmespath_compile(self.id_key)
-            diff = set(self.ra_map).difference([compiled.search(r) for r in resources])
-        else:
-            diff = set(self.ra_map).difference([r[self.id_key] for r in resources])
-        for rid in diff:
+        matched = self.context.resource_ids(resources)
+        for rid, (r, annotations) in self.ra_map.items():
+            if rid in matched:
+                continue
             # Clear annotations if the block filter didn't match
-            akeys = [k for k in self.resource_map[rid] if k.startswith('c7n')]
+            akeys = [k for k in r if k.startswith('c7n')]
             for k in akeys:
-                del self.resource_map[rid][k]
+                del r[k]
             # Restore annotations that may have existed prior to the block filter.
-            self.resource_map[rid].update(self.ra_map[rid])
+            r.update(annotations)
+
+
+def snapshot_annotation(v):
+    if isinstance(v, list):
+        return list(v)
+    elif isinstance(v, dict):
+        return dict(v)
+    return v
 
 
 # The default LooseVersion will fail on comparing present strings, used
@@ -49,10 +49,11 @@ class KmsRelatedFilter(RelatedResourceFilter):
     def get_related(self, resources):
         resource_manager = self.get_resource_manager()
         related_ids = self.get_related_ids(resources)
-        if len(related_ids) < self.FetchThreshold:
-            related = resource_manager.get_resources(list(related_ids))
+        index = self.get_related_index(build=len(related_ids) >= self.FetchThreshold)
+        if index is not None:
+            related = index.resources
         else:
-            related = resource_manager.resources()
+            related = resource_manager.get_resources(list(related_ids))
         related_map = {}
 
         for r in related:
@@ -4,14 +4,15 @@
 CloudWatch Metrics suppport for resources
 """
 import re
+import threading
 
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 from concurrent.futures import as_completed
 from datetime import datetime, timedelta
 
-from c7n.exceptions import PolicyValidationError
+from c7n.exceptions import ClientError, PolicyValidationError
 from c7n.filters.core import Filter, OPERATORS
-from c7n.utils import local_session, type_schema, chunks
+from c7n.utils import THROTTLE_CODES, local_session, type_schema, chunks
 
 
 class MetricsFilter(Filter):
@@ -21,8 +22,8 @@ class MetricsFilter(Filter):
 
     Docs on cloud watch metrics
 
-    - GetMetricStatistics
-      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricStatistics.html
+    - GetMetricData
+      https://docs.aws.amazon.com/AmazonCloudWatch/latest/APIReference/API_GetMetricData.html
 
     - Supported Metrics
       https://docs.aws.amazon.com/AmazonCloudWatch/latest/monitoring/aws-services-cloudwatch-metrics.html
@@ -88,10 +89,12 @@ class MetricsFilter(Filter):
            'missing-value': {'type': 'number'},
            'required': ('value', 'name')})
     schema_alias = True
-    permissions = ("cloudwatch:GetMetricStatistics",)
+    permissions = ("cloudwatch:GetMetricData",)
 
     MAX_QUERY_POINTS = 50850
     MAX_RESULT_POINTS = 1440
+    # GetMetricData queries per request
+    MAX_QUERIES = 500
 
     # Default per service, for overloaded services like ec2
     # we do type specific default namespace annotation
@@ -196,7 +199,7 @@ class MetricsFilter(Filter):
         matched = []
         with self.executor_factory(max_workers=3) as w:
             futures = []
-            for resource_set in chunks(resources, 50):
+            for resource_set in chunks(resources, self.MAX_QUERIES):
                 futures.append(
                     w.submit(self.process_resource_set, resource_set))
 
@@ -220,42 +223,58 @@ class MetricsFilter(Filter):
             dims.append({'Name': k, 'Value': v})
         return dims
 
+    def get_metric_key(self, dimensions):
+        """Key for a metric query, shared across filters and policies within a run."""
+        return (
+            self.manager.config.account_id, self.manager.config.region,
+            self.namespace, self.metric,
+            tuple((d['Name'], d['Value']) for d in dimensions),
+            self.start, self.end, self.period, self.statistics)
+
     def process_resource_set(self, resource_set):
-        client = local_session(
-            self.manager.session_factory).client('cloudwatch')
+        # Note this annotation cache is policy scoped, not across
+        # policies, still the lack of full qualification on the key
+        # means multiple filters within a policy using the same metric
+        # across different periods or dimensions would be problematic.
+        key = "%s.%s.%s.%s" % (self.namespace, self.metric, self.statistics, str(self.days))
 
-        matched = []
+        queries = {}
         for r in resource_set:
+            collected_metrics = r.setdefault('c7n.metrics', {})
+            if key in collected_metrics:
+                continue
             # if we overload dimensions with multiple resources we get
             # the statistics/average over those resources.
             dimensions = self.get_dimensions(r)
             # Merge in any filter specified metrics, get_dimensions is
             # commonly overridden so we can't do it there.
             dimensions.extend(self.get_user_dimensions())
+            metric_key = self.get_metric_key(dimensions)
+            datapoints = metric_cache.get(metric_key)
+            if datapoints is not None:
+                collected_metrics[key] = list(datapoints)
+                continue
+            queries.setdefault(metric_key, (dimensions, []))[1].append(r)
+
+        if queries:
+            results = self.fetch_metric_data(
+                [dimensions for dimensions, _ in queries.values()])
+            for (metric_key, (_, metric_resources)), (datapoints, complete) in zip(
+                    queries.items(), results):
+                if datapoints is None:
+                    continue
+                # partial results are used for this filter but not shared
+                if complete:
+                    metric_cache.set(metric_key, datapoints)
+                for r in metric_resources:
+                    r['c7n.metrics'][key] = list(datapoints)
 
-            collected_metrics = r.setdefault('c7n.metrics', {})
-            # Note this annotation cache is policy scoped, not across
-            # policies, still the lack of full qualification on the key
-            # means multiple filters within a policy using the same metric
-            # across different periods or dimensions would be problematic.
-            key = "%s.%s.%s.%s" % (self.namespace, self.metric, self.statistics, str(self.days))
-
-            params = dict(
-                Namespace=self.namespace,
-                MetricName=self.metric,
-                StartTime=self.start,
-                EndTime=self.end,
-                Period=self.period,
-                Dimensions=dimensions
-            )
-
-            stats_key = (self.statistics in self.standard_stats
-                         and 'Statistics' or 'ExtendedStatistics')
-            params[stats_key] = [self.statistics]
-
+        matched = []
+        for r in resource_set:
+            collected_metrics = r['c7n.metrics']
+            # the resource's query failed
             if key not in collected_metrics:
-                collected_metrics[key] = client.get_metric_statistics(
-                    **params)['Datapoints']
+                continue
 
             # In certain cases CloudWatch reports no data for a metric.
             # If the policy specifies a fill value for missing data, add
@@ -292,6 +311,117 @@ class MetricsFilter(Filter):
                     matched.append(r)
         return matched
 
+    def fetch_metric_data(self, query_dimensions):
+        """Fetch datapoints for each set of dimensions, isolating failed queries.
+
+        Returns a (datapoints, complete) pair per set of dimensions.
+
+        A failed request is split in half and retried, so one bad query
+        only drops its own resources. Datapoints are None for queries that
+        fail on their own. Throttling isn't query specific and is raised.
+        """
+        try:
+            return self.get_metric_data(query_dimensions)
+        except ClientError as e:
+            if e.response['Error']['Code'] in THROTTLE_CODES:
+                raise
+            if len(query_dimensions) == 1:
+                self.log.warning("CW Retrieval error: %s", e)
+                return [(None, False)]
+        mid = len(query_dimensions) // 2
+        return (self.fetch_metric_data(query_dimensions[:mid]) +
+                self.fetch_metric_data(query_dimensions[mid:]))
+
+    def get_metric_data(self, query_dimensions):
+        """Fetch datapoints for each set of dimensions with GetMetricData.
+
+        Returns a (datapoints, complete) pair per query, with datapoints in
+        the GetMetricStatistics datapoint format. Pages are followed while
+        results are PartialData, a query whose final status isn't Complete
+        is marked incomplete, and one that errors has no datapoints.
+        """
+        client = local_session(
+            self.manager.session_factory).client('cloudwatch')
+        queries = []
+        for idx, dimensions in enumerate(query_dimensions):
+            queries.append({
+                'Id': 'm%d' % idx,
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': self.namespace,
+                        'MetricName': self.metric,
+                        'Dimensions': dimensions},
+                    'Period': self.period,
+                    'Stat': self.statistics},
+                'ReturnData': True})
+
+        results = {q['Id']: [] for q in queries}
+        status = {}
+        params = dict(
+            MetricDataQueries=queries,
+            StartTime=self.start,
+            EndTime=self.end)
+        while True:
+            response = client.get_metric_data(**params)
+            for message in response.get('Messages', ()):
+                self.log.warning(
+                    "CW metric data %s: %s", message.get('Code'), message.get('Value'))
+            for result in response['MetricDataResults']:
+                status[result['Id']] = result.get('StatusCode', 'Complete')
+                for message in result.get('Messages', ()):
+                    self.log.warning(
+                        "CW metric data %s %s: %s", self.metric,
+                        message.get('Code'), message.get('Value'))
+                results[result['Id']].extend(
+                    {'Timestamp': t, self.statistics: v}
+                    for t, v in zip(result['Timestamps'], result['Values']))
+            if not response.get('NextToken'):
+                break
+            params['NextToken'] = response['NextToken']
+
+        metric_data = []
+        for q in queries:
+            code = status.get(q['Id'], 'Complete')
+            if code in ('Complete', 'PartialData'):
+                metric_data.append((results[q['Id']], code == 'Complete'))
+                continue
+            self.log.warning(
+                "CW metric data %s %s for %s",
+                self.metric, code, q['MetricStat']['Metric']['Dimensions'])
+            metric_data.append((None, False))
+        return metric_data
+
+
+class MetricCache:
+    """Metric datapoints shared by metrics filters within a run.
+
+    Datapoints are keyed by account, region, and the full metric query
+    (see MetricsFilter.get_metric_key), so policies filtering on the same
+    metric over the same window only query it once.
+    """
+
+    def __init__(self, size=100000):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def set(self, key, datapoints):
+        with self.lock:
+            self.data[key] = datapoints
+            if len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+metric_cache = MetricCache()
+
 
 class ShieldMetrics(MetricsFilter):
     """Specialized metrics filter for shield
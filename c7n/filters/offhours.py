@@ -249,6 +249,7 @@ might look like:
 
 """
 # note we have to module import for our testing mocks
+from collections import UserDict
 import datetime
 import logging
 from os.path import join
@@ -271,6 +272,27 @@ def parens_removed(u):
     return u.translate({ord('('): None, ord(')'): None})
 
 
+class TimezoneAliases(UserDict):
+    """Timezone aliases and the lower cased names of zones that aren't title case.
+
+    Zone names are read on first use, reading the zone database is slow.
+    """
+
+    def __init__(self, aliases):
+        self.aliases = aliases
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            data = {
+                z.lower(): z for z in zoneinfo.get_zonefile_instance().zones
+                if z.title() != z and z.lower() not in self.aliases}
+            data.update(self.aliases)
+            self._data = data
+        return self._data
+
+
 class Time(Filter):
     """
     Schedule offhours for resources see :ref:`offhours <offhours>`
@@ -298,7 +320,7 @@ class Time(Filter):
     DEFAULT_TAG = "maid_offhours"
     DEFAULT_TZ = 'et'
 
-    TZ_ALIASES = {
+    TZ_ALIASES = TimezoneAliases({
         'pdt': 'America/Los_Angeles',
         'pt': 'America/Los_Angeles',
         'pst': 'America/Los_Angeles',
@@ -327,18 +349,11 @@ class Time(Filter):
         'brt': 'America/Sao_Paulo',
         'nzst': 'Pacific/Auckland',
         'utc': 'Etc/UTC',
-    }
+    })
     TAG_RESTRICTIONS = ["(", ")", "[", "]", ",", ";", "=", "/", "-"]
     # mapping to ['u28', 'u29', 'u5b', 'u5d', 'u2c', 'u3b', 'u3d', 'u2f', "u2d"]
     TAG_RESTRICTIONS_ESCAPE = ["u" + hex(ord(c))[2:] for c in TAG_RESTRICTIONS]
 
-    z_names = list(zoneinfo.get_zonefile_instance().zones)
-    non_title_case_zones = (
-        lambda aliases=TZ_ALIASES.keys(), z_names=z_names:
-        {z.lower(): z for z in z_names
-            if z.title() != z and z.lower() not in aliases})()
-    TZ_ALIASES.update(non_title_case_zones)
-
     def __init__(self, data, manager=None):
         super(Time, self).__init__(data, manager)
         self.default_tz = self.data.get('default_tz', self.DEFAULT_TZ)
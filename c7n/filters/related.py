@@ -1,6 +1,7 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
 import importlib
+import threading
 from functools import lru_cache
 
 from .core import ValueFilter, OPERATORS
@@ -41,18 +42,25 @@ class RelatedResourceFilter(ValueFilter):
     def get_related(self, resources):
         resource_manager = self.get_resource_manager()
         related_ids = self.get_related_ids(resources)
-        model = resource_manager.get_model()
-        if len(related_ids) < self.FetchThreshold:
-            related = resource_manager.get_resources(list(related_ids))
-        else:
-            related = resource_manager.resources()
+        index = self.get_related_index(build=len(related_ids) >= self.FetchThreshold)
+        if index is not None:
+            return index.select(related_ids)
 
+        related = resource_manager.get_resources(list(related_ids))
         if related is None:
             return {}
 
+        model = resource_manager.get_model()
         return {r[model.id]: r for r in related
                 if r[model.id] in related_ids}
 
+    def get_related_index(self, build=True):
+        """Get the run's index of related resources.
+
+        Returns None if the index hasn't been built and build is False.
+        """
+        return related_index.get(self.get_resource_manager(), build)
+
     @lru_cache(maxsize=None)
     def get_resource_manager(self):
         mod_path, class_name = self.RelatedResource.rsplit('.', 1)
@@ -123,18 +131,11 @@ class RelatedResourceByIdFilter(RelatedResourceFilter):
     RelatedResourceByIdExpression = None
 
     def get_related(self, resources):
-        resource_manager = self.get_resource_manager()
         related_ids = self.get_related_ids(resources)
-
-        related = {}
-        for r in resource_manager.resources():
-            matched_vpc = self.get_related_by_ids(r) & related_ids
-            if matched_vpc:
-                for vpc in matched_vpc:
-                    related_resources = related.get(vpc, [])
-                    related_resources.append(r)
-                    related[vpc] = related_resources
-        return related
+        by_id = self.get_related_index().group(
+            self.RelatedResourceByIdExpression or self.RelatedIdsExpression,
+            self.get_related_by_ids)
+        return {rid: by_id[rid] for rid in related_ids if rid in by_id}
 
     def get_related_by_ids(self, resources):
         RelatedResourceKey = self.RelatedResourceByIdExpression or self.RelatedIdsExpression
@@ -176,6 +177,83 @@ class RelatedResourceByIdFilter(RelatedResourceFilter):
         return False
 
 
+class ResourceIndex:
+    """An id index over a resource type's resources, with secondary key
+    groupings built on first use.
+    """
+
+    def __init__(self, resources, id_key):
+        self.resources = resources
+        self.ids = {r[id_key]: r for r in resources}
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def select(self, ids):
+        return {i: self.ids[i] for i in ids if i in self.ids}
+
+    def group(self, name, get_keys):
+        """Get a mapping of secondary key to resources.
+
+        get_keys returns the keys of a resource, the mapping is cached
+        under name.
+        """
+        with self.lock:
+            if name in self.groups:
+                return self.groups[name]
+            groups = {}
+            for r in self.resources:
+                for k in get_keys(r):
+                    groups.setdefault(k, []).append(r)
+            self.groups[name] = groups
+            return groups
+
+
+class RelatedIndex:
+    """Related resource indexes shared by related resource filters within a run.
+
+    Indexes are keyed by account, region, and resource type, so that
+    policies filtering on the same related resources (security groups,
+    subnets, vpcs) enumerate and index them once.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get_key(self, manager):
+        return (
+            getattr(manager.config, 'account_id', None),
+            getattr(manager.config, 'region', None),
+            "%s.%s" % (manager.__class__.__module__, manager.__class__.__name__))
+
+    def get(self, manager, build=True):
+        key = self.get_key(manager)
+        with self.lock:
+            index = self.data.get(key)
+            if index is not None or not build:
+                return index
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        # build outside the index lock, so that fetches of different
+        # resource types can proceed concurrently.
+        with key_lock:
+            index = self.data.get(key)
+            if index is None:
+                index = ResourceIndex(
+                    manager.resources() or [], manager.get_model().id)
+                with self.lock:
+                    self.data[key] = index
+        return index
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.locks.clear()
+
+
+related_index = RelatedIndex()
+
+
 class ChildResourceFilter(RelatedResourceFilter):
     ChildResource = None
     RelatedIdsExpression = None
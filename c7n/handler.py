@@ -8,11 +8,13 @@ import logging
 import json
 
 from c7n.config import Config
+from c7n.output import blob_uploads
 from c7n.structure import StructureParser
 from c7n.resources import load_resources
 from c7n.resources.aws import AWS
 from c7n.policy import PolicyCollection
-from c7n.utils import format_event, get_account_id_from_sts, local_session
+from c7n.utils import (
+    format_event, get_account_id_from_sts, local_session, reset_run_caches)
 
 import boto3
 
@@ -152,7 +154,10 @@ def dispatch_event(event, context):
         with open('config.json') as f:
             policy_data = json.load(f)
         policy_config = init_config(policy_data)
-        load_resources(StructureParser().get_resource_types(policy_data))
+        structure = StructureParser()
+        load_resources(
+            structure.get_resource_types(policy_data),
+            structure.get_element_types(policy_data))
 
     if C7N_DEBUG_EVENT:
         event['debug'] = True
@@ -161,16 +166,23 @@ def dispatch_event(event, context):
     if not policy_data or not policy_data.get('policies'):
         return False
 
+    # warm containers serve many events, run caches are scoped to an event.
+    reset_run_caches()
+
     policies = PolicyCollection.from_data(policy_data, policy_config)
-    for p in policies:
-        try:
-            # validation provides for an initialization point for
-            # some filters/actions.
-            p.validate()
-            p.push(event, context)
-        except Exception:
-            log.exception("error during policy execution")
-            if C7N_CATCH_ERR:
-                continue
-            raise
+    try:
+        for p in policies:
+            try:
+                # validation provides for an initialization point for
+                # some filters/actions.
+                p.validate()
+                p.push(event, context)
+            except Exception:
+                log.exception("error during policy execution")
+                if C7N_CATCH_ERR:
+                    continue
+                raise
+    finally:
+        # the container may be frozen once the event is handled.
+        blob_uploads.flush()
     return True
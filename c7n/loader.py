@@ -6,6 +6,7 @@ try:
 except ImportError:
     from backports.functools_lru_cache import lru_cache
 
+import json
 import logging
 import re
 import os
@@ -37,8 +38,18 @@ class SchemaValidator:
         # with the qualified resource types in policy_data.
         if resource_types is None:
             resource_types = StructureParser().get_resource_types(policy_data)
-        self.gen_schema(tuple(sorted(resource_types)))
+        resource_types = tuple(sorted(resource_types))
+
+        # skip validating policies that have previously passed
+        cache = schema and schema.SchemaCache.from_env()
+        if cache:
+            content = json.dumps(policy_data, sort_keys=True, default=str)
+            if cache.is_valid('policy', resource_types, content):
+                return []
+        self.gen_schema(resource_types)
         errors = self._validate(policy_data)
+        if cache and not errors:
+            cache.set_valid('policy', resource_types, content)
         return errors or []
 
     def _validate(self, policy_data):
@@ -64,15 +75,20 @@ class SchemaValidator:
         ]))
 
     def gen_schema(self, resource_types):
-        self.validator = v = self._gen_schema(resource_types)
+        # the schema also depends on which provider extensions are loaded
+        self.validator = v = self._gen_schema(
+            resource_types, schema and schema.get_loaded_extensions())
         # alias for debugging
         self.schema = v.schema
         return self.validator
 
     @lru_cache(maxsize=32)
-    def _gen_schema(self, resource_types):
+    def _gen_schema(self, resource_types, extensions=()):
         if schema is None:
             raise RuntimeError("missing jsonschema dependency")
+        cache = schema.SchemaCache.from_env()
+        if cache:
+            return schema.JsonSchemaValidator(cache.get_schema(resource_types))
         rt_schema = schema.generate(resource_types)
         schema.JsonSchemaValidator.check_schema(rt_schema)
         return schema.JsonSchemaValidator(rt_schema)
@@ -119,7 +135,8 @@ class PolicyLoader:
         # track policy resource types and only load if needed.
         rtypes = set(self.structure.get_resource_types(policy_data))
 
-        missing = load_resources(list(rtypes))
+        missing = load_resources(
+            list(rtypes), self.structure.get_element_types(policy_data))
         if missing:
             self._handle_missing_resources(policy_data, missing)
 
@@ -186,7 +203,7 @@ class DirectoryLoader(PolicyLoader):
                 errors.append(e)
                 return errors
             rtypes = structure.get_resource_types(data)
-            load_resources(rtypes)
+            load_resources(rtypes, structure.get_element_types(data))
             schm = schema.generate(rtypes)
             errors += schema.validate(data, schm)
             return errors
@@ -14,7 +14,7 @@ try:
 except ImportError:
     resources = PluginRegistry('resources')
 
-from c7n.utils import dumps
+from c7n.utils import dumps, tag_index
 
 
 def iter_filters(filters, block_end=False):
@@ -41,6 +41,7 @@ class ResourceManager:
     permissions = ()
     get_client = None
     get_schema = None
+    filter_plan = None
 
     def __init__(self, ctx, data):
         self.ctx = ctx
@@ -101,21 +102,25 @@ class ResourceManager:
 
     def filter_resources(self, resources, event=None):
         original = len(resources)
+        filters = self.filters
         if event and event.get('debug', False):
             self.log.info(
                 "Filtering resources using %d filters", len(self.filters))
-        for idx, f in enumerate(self.filters, start=1):
-            if not resources:
-                break
-            rcount = len(resources)
-
-            with self.ctx.tracer.subsegment("filter:%s" % f.type):
-                resources = f.process(resources, event)
-
-            if event and event.get('debug', False):
-                self.log.debug(
-                    "Filter #%d applied %d->%d filter: %s",
-                    idx, rcount, len(resources), dumps(f.data, indent=None))
+        elif self.filter_plan is not None and self.filter_plan.is_current(filters):
+            filters = self.filter_plan.steps
+        with tag_index():
+            for idx, f in enumerate(filters, start=1):
+                if not resources:
+                    break
+                rcount = len(resources)
+
+                with self.ctx.tracer.subsegment("filter:%s" % f.type):
+                    resources = f.process(resources, event)
+
+                if event and event.get('debug', False):
+                    self.log.debug(
+                        "Filter #%d applied %d->%d filter: %s",
+                        idx, rcount, len(resources), dumps(f.data, indent=None))
         self.log.debug("Filtered from %d to %d %s" % (
             original, len(resources), self.__class__.__name__.lower()))
         return resources
@@ -9,19 +9,24 @@ See docs/usage/outputs.rst
 """
 import contextlib
 import datetime
+from concurrent.futures import wait
 import gzip
+import io
+import json
 import logging
 import os
 import shutil
 import tempfile
+import threading
 import time
 import uuid
 
 from abc import ABC, abstractmethod
 
 from c7n.exceptions import InvalidOutputConfig
+from c7n.executor import ThreadPoolExecutor
 from c7n.registry import PluginRegistry
-from c7n.utils import parse_url_config, join_output_path
+from c7n.utils import dumps, parse_url_config, join_output_path
 
 try:
     import psutil
@@ -30,12 +35,57 @@ try:
 except ImportError:
     HAVE_PSUTIL = False
 
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
 log = logging.getLogger('custodian.output')
 
 
 # TODO remove
 DEFAULT_NAMESPACE = "CloudMaid"
 
+# formats for a policy's matched resources, json lines formats are
+# written a resource per line and compressed as they're written.
+RESOURCE_FORMATS = ('json', 'jsonl.gz', 'jsonl.zst')
+# resource file names, as written and as compressed for blob outputs.
+RESOURCE_FILES = (
+    'resources.json', 'resources.json.gz', 'resources.jsonl.gz', 'resources.jsonl.zst')
+# suffixes of files that are already compressed.
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+
+
+def open_records(path, mode='rt'):
+    """Open a resource file, compressed or not as per its suffix."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, compresslevel=7)
+    if path.endswith('.zst'):
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def load_records(fh, name):
+    """Load resources from a binary file object, in the format of the file name."""
+    name, suffix = os.path.splitext(name)
+    if suffix == '.gz':
+        fh = gzip.GzipFile(fileobj=fh)
+    elif suffix == '.zst':
+        fh = zstandard.ZstdDecompressor().stream_reader(fh)
+    else:
+        name += suffix
+    if name.endswith('.jsonl'):
+        return [json.loads(line) for line in io.TextIOWrapper(fh, encoding='utf8')
+                if line.strip()]
+    return json.load(fh)
+
+
+def dump_records(fh, resources):
+    """Write resources to a text file object as json lines."""
+    for r in resources:
+        fh.write(dumps(r, indent=None))
+        fh.write('\n')
+
 
 class OutputRegistry(PluginRegistry):
 
@@ -408,6 +458,13 @@ class OutputFileHandler(ABC):
         "Write a file at the relative path specified with the value as the content."
         raise NotImplementedError()
 
+    def write_resources(self, resources, format='json'):
+        """Write a policy's resources.
+
+        Handlers without a root directory on disk write json.
+        """
+        self.write_file('resources.json', dumps(resources, indent=2))
+
 
 @blob_outputs.register('null')
 class NullBlobOutput(OutputFileHandler):
@@ -462,11 +519,20 @@ class DirectoryOutput(OutputFileHandler):
         with open(os.path.join(self.root_dir, rel_path), 'w') as fh:
             fh.write(value)
 
+    def write_resources(self, resources, format='json'):
+        if format == 'json':
+            return super().write_resources(resources, format)
+        with open_records(
+                os.path.join(self.root_dir, 'resources.%s' % format), 'wt') as fh:
+            dump_records(fh, resources)
+
     def compress(self):
         # Compress files individually so thats easy to walk them, without
         # downloading tar and extracting.
         for root, dirs, files in os.walk(self.root_dir):
             for f in files:
+                if f.endswith(COMPRESSED_SUFFIXES):
+                    continue
                 fp = os.path.join(root, f)
                 with gzip.open(fp + ".gz", "wb", compresslevel=7) as zfh:
                     with open(fp, "rb") as sfh:
@@ -489,6 +555,86 @@ class DirectoryOutput(OutputFileHandler):
         return data
 
 
+# upload threads, and bytes of queued and running uploads, for streamed blob outputs.
+UPLOAD_WORKERS = int(os.environ.get('C7N_OUTPUT_UPLOAD_WORKERS', 8))
+UPLOAD_MAX_BYTES = int(os.environ.get('C7N_OUTPUT_UPLOAD_MAX_BYTES', 256 * 1024 * 1024))
+
+
+class BlobUploads:
+    """Process wide queue of streamed blob output uploads.
+
+    Streamed outputs submit files as they're written. Uploads run on a
+    shared pool of threads, so a policy's uploads overlap its execution
+    and the uploads of other policies. Submitting waits while queued and
+    running uploads exceed max_bytes, so staged files don't accumulate
+    on disk faster than they're uploaded.
+    """
+
+    def __init__(self, max_workers=UPLOAD_WORKERS, max_bytes=UPLOAD_MAX_BYTES):
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.lock = threading.Condition()
+        self.executor = None
+        self.futures = set()
+        self.inflight = 0
+
+    def submit(self, upload, path, key):
+        """Upload a file with upload(path, key), removing the file after."""
+        size = os.path.getsize(path)
+        with self.lock:
+            # a file larger than max_bytes waits to be uploaded on its own.
+            while self.inflight and self.inflight + size > self.max_bytes:
+                self.lock.wait()
+            self.inflight += size
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        f = self.executor.submit(self._upload, upload, path, key, size)
+        with self.lock:
+            self.futures.add(f)
+        return f
+
+    def _upload(self, upload, path, key, size):
+        try:
+            upload(path, key)
+        except Exception:
+            log.exception("Error uploading output file %s", key)
+            raise
+        finally:
+            os.remove(path)
+            with self.lock:
+                self.inflight -= size
+                self.lock.notify_all()
+
+    def on_complete(self, futures, callback):
+        """Call callback once, after all of the given uploads complete."""
+        pending = set(futures)
+        lock = threading.Lock()
+
+        def done(f):
+            with lock:
+                if f not in pending:
+                    return
+                pending.remove(f)
+                if pending:
+                    return
+            callback()
+
+        if not pending:
+            return callback()
+        for f in futures:
+            f.add_done_callback(done)
+
+    def flush(self):
+        """Wait for submitted uploads, returning the number that failed."""
+        with self.lock:
+            futures, self.futures = self.futures, set()
+        wait(futures)
+        return len([f for f in futures if f.exception()])
+
+
+blob_uploads = BlobUploads()
+
+
 class BlobOutput(DirectoryOutput):
 
     log = logging.getLogger('custodian.output.blob')
@@ -501,6 +647,11 @@ class BlobOutput(DirectoryOutput):
         self.bucket = self.config.netloc
         self.key_prefix = self.config.path.strip('/')
         self.root_dir = tempfile.mkdtemp()
+        # with ?stream=true, files are compressed and queued for upload
+        # as they're written, from a staging directory of their own.
+        self.stream = self.config.get('stream', '').lower() == 'true'
+        self.stage_dir = self.stream and tempfile.mkdtemp() or None
+        self.uploads = []
 
     def __repr__(self):
         return "<output:%s to bucket:%s prefix:%s>" % (
@@ -521,17 +672,61 @@ class BlobOutput(DirectoryOutput):
     def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
         self.log.debug("%s: uploading policy logs", self.type)
         self.compress()
+        if self.stream:
+            # files written directly to the output directory, like the
+            # policy log, are queued last, and the output's directories
+            # are removed once all of its uploads complete.
+            for path, key in self.get_upload_files():
+                self.uploads.append(blob_uploads.submit(self.upload_file, path, key))
+            blob_uploads.on_complete(self.uploads, self.cleanup)
+            return
         self.upload()
-        shutil.rmtree(self.root_dir)
+        self.cleanup()
+
+    def cleanup(self):
+        shutil.rmtree(self.root_dir, ignore_errors=self.stream)
+        if self.stage_dir:
+            shutil.rmtree(self.stage_dir, ignore_errors=True)
         self.log.debug("%s: policy logs uploaded", self.type)
 
-    def upload(self):
+    def write_file(self, rel_path, value):
+        if not self.stream:
+            return super().write_file(rel_path, value)
+        path = self.get_stage_path()
+        with gzip.open(path, 'wt', compresslevel=7) as fh:
+            fh.write(value)
+        self.upload_staged(path, rel_path + '.gz')
+
+    def write_resources(self, resources, format='json'):
+        if not self.stream or format == 'json':
+            return super().write_resources(resources, format)
+        path = self.get_stage_path('.%s' % format)
+        with open_records(path, 'wt') as fh:
+            dump_records(fh, resources)
+        self.upload_staged(path, 'resources.%s' % format)
+
+    def get_stage_path(self, suffix=''):
+        # staged file names are unique, as a file may be rewritten while
+        # a prior version is still uploading.
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.stage_dir)
+        os.close(fd)
+        return path
+
+    def upload_staged(self, path, rel_path):
+        key = "/".join(filter(None, [self.key_prefix, rel_path]))
+        self.uploads.append(blob_uploads.submit(self.upload_file, path, key))
+
+    def get_upload_files(self):
         for root, dirs, files in os.walk(self.root_dir):
             len_root_dir = len(self.root_dir)
             for f in files:
                 rel_path = root[len_root_dir:]
                 key = "/".join(filter(None, [self.key_prefix, rel_path, f]))
-                self.upload_file(os.path.join(root, f), key)
+                yield os.path.join(root, f), key
+
+    def upload(self):
+        for path, key in self.get_upload_files():
+            self.upload_file(path, key)
 
     def upload_file(self, path, key):
         raise NotImplementedError("subclass responsibility")
@@ -0,0 +1,184 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""Policy set aware resource fetch planning.
+
+When running many policies against the same resource type, each
+policy's resource manager would otherwise independently enumerate
+and augment the same resources on a cache miss. The fetch planner
+groups a set of policies by their resource cache key (account,
+region, resource type, source, query), fetches each group once
+(concurrently across groups), and serves the shared snapshot to
+each policy's filter chain.
+"""
+import copy
+import logging
+import threading
+
+from c7n.cache import encode
+from c7n.executor import ThreadPoolExecutor
+from c7n.query import QueryResourceManager
+
+log = logging.getLogger('custodian.planner')
+
+
+class SnapshotCache:
+    """Cache facade serving planner fetched snapshots ahead of a manager's cache.
+
+    Each snapshot tracks how many policies will consume it, the last
+    consumer receives the fetched resources directly, earlier consumers
+    receive a copy so that filter annotations don't leak across policies.
+    """
+
+    def __init__(self, cache, snapshots):
+        self.cache = cache
+        self.snapshots = snapshots
+
+    def load(self):
+        return self.cache.load()
+
+    def get(self, key):
+        resources = self.snapshots.checkout(key)
+        if resources is not None:
+            return resources
+        return self.cache.get(key)
+
+    def save(self, key, data, *args, **kw):
+        return self.cache.save(key, data, *args, **kw)
+
+    def size(self):
+        return self.cache.size()
+
+    def close(self):
+        return self.cache.close()
+
+    def __enter__(self):
+        self.cache.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self.cache.__exit__(exc_type, exc_val, exc_tb)
+
+    def __getattr__(self, k):
+        return getattr(self.cache, k)
+
+
+class Snapshots:
+    """Reference counted store of fetched resource sets."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.refs = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return encode(key) in self.data
+
+    def add(self, key, resources, refs):
+        ekey = encode(key)
+        with self.lock:
+            self.data[ekey] = resources
+            self.refs[ekey] = refs
+
+    def checkout(self, key):
+        ekey = encode(key)
+        with self.lock:
+            if ekey not in self.data:
+                return None
+            self.refs[ekey] -= 1
+            if self.refs[ekey] > 0:
+                return copy.deepcopy(self.data[ekey])
+            self.refs.pop(ekey)
+            return self.data.pop(ekey)
+
+
+class FetchGroup:
+
+    def __init__(self, key, query):
+        self.key = key
+        self.query = query
+        self.policies = []
+
+    @property
+    def manager(self):
+        return self.policies[0].resource_manager
+
+    def __repr__(self):
+        return "<FetchGroup resource:%s region:%s policies:%d>" % (
+            self.key['resource'], self.key['region'], len(self.policies))
+
+
+class FetchPlanner:
+    """Plan and execute shared resource fetches for a set of policies.
+
+    Only pull mode policies using the standard query resource manager
+    retrieval participate, all other policies are left to fetch their
+    own resources.
+    """
+
+    max_workers = 4
+
+    def __init__(self, policies, max_workers=None):
+        self.policies = policies
+        self.max_workers = max_workers or self.max_workers
+        self.snapshots = Snapshots()
+
+    def plan(self):
+        groups = {}
+        for p in self.policies:
+            if not self.is_plannable(p):
+                continue
+            m = p.resource_manager
+            query = m.source.get_query_params(None)
+            key = m.get_cache_key(query)
+            ekey = encode(key)
+            if ekey not in groups:
+                groups[ekey] = FetchGroup(key, query)
+            groups[ekey].policies.append(p)
+        return list(groups.values())
+
+    def is_plannable(self, policy):
+        if policy.execution_mode != 'pull' or policy.options.dryrun:
+            return False
+        m = policy.resource_manager
+        if not isinstance(m, QueryResourceManager):
+            return False
+        # managers with custom resource retrieval may not use the standard
+        # cache key, leave them to fetch on their own.
+        if type(m).resources is not QueryResourceManager.resources:
+            return False
+        return policy.is_runnable()
+
+    def execute(self):
+        groups = self.plan()
+        if not groups:
+            return self.snapshots
+        log.debug(
+            "planner fetching %d resource groups for %d policies",
+            len(groups), sum(len(g.policies) for g in groups))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as w:
+            futures = {w.submit(self.fetch, g): g for g in groups}
+            for f, g in futures.items():
+                if f.exception():
+                    # policies in the group will refetch and surface the error
+                    log.warning(
+                        "planner fetch error %s policies will refetch, error: %s",
+                        g, f.exception())
+                    continue
+                self.snapshots.add(g.key, f.result(), len(g.policies))
+                for p in g.policies:
+                    m = p.resource_manager
+                    m._cache = SnapshotCache(m._cache, self.snapshots)
+        return self.snapshots
+
+    def fetch(self, group):
+        m = group.manager
+        with m._cache:
+            resources = m._cache.get(group.key)
+            if resources is not None:
+                return resources
+            resources = m.augment(m.source.resources(dict(group.query or {})))
+            m._cache.save(group.key, resources, id_key=m.get_model().id)
+        return resources
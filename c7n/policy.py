@@ -15,6 +15,7 @@ from c7n.cwe import CloudWatchEvents
 from c7n.ctx import ExecutionContext
 from c7n.exceptions import PolicyValidationError, ClientError, ResourceLimitExceeded
 from c7n.filters import FilterRegistry, And, Or, Not
+from c7n.filters.compiler import compile_filters
 from c7n.manager import iter_filters
 from c7n.output import DEFAULT_NAMESPACE
 from c7n.resources import load_resources
@@ -48,7 +49,7 @@ def load(options, path, format=None, validate=True, vars=None):
     structure = StructureParser()
     structure.validate(data)
     rtypes = structure.get_resource_types(data)
-    load_resources(rtypes)
+    load_resources(rtypes, structure.get_element_types(data))
 
     if isinstance(data, list):
         log.warning('yaml in invalid format. The "policies:" line is probably missing.')
@@ -348,7 +349,8 @@ class PullMode(PolicyExecutionMode):
                 "ResourceCount", len(resources), "Count", Scope="Policy"
             )
             ctx.metrics.put_metric("ResourceTime", rt, "Seconds", Scope="Policy")
-            ctx.output.write_file('resources.json', utils.dumps(resources, indent=2))
+            ctx.output.write_resources(
+                resources, getattr(self.policy.options, 'resource_format', 'json'))
 
             if not resources:
                 return []
@@ -537,7 +539,8 @@ class LambdaMode(ServerlessExecutionMode):
                     "Invoking actions %s", self.policy.resource_manager.actions
                 )
 
-            ctx.output.write_file('resources.json', utils.dumps(resources, indent=2))
+            ctx.output.write_resources(
+                resources, getattr(self.policy.options, 'resource_format', 'json'))
 
             for action in self.policy.resource_manager.actions:
                 self.policy.log.info(
@@ -1255,6 +1258,9 @@ class Policy:
             f.validate()
         for a in self.resource_manager.actions:
             a.validate()
+        self.resource_manager.filter_plan = compile_filters(
+            self.resource_manager.filters,
+            columnar=getattr(self.options, 'columnar', False))
 
     def get_variables(self, variables=None):
         """Get runtime variables for policy interpolation.
@@ -16,6 +16,12 @@ log = logging.getLogger('c7n.providers')
 class Provider(metaclass=abc.ABCMeta):
     """Provider Base Class"""
 
+    # filter, action and mode type names that modules register across
+    # the provider's resource types, mapped to the module. Modules are
+    # imported when a policy references one of their types. Imports
+    # between resource modules (ie. ec2 on iam) aren't covered.
+    extension_map = {}
+
     @abc.abstractproperty
     def display_name(self):
         """display name for the provider in docs"""
@@ -58,6 +64,21 @@ class Provider(metaclass=abc.ABCMeta):
             cls.resources.notify(r)
         return resource_classes, not_found
 
+    @classmethod
+    def load_extensions(cls, element_types):
+        """Import the modules registering the given element type names
+
+        A '*' element type imports all of them.
+        """
+        modules = set()
+        for elements in cls.extension_map.values():
+            if '*' in element_types:
+                modules.update(elements.values())
+            else:
+                modules.update(elements[e] for e in element_types if e in elements)
+        for m in sorted(modules):
+            importlib.import_module(m)
+
 
 def import_resource_classes(resource_map, resource_types):
     if '*' in resource_types:
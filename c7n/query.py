@@ -9,18 +9,23 @@ from concurrent.futures import as_completed
 import functools
 import itertools
 import json
+import threading
 from typing import List
 
 import os
 
 from c7n.actions import ActionRegistry
-from c7n.exceptions import ClientError, ResourceLimitExceeded, PolicyExecutionError
+from c7n.exceptions import (
+    ClientError, ResourceLimitExceeded, PolicyExecutionError, PolicyValidationError)
+from c7n.cache import encode
 from c7n.filters import FilterRegistry, MetricsFilter
+from c7n.filters.core import is_streamable_filter
 from c7n.manager import ResourceManager
 from c7n.registry import PluginRegistry
 from c7n.tags import register_ec2_tags, register_universal_tags, universal_augment
 from c7n.utils import (
-    local_session, generate_arn, get_retry, chunks, camelResource, jmespath_compile, get_path)
+    local_session, generate_arn, get_retry, chunks, camelResource, jmespath_compile, get_path,
+    RateLimiter)
 
 try:
     from botocore.paginate import PageIterator, Paginator
@@ -51,6 +56,8 @@ class ResourceQuery:
                 p.PAGE_ITERATOR_CLS = RetryPageIterator
             results = p.paginate(**params)
             data = results.build_full_result()
+        elif retry:
+            data = retry(getattr(client, enum_op), **params)
         else:
             op = getattr(client, enum_op)
             data = op(**params)
@@ -61,8 +68,26 @@ class ResourceQuery:
 
         return data
 
-    def filter(self, resource_manager, **params):
-        """Query a set of resources."""
+    def _iter_client_enum(self, client, enum_op, params, path, retry=None):
+        """Iterate over the results of an enumeration op a page at a time.
+
+        Unlike :meth:`_invoke_client_enum` the full result set is never
+        held in memory, the path expression is applied to each page.
+        """
+        if not client.can_paginate(enum_op):
+            yield self._invoke_client_enum(client, enum_op, params, path) or []
+            return
+
+        p = client.get_paginator(enum_op)
+        if retry:
+            p.PAGE_ITERATOR_CLS = RetryPageIterator
+        path = path and jmespath_compile(path) or None
+        for page in p.paginate(**params):
+            data = path.search(page) if path else page
+            if data:
+                yield data
+
+    def _get_enum_args(self, resource_manager, params):
         m = self.resolve(resource_manager.resource_type)
         if resource_manager.get_client:
             client = resource_manager.get_client()
@@ -72,10 +97,22 @@ class ResourceQuery:
         enum_op, path, extra_args = m.enum_spec
         if extra_args:
             params = {**extra_args, **params}
+        return client, enum_op, params, path
+
+    def filter(self, resource_manager, **params):
+        """Query a set of resources."""
+        client, enum_op, params, path = self._get_enum_args(resource_manager, params)
         return self._invoke_client_enum(
             client, enum_op, params, path,
             getattr(resource_manager, 'retry', None)) or []
 
+    def iter_filter(self, resource_manager, **params):
+        """Query a set of resources, yielding them a page at a time."""
+        client, enum_op, params, path = self._get_enum_args(resource_manager, params)
+        return self._iter_client_enum(
+            client, enum_op, params, path,
+            getattr(resource_manager, 'retry', None))
+
     def get(self, resource_manager, identities):
         """Get resources by identities
         """
@@ -125,6 +162,24 @@ class ChildResourceQuery(ResourceQuery):
 
     def filter(self, resource_manager, parent_ids=None, **params):
         """Query a set of resources."""
+        results = []
+        for subset in self._iter_children(resource_manager, parent_ids, params, ordered=True):
+            results.extend(subset)
+        return results
+
+    def iter_filter(self, resource_manager, parent_ids=None, **params):
+        """Query a set of resources, yielding each parent's children as
+        their enumeration completes.
+        """
+        return self._iter_children(resource_manager, parent_ids, params)
+
+    def _iter_children(self, resource_manager, parent_ids, params, ordered=False):
+        """Enumerate children, concurrently across parents with the resource
+        manager's executor. Each parent's enumeration retries throttling errors.
+
+        Children are yielded per parent, in parent order if ordered, else as
+        each parent's enumeration completes.
+        """
         m = self.resolve(resource_manager.resource_type)
         if resource_manager.get_client:
             client = resource_manager.get_client()
@@ -136,44 +191,90 @@ class ChildResourceQuery(ResourceQuery):
             params.update(extra_args)
 
         parent_type, parent_key, annotate_parent = m.parent_spec
-        parents = self.manager.get_resource_manager(parent_type)
-        if not parent_ids:
-            parent_ids = []
-            for p in parents.resources(augment=False):
-                if isinstance(p, str):
-                    parent_ids.append(p)
-                else:
-                    parent_ids.append(p[parents.resource_type.id])
+        if not parent_ids and parent_key not in params:
+            parent_ids = parent_cache.get(
+                self.manager.get_resource_manager(parent_type))
 
         # Bail out with no parent ids...
         existing_param = parent_key in params
-        if not existing_param and len(parent_ids) == 0:
-            return []
+        if not existing_param and not parent_ids:
+            return
 
         # Handle a query with parent id
         if existing_param:
-            return self._invoke_client_enum(client, enum_op, params, path)
+            yield self._invoke_client_enum(client, enum_op, params, path) or []
+            return
 
         # Have to query separately for each parent's children.
-        results = []
-        for parent_id in parent_ids:
-            merged_params = self.get_parent_parameters(params, parent_id, parent_key)
-            subset = self._invoke_client_enum(
-                client, enum_op, merged_params, path, retry=self.manager.retry)
-            if annotate_parent:
-                for r in subset:
-                    r[self.parent_key] = parent_id
-            if subset:
-                if self.capture_parent_id:
-                    results.extend([(parent_id, s) for s in subset])
-                else:
-                    results.extend(subset)
-        return results
+        enum_children = functools.partial(
+            self._invoke_child_enum, client, enum_op, params, path, parent_key,
+            annotate_parent)
+        with resource_manager.executor_factory(
+                max_workers=resource_manager.max_workers) as w:
+            futures = [w.submit(enum_children, parent_id) for parent_id in parent_ids]
+            for f in (futures if ordered else as_completed(futures)):
+                subset = f.result()
+                if subset:
+                    yield subset
+
+    def _invoke_child_enum(self, client, enum_op, params, path, parent_key,
+                           annotate_parent, parent_id):
+        merged_params = self.get_parent_parameters(params, parent_id, parent_key)
+        subset = self._invoke_client_enum(
+            client, enum_op, merged_params, path, retry=self.manager.retry)
+        if not subset:
+            return []
+        if annotate_parent:
+            for r in subset:
+                r[self.parent_key] = parent_id
+        if self.capture_parent_id:
+            return [(parent_id, s) for s in subset]
+        return subset
 
     def get_parent_parameters(self, params, parent_id, parent_key):
         return dict(params, **{parent_key: parent_id})
 
 
+class ParentIdCache:
+    """Parent resource ids shared by child resource queries within a run.
+
+    Child resource types with a common parent type (ie. ecs services and
+    tasks) enumerate the parents once. Ids are keyed by the parent
+    manager's resource cache key.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, manager):
+        key = encode(manager.get_cache_key(manager.source.get_query_params(None)))
+        with self.lock:
+            if key in self.data:
+                return self.data[key]
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self.data:
+                parent_ids = []
+                for p in manager.resources(augment=False):
+                    if isinstance(p, str):
+                        parent_ids.append(p)
+                    else:
+                        parent_ids.append(p[manager.resource_type.id])
+                with self.lock:
+                    self.data[key] = parent_ids
+        return self.data[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.locks.clear()
+
+
+parent_cache = ParentIdCache()
+
+
 class QueryMeta(type):
 
     def __new__(cls, name, parents, attrs):
@@ -229,6 +330,24 @@ class DescribeSource:
     def resources(self, query):
         return self.query.filter(self.manager, **query)
 
+    def iter_resources(self, query):
+        return self.query.iter_filter(self.manager, **query)
+
+    @property
+    def streamable(self):
+        """Whether resources can be fetched and augmented a page at a time.
+
+        Only the standard describe query and augment implementations are
+        known to operate on independent subsets of resources.
+        """
+        return (
+            type(self).resources is DescribeSource.resources and
+            type(self).augment in (DescribeSource.augment, DescribeWithResourceTags.augment) and
+            type(self.query).filter in (ResourceQuery.filter, ChildResourceQuery.filter) and
+            type(self.query).iter_filter in (
+                ResourceQuery.iter_filter, ChildResourceQuery.iter_filter) and
+            type(self.query)._invoke_client_enum is ResourceQuery._invoke_client_enum)
+
     def get_query(self):
         return self.resource_query_factory(self.manager.session_factory)
 
@@ -298,28 +417,90 @@ class ConfigSource:
 
     retry = staticmethod(get_retry(('ThrottlingException',)))
 
+    # max resource keys per batch_get_resource_config call
+    batch_size = 100
+
     def __init__(self, manager):
         self.manager = manager
         self.titleCase = self.manager.resource_type.id[0].isupper()
 
+    def validate(self):
+        queries = self.manager.data.get('query', ())
+        if self.get_aggregator() and any('expr' in q for q in queries):
+            # aggregate results are partitioned on the default select's
+            # accountId and awsRegion columns, use a clause to narrow it.
+            raise PolicyValidationError(
+                "config source aggregator queries don't support expr, use clause "
+                "on policy:%s" % self.manager.data.get('name'))
+
     def get_permissions(self):
-        return ["config:GetResourceConfigHistory",
-                "config:ListDiscoveredResources"]
+        perms = ["config:BatchGetResourceConfig",
+                 "config:ListDiscoveredResources",
+                 "config:SelectResourceConfig"]
+        if self.get_aggregator():
+            perms.append("config:SelectAggregateResourceConfig")
+        return perms
 
     def get_resources(self, ids, cache=True):
         client = local_session(self.manager.session_factory).client('config')
-        results = []
-        m = self.manager.get_model()
-        for i in ids:
-            revisions = self.retry(
-                client.get_resource_config_history,
-                resourceId=i,
-                resourceType=m.config_type,
-                limit=1).get('configurationItems')
-            if not revisions:
-                continue
-            results.append(self.load_resource(revisions[0]))
-        return list(filter(None, results))
+        config_type = self.manager.get_model().config_type
+        with self.manager.executor_factory(
+                max_workers=self.manager.max_workers) as w:
+            futures = [
+                w.submit(self.get_config_items, client, config_type, id_set)
+                for id_set in chunks(ids, self.batch_size)]
+            items = {}
+            for f in futures:
+                items.update(f.result())
+            resources = {i: self.load_resource(items[i]) for i in ids if i in items}
+            # batch items don't carry config's tags field, resources that didn't
+            # get tags from their configuration are selected for their tags.
+            untagged = [i for i, r in resources.items() if r is not None and 'Tags' not in r]
+            futures = [
+                w.submit(self.get_resource_tags, client, config_type, id_set)
+                for id_set in chunks(untagged, self.batch_size)]
+            for f in futures:
+                for rid, tags in f.result().items():
+                    resources[rid]['Tags'] = tags
+        return [resources[i] for i in ids if resources.get(i)]
+
+    def get_config_items(self, client, config_type, ids):
+        """Get the current configuration items for a set of resource ids."""
+        items = {}
+        keys = [{'resourceType': config_type, 'resourceId': i} for i in ids]
+        while keys:
+            response = self.retry(client.batch_get_resource_config, resourceKeys=keys)
+            for item in response.get('baseConfigurationItems', ()):
+                items[item['resourceId']] = item
+            keys = response.get('unprocessedResourceKeys')
+        return items
+
+    def get_resource_tags(self, client, config_type, ids):
+        """Get the tags for a set of resource ids with a select."""
+        expr = ("select resourceId, tags where resourceType = '{}' "
+                "and resourceId in ({})").format(
+                    config_type, ", ".join("'%s'" % i for i in ids))
+        resource_tags = {}
+        for page in self.select_resource_config(client, expr):
+            for r in page['Results']:
+                item = json.loads(r)
+                resource_tags[item['resourceId']] = [
+                    {'Key': t['key'], 'Value': t['value']} for t in item.get('tags', ())]
+        return resource_tags
+
+    def select_resource_config(self, client, expr):
+        pager = Paginator(
+            client.select_resource_config,
+            {'input_token': 'NextToken', 'output_token': 'NextToken',
+             'result_key': 'Results'},
+            client.meta.service_model.operation_model('SelectResourceConfig'))
+        pager.PAGE_ITERATOR_CLS = RetryPageIterator
+        return pager.paginate(Expression=expr)
+
+    def get_aggregator(self):
+        for q in self.manager.data.get('query', ()):
+            if 'aggregator' in q:
+                return q
 
     def get_query_params(self, query):
         """Parse config select expression from policy and parameter.
@@ -350,12 +531,21 @@ class ConfigSource:
         else:
             _c = None
 
-        s = ("select resourceId, configuration, supplementaryConfiguration "
-             "where resourceType = '{}'").format(self.manager.resource_type.config_type)
+        aggregator = self.get_aggregator()
+        if aggregator:
+            # aggregate results are partitioned by account and region
+            s = ("select resourceId, accountId, awsRegion, configuration, "
+                 "supplementaryConfiguration where resourceType = '{}'").format(
+                     self.manager.resource_type.config_type)
+        else:
+            s = ("select resourceId, configuration, supplementaryConfiguration "
+                 "where resourceType = '{}'").format(self.manager.resource_type.config_type)
 
         if _c:
             s += "AND {}".format(_c)
 
+        if aggregator:
+            return {'expr': s, 'aggregator': aggregator}
         return {'expr': s}
 
     def load_resource(self, item):
@@ -399,40 +589,68 @@ class ConfigSource:
         paginator.PAGE_ITERATOR_CLS = RetryPageIterator
         pages = paginator.paginate(
             resourceType=self.manager.get_model().config_type)
-        results = []
-
-        with self.manager.executor_factory(max_workers=2) as w:
-            ridents = pages.build_full_result()
-            resource_ids = [
-                r['resourceId'] for r in ridents.get('resourceIdentifiers', ())]
-            self.manager.log.debug(
-                "querying %d %s resources",
-                len(resource_ids),
-                self.manager.__class__.__name__.lower())
-
-            for resource_set in chunks(resource_ids, 50):
-                futures = []
-                futures.append(w.submit(self.get_resources, resource_set))
-                for f in as_completed(futures):
-                    if f.exception():
-                        self.manager.log.error(
-                            "Exception getting resources from config \n %s" % (
-                                f.exception()))
-                    results.extend(f.result())
-        return results
+        ridents = pages.build_full_result()
+        resource_ids = [
+            r['resourceId'] for r in ridents.get('resourceIdentifiers', ())]
+        self.manager.log.debug(
+            "querying %d %s resources",
+            len(resource_ids),
+            self.manager.__class__.__name__.lower())
+        return self.get_resources(resource_ids)
+
+    def get_aggregate_resources(self, query):
+        """Get this account and region's resources from a config aggregator.
+
+        An aggregator select returns the resource type across all of the
+        aggregator's accounts and regions in one stream, the results are
+        cached for the run so policy executions against the other
+        accounts (ie. with c7n-org) reuse them.
+        """
+        aggregator = query['aggregator']
+        key = encode((
+            aggregator['aggregator'], aggregator.get('region'),
+            aggregator.get('role'), query['expr']))
+        partitions = aggregate_cache.get(
+            key, functools.partial(self.select_aggregate_resources, query))
+        account_id = self.manager.config.account_id
+        # global resources are reported in the 'global' region, and
+        # evaluated in the policy's region.
+        return [
+            self.load_resource(json.loads(r)) for r in itertools.chain(
+                partitions.get((account_id, self.manager.config.region), ()),
+                partitions.get((account_id, 'global'), ()))]
+
+    def select_aggregate_resources(self, query):
+        from c7n.credentials import assumed_session
+
+        aggregator = query['aggregator']
+        session = local_session(self.manager.session_factory)
+        if aggregator.get('role'):
+            session = assumed_session(
+                aggregator['role'], 'CustodianConfigAggregator', session=session,
+                region=aggregator.get('region'))
+        client = session.client(
+            'config', region_name=aggregator.get('region', session.region_name))
+        paginator = client.get_paginator('select_aggregate_resource_config')
+        paginator.PAGE_ITERATOR_CLS = RetryPageIterator
+        partitions = {}
+        for page in paginator.paginate(
+                Expression=query['expr'],
+                ConfigurationAggregatorName=aggregator['aggregator']):
+            for r in page['Results']:
+                item = json.loads(r)
+                partitions.setdefault(
+                    (item['accountId'], item['awsRegion']), []).append(r)
+        return partitions
 
     def resources(self, query=None):
-        client = local_session(self.manager.session_factory).client('config')
         query = self.get_query_params(query)
-        pager = Paginator(
-            client.select_resource_config,
-            {'input_token': 'NextToken', 'output_token': 'NextToken',
-             'result_key': 'Results'},
-            client.meta.service_model.operation_model('SelectResourceConfig'))
-        pager.PAGE_ITERATOR_CLS = RetryPageIterator
+        if 'aggregator' in query:
+            return self.get_aggregate_resources(query)
 
+        client = local_session(self.manager.session_factory).client('config')
         results = []
-        for page in pager.paginate(Expression=query['expr']):
+        for page in self.select_resource_config(client, query['expr']):
             results.extend([
                 self.load_resource(json.loads(r)) for r in page['Results']])
 
@@ -447,6 +665,38 @@ class ConfigSource:
         return resources
 
 
+class AggregateConfigCache:
+    """Config aggregator select results shared within a run.
+
+    Results are partitioned by account and region.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, select):
+        with self.lock:
+            if key in self.data:
+                return self.data[key]
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self.data:
+                partitions = select()
+                with self.lock:
+                    self.data[key] = partitions
+        return self.data[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.locks.clear()
+
+
+aggregate_cache = AggregateConfigCache()
+
+
 class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
 
     resource_type = ""
@@ -454,6 +704,11 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
     # TODO Check if we can move to describe source
     max_workers = 3
     chunk_size = 20
+    # max number of resources augmented and filtered together when streaming
+    page_batch_size = 1000
+    # concurrent per resource detail calls, see get_details
+    detail_workers = 8
+    population_count = 0
 
     _generate_arn = None
 
@@ -477,6 +732,11 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
     def source_type(self):
         return self.data.get('source', 'describe')
 
+    def validate(self):
+        validate = getattr(self.source, 'validate', None)
+        if validate:
+            validate()
+
     def get_source(self, source_type):
         if source_type in self.source_mapping:
             return self.source_mapping.get(source_type)(self)
@@ -533,6 +793,9 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
                     "%s.%s" % (self.__class__.__module__, self.__class__.__name__),
                     len(resources)))
 
+            if resources is None and augment and self.can_stream():
+                return self.stream_resources(query or {}, cache_key)
+
             if resources is None:
                 if query is None:
                     query = {}
@@ -542,7 +805,7 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
                     with self.ctx.tracer.subsegment('resource-augment'):
                         resources = self.augment(resources)
                     # Don't pollute cache with unaugmented resources.
-                    self._cache.save(cache_key, resources)
+                    self._cache.save(cache_key, resources, id_key=self.get_model().id)
 
         resource_count = len(resources)
         with self.ctx.tracer.subsegment('filter'):
@@ -553,6 +816,51 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
             self.check_resource_limit(len(resources), resource_count)
         return resources
 
+    def can_stream(self):
+        """Whether resources can be processed as a stream of pages.
+
+        Streaming requires that nothing needs the full resource set,
+        ie. the cache is disabled or saves sets as they're streamed (the
+        sqlite cache), the source fetches and augments pages
+        independently, and all filters are evaluated per resource.
+        """
+        if not self._cache.streamable:
+            return False
+        if type(self).augment is not QueryResourceManager.augment:
+            return False
+        if not getattr(self.source, 'streamable', False):
+            return False
+        return all(map(is_streamable_filter, self.filters))
+
+    def iter_resources(self, query, writer=None):
+        """Yield batches of augmented and filtered resources.
+
+        The count of unfiltered resources seen is tracked on the manager's
+        population_count as pages are consumed. Augmented batches are
+        written to the cache writer, if given, before filtering.
+        """
+        for page in self.source.iter_resources(query):
+            for batch in chunks(page, self.page_batch_size):
+                self.population_count += len(batch)
+                batch = self.augment(batch)
+                if writer is not None:
+                    writer.write(batch)
+                yield self.filter_resources(batch)
+
+    def stream_resources(self, query, cache_key=None):
+        self.population_count = 0
+        resources = []
+        writer = cache_key is not None and self._cache.stream(
+            cache_key, id_key=self.get_model().id) or None
+        with self.ctx.tracer.subsegment('resource-stream'):
+            for batch in self.iter_resources(query, writer):
+                resources.extend(batch)
+        if writer is not None:
+            writer.close()
+        if self.data == self.ctx.policy.data:
+            self.check_resource_limit(len(resources), self.population_count)
+        return resources
+
     def check_resource_limit(self, selection_count, population_count):
         """Check if policy's execution affects more resources then its limit.
 
@@ -563,22 +871,45 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
         max_resource_limits = MaxResourceLimit(p, selection_count, population_count)
         return max_resource_limits.check_resource_limits()
 
-    def _get_cached_resources(self, ids):
+    def _get_cached_resources(self, ids, augment=True):
         key = self.get_cache_key(None)
         with self._cache:
-            resources = self._cache.get(key)
-            if resources is not None:
+            cached = self._cache.get_resources(key, ids)
+            if cached is None:
+                resources = self._cache.get(key)
+                if resources is None:
+                    return None
                 self.log.debug("Using cached results for get_resources")
                 m = self.get_model()
                 id_set = set(ids)
                 return [r for r in resources if r[m.id] in id_set]
-        return None
+        self.log.debug("Using cached results for get_resources")
+        resources = [r for r in cached.values() if r is not None]
+        stale = [i for i in ids if str(i) not in cached]
+        if stale:
+            resources.extend(self._refresh_cached_resources(key, stale, augment))
+        return resources
+
+    def _refresh_cached_resources(self, key, ids, augment=True):
+        """Fetch resources missing or stale in a cached resource set and update it."""
+        try:
+            resources = self.source.get_resources(ids)
+        except ClientError as e:
+            self.log.warning("cached ids not refreshed: %s error:%s" % (ids, e))
+            return []
+        # cached resource sets are augmented
+        if not augment:
+            return resources
+        resources = self.augment(resources)
+        with self._cache:
+            self._cache.update(key, resources, self.get_model().id, ids)
+        return resources
 
     def get_resources(self, ids, cache=True, augment=True):
         if not ids:
             return []
         if cache:
-            resources = self._get_cached_resources(ids)
+            resources = self._get_cached_resources(ids, augment)
             if resources is not None:
                 return resources
         try:
@@ -635,6 +966,69 @@ class QueryResourceManager(ResourceManager, metaclass=QueryMeta):
 
         return arns
 
+    def get_details(self, resources, spec):
+        """Fetch a per resource detail for resources, see DetailSpec.
+
+        Details are memoized onto resources, calls are deduplicated
+        across resources and with details fetched earlier in the run,
+        and run concurrently within the api's rate.
+
+        Returns the resources annotated with the detail, resources which
+        no longer exist are omitted.
+        """
+        service = self.resource_type.service
+        pending = {}
+        for r in resources:
+            if spec.annotation in r:
+                continue
+            params = spec.params(r)
+            key = self.get_detail_key(spec, params)
+            detail = detail_cache.get(key)
+            if detail is not None:
+                r[spec.annotation] = detail
+                continue
+            pending.setdefault(key, (params, []))[1].append(r)
+
+        if pending:
+            client = local_session(self.session_factory).client(
+                service, region_name=self.config.region)
+            limiter = detail_cache.get_limiter(
+                (self.account_id, self.config.region, service, spec.op), spec.rate)
+            with self.executor_factory(max_workers=self.detail_workers) as w:
+                futures = {
+                    w.submit(self._get_detail, client, limiter, spec, params): key
+                    for key, (params, _) in pending.items()}
+                for f in as_completed(futures):
+                    detail = f.result()
+                    if detail is None:
+                        continue
+                    key = futures[f]
+                    detail_cache.set(key, detail)
+                    for r in pending[key][1]:
+                        r[spec.annotation] = detail
+        return [r for r in resources if spec.annotation in r]
+
+    def get_detail_key(self, spec, params):
+        return (self.account_id, self.config.region, self.resource_type.service,
+                spec.op, json.dumps(params, sort_keys=True, default=str))
+
+    def invalidate_details(self, resources, spec):
+        """Drop details fetched earlier in the run, for actions that modify them."""
+        detail_cache.invalidate(
+            [self.get_detail_key(spec, spec.params(r)) for r in resources])
+
+    def _get_detail(self, client, limiter, spec, params):
+        limiter.acquire()
+        try:
+            response = self.retry(getattr(client, spec.op), **params)
+        except ClientError as e:
+            if e.response['Error']['Code'] in spec.missing:
+                self.log.warning(
+                    "Resource not found: %s using %s", spec.op, params)
+                return None
+            raise
+        return spec.select(response)
+
     @property
     def generate_arn(self):
         """ Generates generic arn if ID is not already arn format.
@@ -763,6 +1157,71 @@ def _scalar_augment(manager, model, detail_spec, client, resource_set):
     return results
 
 
+class DetailSpec:
+    """A per resource detail api call, see QueryResourceManager.get_details
+
+    :param op: the client method, ie. describe_instance_attribute
+    :param params: function returning the call's parameters for a resource
+    :param annotation: the resource key the detail is memoized under
+    :param select: function returning the detail from a response, by
+      default the response without its metadata
+    :param missing: error codes for resources which no longer exist
+    :param rate: max calls per second for an account and region
+    """
+
+    def __init__(self, op, params, annotation, select=None, missing=(), rate=20):
+        self.op = op
+        self.params = params
+        self.annotation = annotation
+        self.select = select or self.strip_metadata
+        self.missing = missing
+        self.rate = rate
+
+    @staticmethod
+    def strip_metadata(response):
+        response.pop('ResponseMetadata', None)
+        return response
+
+
+class DetailCache:
+    """Per resource details and api rate limits shared within a run."""
+
+    def __init__(self, size=100000):
+        self.size = size
+        self.data = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def set(self, key, detail):
+        with self.lock:
+            self.data[key] = detail
+            if len(self.data) > self.size:
+                self.data.pop(next(iter(self.data)))
+
+    def invalidate(self, keys):
+        with self.lock:
+            for k in keys:
+                self.data.pop(k, None)
+
+    def get_limiter(self, key, rate):
+        with self.lock:
+            if key not in self.limiters:
+                self.limiters[key] = RateLimiter(rate)
+            return self.limiters[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.limiters.clear()
+
+
+detail_cache = DetailCache()
+
+
 class RetryPageIterator(PageIterator):
 
     retry = staticmethod(QueryResourceManager.retry)
@@ -41,9 +41,14 @@ class PluginRegistry:
         self.plugin_type = plugin_type
         self._factories = {}
         self._subscribers = []
+        self._notified = {}
 
     def subscribe(self, func):
         self._subscribers.append(func)
+        # modules imported lazily subscribe after some plugins have
+        # been loaded, replay those notifications.
+        for key in list(self._notified):
+            func(self, key)
 
     def register(self, name, klass=None, condition=True,
                  condition_message="Missing dependency for {}",
@@ -72,6 +77,8 @@ class PluginRegistry:
             del self._factories[name]
 
     def notify(self, key=None):
+        if key is not None:
+            self._notified[key] = True
         for subscriber in self._subscribers:
             subscriber(self, key)
 
@@ -32,9 +32,7 @@ from concurrent.futures import as_completed
 
 import csv
 from datetime import datetime
-import gzip
 import io
-import json
 import logging
 import os
 from tabulate import tabulate
@@ -43,6 +41,7 @@ from botocore.compat import OrderedDict
 from dateutil.parser import parse as date_parse
 
 from c7n.executor import ThreadPoolExecutor
+from c7n.output import RESOURCE_FILES, load_records
 from c7n.utils import local_session, dumps, jmespath_search, jmespath_compile, get_path
 
 log = logging.getLogger('custodian.reports')
@@ -236,16 +235,18 @@ class Formatter:
 
 
 def fs_record_set(output_path, policy_name):
-    record_path = os.path.join(output_path, 'resources.json')
-
-    if not os.path.exists(record_path):
+    for f in RESOURCE_FILES:
+        record_path = os.path.join(output_path, f)
+        if os.path.exists(record_path):
+            break
+    else:
         return []
 
     mdate = datetime.fromtimestamp(
         os.stat(record_path).st_ctime)
 
-    with open(record_path) as fh:
-        records = json.load(fh)
+    with open(record_path, 'rb') as fh:
+        records = load_records(fh, record_path)
         [r.__setitem__('CustodianDate', mdate) for r in records]
         return records
 
@@ -280,7 +281,7 @@ def record_set(session_factory, bucket, key_prefix, start_date, specify_hour=Fal
             if 'Contents' not in key_set:
                 continue
             keys = [k for k in key_set['Contents']
-                    if k['Key'].endswith('resources.json.gz')]
+                    if k['Key'].endswith(RESOURCE_FILES[1:])]
             key_count += len(keys)
             futures = map(lambda k: w.submit(
                 get_records, bucket, k, session_factory), keys)
@@ -298,7 +299,8 @@ def get_records(bucket, key, session_factory):
     # though we're talking about a 10k objects, else
     # we should spool to temp files
 
-    # key ends with 'YYYY/mm/dd/HH/resources.json.gz'
+    # key ends with 'YYYY/mm/dd/HH/resources.json.gz', or another
+    # resource format's file name.
     # so take the date parts only
     date_str = '-'.join(key['Key'].rsplit('/', 5)[-5:-1])
     custodian_date = date_parse(date_str)
@@ -306,7 +308,7 @@ def get_records(bucket, key, session_factory):
     result = s3.get_object(Bucket=bucket, Key=key['Key'])
     blob = io.BytesIO(result['Body'].read())
 
-    records = json.load(gzip.GzipFile(fileobj=blob))
+    records = load_records(blob, key['Key'])
     log.debug("bucket: %s key: %s records: %d",
               bucket, key['Key'], len(records))
     for r in records:
@@ -11,7 +11,7 @@ from urllib.parse import parse_qsl, urlparse
 import zlib
 from contextlib import closing
 
-from c7n.cache import NullCache
+from c7n.cache import NullCache, shared_factory
 from c7n.utils import format_string_values, local_session, jmespath_search
 
 log = logging.getLogger('custodian.resolver')
@@ -21,26 +21,35 @@ ZIP_OR_GZIP_HEADER_DETECT = zlib.MAX_WBITS | 32
 
 class URIResolver:
 
-    def __init__(self, session_factory, cache):
+    def __init__(self, session_factory, cache, shared_cache=None):
         self.session_factory = session_factory
         self.cache = cache
+        self.shared_cache = shared_cache
 
     def resolve(self, uri, headers):
         contents = self.cache.get(("uri-resolver", uri))
         if contents is not None:
             return contents
 
-        if uri.startswith('s3://'):
-            contents = self.get_s3_uri(uri)
+        if self.shared_cache is not None:
+            # single flight across processes sharing the cache, ie. c7n-org
+            # workers, only one of them fetches a given uri.
+            contents = self.shared_cache.get_or_fetch(
+                ("uri-resolver", uri), lambda: self.fetch(uri, headers))
         else:
-            headers.update({"Accept-Encoding": "gzip"})
-            req = Request(uri, headers=headers)
-            with closing(urlopen(req)) as response:  # nosec nosemgrep
-                contents = self.handle_response_encoding(response)
+            contents = self.fetch(uri, headers)
 
         self.cache.save(("uri-resolver", uri), contents)
         return contents
 
+    def fetch(self, uri, headers):
+        if uri.startswith('s3://'):
+            return self.get_s3_uri(uri)
+        headers.update({"Accept-Encoding": "gzip"})
+        req = Request(uri, headers=headers)
+        with closing(urlopen(req)) as response:  # nosec nosemgrep
+            return self.handle_response_encoding(response)
+
     def handle_response_encoding(self, response):
         if response.info().get('Content-Encoding') != 'gzip':
             return response.read().decode('utf-8')
@@ -142,7 +151,9 @@ class ValuesFrom:
         self.data = format_string_values(data, **config_args)
         self.manager = manager
         self.cache = manager._cache or NullCache({})
-        self.resolver = URIResolver(manager.session_factory, self.cache)
+        self.resolver = URIResolver(
+            manager.session_factory, self.cache,
+            shared_factory(manager.config))
 
     def get_contents(self):
         _, format = os.path.splitext(self.data['url'])
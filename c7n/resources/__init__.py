@@ -8,7 +8,13 @@ from c7n.provider import clouds
 LOADED = set()
 
 
-def load_resources(resource_types=('*',)):
+def load_resources(resource_types=('*',), element_types=()):
+    """Load the given resource types.
+
+    Element types are the filter, action and mode type names policies
+    reference, modules registering those across resource types are
+    imported per the provider's extension map.
+    """
     pmap = {}
     for r in resource_types:
         parts = r.split('.', 1)
@@ -25,6 +31,10 @@ def load_resources(resource_types=('*',)):
         elif pname in pmap:
             _, not_found = p.get_resource_types(pmap[pname])
             missing.extend(not_found)
+        else:
+            continue
+        if element_types:
+            p.load_extensions(element_types)
     return missing
 
 
@@ -62,12 +72,10 @@ def load_available(resources=True):
 def load_providers(provider_types):
     global LOADED
 
-    # Even though we're lazy loading resources we still need to import
-    # those that are making available generic filters/actions
+    # modules making available generic filters/actions are imported
+    # on reference, see Provider.extension_map
     if should_load_provider('aws', provider_types):
-        import c7n.resources.securityhub
-        import c7n.resources.sfn
-        import c7n.resources.ssm # NOQA
+        import c7n.resources.aws # NOQA
 
     if should_load_provider('awscc', provider_types):
         from c7n_awscc.entry import initialize_awscc
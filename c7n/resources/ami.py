@@ -15,7 +15,7 @@ from c7n.exceptions import ClientError, PolicyValidationError
 from c7n.filters import (
     AgeFilter, ValueFilter, Filter, CrossAccountAccessFilter)
 from c7n.manager import resources
-from c7n.query import QueryResourceManager, DescribeSource, TypeInfo
+from c7n.query import QueryResourceManager, DescribeSource, DetailSpec, TypeInfo
 from c7n.resolver import ValuesFrom
 from c7n.utils import (
     local_session,
@@ -719,19 +719,19 @@ class ImageAttribute(ValueFilter):
 
     def process(self, resources, event=None):
         attribute = self.data['attribute']
-        self.get_image_attribute(resources, attribute)
+        resources = self.get_image_attribute(resources, attribute)
         return [resource for resource in resources
                 if self.match(resource['c7n:attribute-%s' % attribute])]
 
     def get_image_attribute(self, resources, attribute):
-        client = local_session(
-            self.manager.session_factory).client('ec2')
+        return self.manager.get_details(resources, DetailSpec(
+            'describe_image_attribute',
+            lambda r: {'ImageId': r['ImageId'], 'Attribute': attribute},
+            'c7n:attribute-%s' % attribute,
+            select=select_image_attribute,
+            missing=('InvalidAMIID.NotFound', 'InvalidAMIID.Unavailable')))
 
-        for resource in resources:
-            image_id = resource['ImageId']
-            fetched_attribute = self.manager.retry(
-                client.describe_image_attribute,
-                ImageId=image_id,
-                Attribute=attribute)
-            keys = set(fetched_attribute) - {'ResponseMetadata', 'ImageId'}
-            resource['c7n:attribute-%s' % attribute] = fetched_attribute[keys.pop()]
+
+def select_image_attribute(response):
+    keys = set(response) - {'ResponseMetadata', 'ImageId'}
+    return response[keys.pop()]
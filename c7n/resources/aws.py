@@ -4,18 +4,15 @@
 from c7n.provider import clouds, Provider
 
 from collections import Counter, namedtuple
-import contextlib
 import copy
 import datetime
+import importlib.util
 import itertools
 import logging
-import os
 import operator
 import socket
 import sys
 import time
-import threading
-import traceback
 from urllib import parse as urlparse
 from urllib.request import urlopen, Request
 from urllib.error import HTTPError, URLError
@@ -26,11 +23,11 @@ from botocore.validate import ParamValidator
 from boto3.s3.transfer import S3Transfer
 
 from c7n.credentials import SessionFactory
-from c7n.config import Bag
 from c7n.exceptions import InvalidOutputConfig, PolicyValidationError
 from c7n.log import CloudWatchLogHandler
 from c7n.utils import parse_url_config, backoff_delays
 
+from .extension_map import ExtensionMap
 from .resource_map import ResourceMap
 
 # Import output registries aws provider extends.
@@ -55,13 +52,26 @@ from c7n import credentials, utils
 
 log = logging.getLogger('custodian.aws')
 
-try:
-    from aws_xray_sdk.core import xray_recorder, patch
-    from aws_xray_sdk.core.context import Context
-    HAVE_XRAY = True
-except ImportError:
-    HAVE_XRAY = False
-    class Context: pass  # NOQA
+# the xray sdk is imported on use, see c7n.xray
+HAVE_XRAY = importlib.util.find_spec('aws_xray_sdk') is not None
+
+
+def __getattr__(name):
+    # compatibility for the xray classes that moved to c7n.xray
+    if name in ('XrayContext', 'XrayEmitter', 'XrayTracer'):
+        from c7n import xray
+        return getattr(xray, name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def xray_tracer(ctx, config):
+    # c7n.xray registers the tracer class itself when imported
+    from c7n.xray import XrayTracer
+    return XrayTracer(ctx, config)
+
+
+tracer_outputs.register('xray', xray_tracer, condition=HAVE_XRAY)
+
 
 _profile_session = None
 
@@ -481,178 +491,14 @@ class CloudWatchLogOutput(LogOutput):
             self.ctx.policy.name)
 
 
-class XrayEmitter:
-    # implement https://github.com/aws/aws-xray-sdk-python/issues/51
-
-    def __init__(self):
-        self.buf = []
-        self.client = None
-
-    def send_entity(self, entity):
-        self.buf.append(entity)
-        if len(self.buf) > 49:
-            self.flush()
-
-    def flush(self):
-        buf = self.buf
-        self.buf = []
-        for segment_set in utils.chunks(buf, 50):
-            self.client.put_trace_segments(
-                TraceSegmentDocuments=[s.serialize() for s in segment_set])
-
-
-class XrayContext(Context):
-    """Specialized XRay Context for Custodian.
-
-    A context is used as a segment storage stack for currently in
-    progress segments.
-
-    We use a customized context for custodian as policy execution
-    commonly uses a concurrent.futures threadpool pattern during
-    execution for api concurrency. Default xray semantics would use
-    thread local storage and treat each of those as separate trace
-    executions. We want to aggregate/associate all thread pool api
-    executions to the custoidan policy execution. XRay sdk supports
-    this via manual code for every thread pool usage, but we don't
-    want to explicitly couple xray integration everywhere across the
-    codebase. Instead we use a context that is aware of custodian
-    usage of threads and associates subsegments therein to the policy
-    execution active subsegment.
-    """
-
-    def __init__(self, *args, **kw):
-        super(XrayContext, self).__init__(*args, **kw)
-        self._local = Bag()
-        self._current_subsegment = None
-        self._main_tid = threading.get_ident()
-
-    def handle_context_missing(self):
-        """Custodian has a few api calls out of band of policy execution.
-
-        - Resolving account alias.
-        - Cloudwatch Log group/stream discovery/creation (when using -l on cli)
-
-        Also we want to folks to optionally based on configuration using xray
-        so default to disabling context missing output.
-        """
-
-    # Annotate any segments/subsegments with their thread ids.
-    def put_segment(self, segment):
-        if getattr(segment, 'thread_id', None) is None:
-            segment.thread_id = threading.get_ident()
-        super().put_segment(segment)
-
-    def put_subsegment(self, subsegment):
-        if getattr(subsegment, 'thread_id', None) is None:
-            subsegment.thread_id = threading.get_ident()
-        super().put_subsegment(subsegment)
-
-    # Override since we're not just popping the end of the stack, we're removing
-    # the thread subsegment from the array by identity.
-    def end_subsegment(self, end_time):
-        subsegment = self.get_trace_entity()
-        if self._is_subsegment(subsegment):
-            subsegment.close(end_time)
-            self._local.entities.remove(subsegment)
-            return True
-        else:
-            log.warning("No subsegment to end.")
-            return False
-
-    # Override get trace identity, any worker thread will find its own subsegment
-    # on the stack, else will use the main thread's sub/segment
-    def get_trace_entity(self):
-        tid = threading.get_ident()
-        entities = self._local.get('entities', ())
-        for s in reversed(entities):
-            if s.thread_id == tid:
-                return s
-            # custodian main thread won't advance (create new segment)
-            # with worker threads still doing pool work.
-            elif s.thread_id == self._main_tid:
-                return s
-        return self.handle_context_missing()
-
-
-@tracer_outputs.register('xray', condition=HAVE_XRAY)
-class XrayTracer:
-
-    emitter = XrayEmitter()
-
-    in_lambda = 'LAMBDA_TASK_ROOT' in os.environ
-    use_daemon = 'AWS_XRAY_DAEMON_ADDRESS' in os.environ
-    service_name = 'custodian'
-
-    @classmethod
-    def initialize(cls, config):
-        context = XrayContext()
-        sampling = config.get('sample', 'true') == 'true' and True or False
-        xray_recorder.configure(
-            emitter=cls.use_daemon is False and cls.emitter or None,
-            context=context,
-            sampling=sampling,
-            context_missing='LOG_ERROR')
-        patch(['boto3', 'requests'])
-        logging.getLogger('aws_xray_sdk.core').setLevel(logging.ERROR)
-
-    def __init__(self, ctx, config):
-        self.ctx = ctx
-        self.config = config or {}
-        self.client = None
-        self.metadata = {}
-
-    @contextlib.contextmanager
-    def subsegment(self, name):
-        segment = xray_recorder.begin_subsegment(name)
-        try:
-            yield segment
-        except Exception as e:
-            stack = traceback.extract_stack(limit=xray_recorder.max_trace_back)
-            segment.add_exception(e, stack)
-            raise
-        finally:
-            xray_recorder.end_subsegment(time.time())
-
-    def __enter__(self):
-        if self.client is None:
-            self.client = self.ctx.session_factory(assume=False).client('xray')
-
-        self.emitter.client = self.client
-
-        if self.in_lambda:
-            self.segment = xray_recorder.begin_subsegment(self.service_name)
-        else:
-            self.segment = xray_recorder.begin_segment(
-                self.service_name, sampling=True)
-
-        p = self.ctx.policy
-        xray_recorder.put_annotation('policy', p.name)
-        xray_recorder.put_annotation('resource', p.resource_type)
-        if self.ctx.options.account_id:
-            xray_recorder.put_annotation('account', self.ctx.options.account_id)
-
-    def __exit__(self, exc_type=None, exc_value=None, exc_traceback=None):
-        metadata = self.ctx.get_metadata(('api-stats',))
-        metadata.update(self.metadata)
-        xray_recorder.put_metadata('custodian', metadata)
-        if self.in_lambda:
-            xray_recorder.end_subsegment()
-            return
-        xray_recorder.end_segment()
-        if not self.use_daemon:
-            self.emitter.flush()
-            log.info(
-                ('View XRay Trace https://console.aws.amazon.com/xray/home?region=%s#/'
-                 'traces/%s' % (self.ctx.options.region, self.segment.trace_id)))
-        self.metadata.clear()
-
-
 @api_stats_outputs.register('aws')
 class ApiStats(DeltaStats):
 
     def __init__(self, ctx, config=None):
         super(ApiStats, self).__init__(ctx, config)
         self.api_calls = Counter()
+        # throttled responses, including those retried by botocore
+        self.throttles = Counter()
 
     def get_snapshot(self):
         return dict(self.api_calls)
@@ -671,8 +517,11 @@ class ApiStats(DeltaStats):
 
         # With cached sessions, we need to unregister any events subscribers
         # on extant sessions to allow for the next registration.
-        utils.local_session(self.ctx.session_factory).events.unregister(
+        events = utils.local_session(self.ctx.session_factory).events
+        events.unregister(
             'after-call.*.*', self._record, unique_id='c7n-api-stats')
+        events.unregister(
+            'needs-retry.*.*', self._record_retry, unique_id='c7n-api-stats-retry')
 
         self.ctx.metrics.put_metric(
             "ApiCalls", sum(self.api_calls.values()), "Count")
@@ -681,11 +530,22 @@ class ApiStats(DeltaStats):
     def __call__(self, s):
         s.events.register(
             'after-call.*.*', self._record, unique_id='c7n-api-stats')
+        s.events.register(
+            'needs-retry.*.*', self._record_retry, unique_id='c7n-api-stats-retry')
 
     def _record(self, http_response, parsed, model, **kwargs):
         self.api_calls["%s.%s" % (
             model.service_model.endpoint_prefix, model.name)] += 1
 
+    def _record_retry(self, response=None, operation=None, **kwargs):
+        # called for each attempt, response is an (http response, parsed) tuple
+        if response is None or operation is None:
+            return
+        code = response[1].get('Error', {}).get('Code')
+        if code in utils.THROTTLE_CODES:
+            self.throttles["%s.%s" % (
+                operation.service_model.endpoint_prefix, operation.name)] += 1
+
 
 @blob_outputs.register('s3')
 class S3Output(BlobOutput):
@@ -705,6 +565,12 @@ class S3Output(BlobOutput):
         super().__init__(ctx, config)
         self._transfer = None
 
+    def __enter__(self):
+        # streamed uploads run on other threads, after the environment's
+        # credentials may have changed, so the client is created up front.
+        if self.stream:
+            self.transfer
+
     @property
     def transfer(self):
         if self._transfer:
@@ -731,6 +597,8 @@ class AWS(Provider):
     resources = PluginRegistry('resources')
     # import paths for resources
     resource_map = ResourceMap
+    # import paths for generic filters, actions and modes
+    extension_map = ExtensionMap
 
     def initialize(self, options):
         """
@@ -740,6 +608,7 @@ class AWS(Provider):
         _default_bucket_region(options)
 
         if options.tracer and options.tracer.startswith('xray') and HAVE_XRAY:
+            from c7n.xray import XrayTracer
             XrayTracer.initialize(utils.parse_url_config(options.tracer))
         return options
 
@@ -36,6 +36,7 @@ from c7n.utils import (
     group_by
 )
 from c7n.resources.ami import AMI
+from c7n.resources.ec2 import instance_attribute
 
 log = logging.getLogger('custodian.ebs')
 
@@ -1237,6 +1238,9 @@ class EncryptInstanceVolumes(BaseAction):
                         }
                     ]
                 )
+        # the instance's block device mapping changed
+        self.manager.invalidate_details(
+            [{'InstanceId': instance_id}], instance_attribute('blockDeviceMapping'))
 
         if instance_running:
             client.start_instances(InstanceIds=[instance_id])
@@ -288,6 +288,25 @@ class AttachedVolume(ValueFilter):
         return self.operator(map(self.match, volumes))
 
 
+def instance_attribute(attribute):
+    """Get the detail spec for an instance attribute.
+
+    The detail is the attribute's value, ie. ``{'Value': True}``, and is
+    shared by the filters on the attribute.
+    """
+    return query.DetailSpec(
+        'describe_instance_attribute',
+        lambda r: {'Attribute': attribute, 'InstanceId': r['InstanceId']},
+        'c7n:attribute-%s' % attribute,
+        select=select_attribute,
+        missing=('InvalidInstanceID.NotFound',))
+
+
+def select_attribute(response):
+    keys = set(response) - {'ResponseMetadata', 'InstanceId'}
+    return response[keys.pop()]
+
+
 @filters.register('stop-protected')
 class DisableApiStop(Filter):
     """EC2 instances with ``disableApiStop`` attribute set
@@ -318,20 +337,11 @@ class DisableApiStop(Filter):
 
     schema = type_schema('stop-protected')
     permissions = ('ec2:DescribeInstanceAttribute',)
+    detail = instance_attribute('disableApiStop')
 
     def process(self, resources: List[dict], event=None) -> List[dict]:
-        client = utils.local_session(
-            self.manager.session_factory).client('ec2')
-        return [r for r in resources
-                if self._is_stop_protection_enabled(client, r)]
-
-    def _is_stop_protection_enabled(self, client, instance: dict) -> bool:
-        attr_val = self.manager.retry(
-            client.describe_instance_attribute,
-            Attribute='disableApiStop',
-            InstanceId=instance['InstanceId']
-        )
-        return attr_val['DisableApiStop']['Value']
+        return [r for r in self.manager.get_details(resources, self.detail)
+                if r[self.detail.annotation]['Value']]
 
     def validate(self) -> None:
         botocore_min_version = '1.26.7'
@@ -380,19 +390,11 @@ class DisableApiTermination(Filter):
         perms.extend(self.manager.get_permissions())
         return perms
 
+    detail = instance_attribute('disableApiTermination')
+
     def process(self, resources, event=None):
-        client = utils.local_session(
-            self.manager.session_factory).client('ec2')
-        return [r for r in resources
-                if self.is_termination_protection_enabled(client, r)]
-
-    def is_termination_protection_enabled(self, client, inst):
-        attr_val = self.manager.retry(
-            client.describe_instance_attribute,
-            Attribute='disableApiTermination',
-            InstanceId=inst['InstanceId']
-        )
-        return attr_val['DisableApiTermination']['Value']
+        return [r for r in self.manager.get_details(resources, self.detail)
+                if r[self.detail.annotation]['Value']]
 
 
 class InstanceImageBase:
@@ -766,8 +768,8 @@ class UserData(ValueFilter):
 
     schema = type_schema('user-data', rinherit=ValueFilter.schema)
     schema_alias = False
-    batch_size = 50
     annotation = 'c7n:user-data'
+    detail = instance_attribute('userData')
     permissions = ('ec2:DescribeInstanceAttribute',)
 
     def __init__(self, data, manager):
@@ -775,41 +777,15 @@ class UserData(ValueFilter):
         self.data['key'] = '"c7n:user-data"'
 
     def process(self, resources, event=None):
-        client = utils.local_session(self.manager.session_factory).client('ec2')
-        results = []
-        with self.executor_factory(max_workers=3) as w:
-            futures = {}
-            for instance_set in utils.chunks(resources, self.batch_size):
-                futures[w.submit(
-                    self.process_instance_set,
-                    client, instance_set)] = instance_set
-
-            for f in as_completed(futures):
-                if f.exception():
-                    self.log.error(
-                        "Error processing userdata on instance set %s", f.exception())
-                results.extend(f.result())
-        return results
-
-    def process_instance_set(self, client, resources):
-        results = []
-        for r in resources:
-            if self.annotation not in r:
-                try:
-                    result = client.describe_instance_attribute(
-                        Attribute='userData',
-                        InstanceId=r['InstanceId'])
-                except ClientError as e:
-                    if e.response['Error']['Code'] == 'InvalidInstanceId.NotFound':
-                        continue
-                if 'Value' not in result['UserData']:
-                    r[self.annotation] = None
-                else:
-                    r[self.annotation] = deserialize_user_data(
-                        result['UserData']['Value'])
-            if self.match(r):
-                results.append(r)
-        return results
+        pending = [r for r in resources if self.annotation not in r]
+        for r in self.manager.get_details(pending, self.detail):
+            # only the decoded user data is kept on the resource
+            user_data = r.pop(self.detail.annotation)
+            if 'Value' not in user_data:
+                r[self.annotation] = None
+            else:
+                r[self.annotation] = deserialize_user_data(user_data['Value'])
+        return [r for r in resources if self.annotation in r and self.match(r)]
 
 
 @filters.register('singleton')
@@ -1475,6 +1451,7 @@ class Resize(BaseAction):
                 client.modify_instance_attribute(
                     InstanceId=i['InstanceId'],
                     InstanceType={'Value': new_type})
+                self.manager.invalidate_details([i], instance_attribute('instanceType'))
             except ClientError as e:
                 self.log.exception(
                     "Exception resizing instance:%s new:%s old:%s \n %s" % (
@@ -1588,6 +1565,7 @@ class Stop(BaseAction):
                 if e.response['Error']['Code'] == 'IncorrectInstanceState':
                     return
                 raise
+            self.manager.invalidate_details([i], instance_attribute(attribute))
 
         def process_instance(i, op):
             modify_instance(i, 'disableApiStop')
@@ -1765,6 +1743,7 @@ class Terminate(BaseAction):
                 if e.response['Error']['Code'] == 'IncorrectInstanceState':
                     return
                 raise
+            self.manager.invalidate_details([i], instance_attribute(attribute))
 
         def process_instance(i):
             modify_instance(i, 'disableApiTermination')
@@ -2277,25 +2256,12 @@ class InstanceAttribute(ValueFilter):
 
     def process(self, resources, event=None):
         attribute = self.data['attribute']
-        self.get_instance_attribute(resources, attribute)
+        resources = self.get_instance_attribute(resources, attribute)
         return [resource for resource in resources
                 if self.match(resource['c7n:attribute-%s' % attribute])]
 
     def get_instance_attribute(self, resources, attribute):
-        client = utils.local_session(
-            self.manager.session_factory).client('ec2')
-
-        for resource in resources:
-            instance_id = resource['InstanceId']
-            fetched_attribute = self.manager.retry(
-                client.describe_instance_attribute,
-                Attribute=attribute,
-                InstanceId=instance_id)
-            keys = list(fetched_attribute.keys())
-            keys.remove('ResponseMetadata')
-            keys.remove('InstanceId')
-            resource['c7n:attribute-%s' % attribute] = fetched_attribute[
-                keys[0]]
+        return self.manager.get_details(resources, instance_attribute(attribute))
 
 
 @resources.register('launch-template-version')
@@ -0,0 +1,19 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+# generated by tools/dev/extensionmap.py
+ExtensionMap = {
+  "actions": {
+    "invoke-sfn": "c7n.resources.sfn",
+    "post-finding": "c7n.resources.securityhub",
+    "post-item": "c7n.resources.ssm"
+  },
+  "filters": {
+    "finding": "c7n.resources.securityhub",
+    "json-diff": "c7n.filters.revisions",
+    "ops-item": "c7n.resources.ssm"
+  },
+  "modes": {
+    "hub-action": "c7n.resources.securityhub",
+    "hub-finding": "c7n.resources.securityhub"
+  }
+}
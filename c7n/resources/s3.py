@@ -63,7 +63,7 @@ from c7n.resources.securityhub import PostFinding
 from c7n.tags import RemoveTag, Tag, TagActionFilter, TagDelayedAction
 from c7n.utils import (
     chunks, local_session, set_annotation, type_schema, filter_empty,
-    dumps, format_string_values, get_account_alias_from_sts)
+    dumps, format_string_values, get_account_alias_from_sts, parse_path)
 from c7n.resources.aws import inspect_bucket_region
 
 
@@ -79,14 +79,31 @@ MAX_COPY_SIZE = 1024 * 1024 * 1024 * 2
 
 class DescribeS3(query.DescribeSource):
 
+    # bucket augments are independent calls, fanned out across buckets
+    # and augments.
+    max_workers = 20
+
     def augment(self, buckets):
+        augments = self.manager.get_augments()
+        if not buckets or not augments:
+            return buckets
+        # learned bucket regions
+        regions = {}
         with self.manager.executor_factory(
-                max_workers=min((10, len(buckets) + 1))) as w:
-            results = w.map(
-                assemble_bucket,
-                zip(itertools.repeat(self.manager.session_factory), buckets))
-            results = list(filter(None, results))
-            return results
+                max_workers=min(self.max_workers, len(buckets) * len(augments))) as w:
+            # locations first, they determine the region of the other calls.
+            for stage in (
+                    [a for a in augments if a[1] == 'Location'],
+                    [a for a in augments if a[1] != 'Location']):
+                futures = [
+                    (b, minfo, w.submit(
+                        get_bucket_augment,
+                        self.manager.session_factory, b, minfo, regions))
+                    for b in buckets for minfo in stage]
+                # apply in order so results don't depend on completion order
+                for b, minfo, f in futures:
+                    apply_bucket_augment(b, minfo, f.result(), regions)
+        return buckets
 
 
 class ConfigS3(query.ConfigSource):
@@ -399,6 +416,80 @@ class S3(query.QueryResourceManager):
         perms.extend([n[-1] for n in S3_AUGMENT_TABLE])
         return perms
 
+    def get_augment_keys(self):
+        """Get the bucket augment keys a policy uses, None for all of them.
+
+        Only a policy's own filters and actions are considered, buckets
+        fetched for other uses, or by policies without any filters or
+        actions, are fully augmented. The location is always fetched,
+        as it determines the bucket's api region.
+        """
+        if 'resource' not in self.data or not (self.filters or self.actions):
+            return None
+        keys = {'Location'}
+        for e in itertools.chain(self.iter_filters(), self.actions):
+            if e.type in ('and', 'or', 'not'):
+                continue
+            e_keys = get_augment_keys(e)
+            if e_keys is None:
+                return None
+            keys.update(e_keys)
+        return keys
+
+    def get_augments(self):
+        keys = self.get_augment_keys()
+        if keys is None:
+            return list(S3_AUGMENT_TABLE)
+        return [a for a in S3_AUGMENT_TABLE if a[1] in keys]
+
+    def get_cache_key(self, query):
+        key = super().get_cache_key(query)
+        keys = self.get_augment_keys()
+        if keys is not None:
+            key['augments'] = sorted(keys)
+        return key
+
+
+# augment keys for generic filters and actions
+GENERIC_AUGMENT_KEYS = {
+    'event': (),
+    'marked-for-op': ('Tags',),
+    'put-metric': (),
+}
+
+
+def get_augment_keys(element):
+    """Get the augment keys a bucket filter or action uses, None if unknown.
+
+    Bucket elements declare their keys with an `augment_keys` attribute,
+    value filters use the top level keys of their paths, including an
+    expr value's.
+    """
+    if element.type in GENERIC_AUGMENT_KEYS:
+        return GENERIC_AUGMENT_KEYS[element.type]
+    if type(element) is not ValueFilter:
+        return getattr(element, 'augment_keys', None)
+    if len(element.data) == 1:
+        paths = list(element.data)
+    elif element.data.get('value_type') == 'resource_count':
+        return ()
+    else:
+        paths = [element.data.get('key'), element.data.get('value_path')]
+        if element.data.get('value_type') == 'expr':
+            if not isinstance(element.data.get('value'), str):
+                return None
+            paths.append(element.data['value'])
+    keys = set()
+    for p in filter(None, paths):
+        if p.startswith('tag:'):
+            keys.add('Tags')
+            continue
+        segments = parse_path(p)
+        if not segments:
+            return None
+        keys.add(segments[0])
+    return keys
+
 
 S3_CONFIG_SUPPLEMENT_NULL_MAP = {
     'BucketLoggingConfiguration': u'{"destinationBucketName":null,"logFilePrefix":null}',
@@ -431,75 +522,85 @@ S3_AUGMENT_TABLE = (
 )
 
 
-def assemble_bucket(item):
-    """Assemble a document representing all the config state around a bucket.
+# augment outcomes other than a value
+AUGMENT_DENIED = object()
+AUGMENT_SKIPPED = object()
+
 
-    TODO: Refactor this, the logic here feels quite muddled.
+def get_bucket_augment(factory, b, minfo, regions):
+    """Fetch one augment of a bucket.
+
+    Calls are made in the bucket's region once known. A redirected
+    call is retried in the region the redirect names, which is
+    remembered for the bucket's remaining calls.
     """
-    factory, b = item
-    s = factory()
-    c = s.client('s3')
-    # Bucket Location, Current Client Location, Default Location
-    b_location = c_location = location = "us-east-1"
-    methods = list(S3_AUGMENT_TABLE)
-    for minfo in methods:
-        m, k, default, select = minfo[:4]
+    m, _, default, select = minfo[:4]
+    region = regions.get(b['Name'])
+    while True:
+        client = local_session(factory).client('s3', region_name=region)
         try:
-            method = getattr(c, m)
-            v = method(Bucket=b['Name'])
-            v.pop('ResponseMetadata')
-            if select is not None and select in v:
-                v = v[select]
+            v = getattr(client, m)(Bucket=b['Name'])
+            break
         except (ssl.SSLError, SSLError) as e:
             # Proxy issues? i assume
             log.warning("Bucket ssl error %s: %s %s",
                         b['Name'], b.get('Location', 'unknown'),
                         e)
-            continue
+            return AUGMENT_SKIPPED
         except ClientError as e:
             code = e.response['Error']['Code']
             if code.startswith("NoSuch") or "NotFound" in code:
-                v = default
+                return default
             elif code == 'PermanentRedirect':
-                s = factory()
-                c = bucket_client(s, b)
-                # Requeue with the correct region given location constraint
-                methods.append((m, k, default, select))
-                continue
-            else:
-                log.warning(
-                    "Bucket:%s unable to invoke method:%s error:%s ",
-                    b['Name'], m, e.response['Error']['Message'])
-                # For auth failures, we don't bail out, continue processing if we can.
-                # Note this can lead to missing data, but in general is cleaner than
-                # failing hard, due to the common use of locked down s3 bucket policies
-                # that may cause issues fetching information across a fleet of buckets.
-
-                # This does mean s3 policies depending on augments should check denied
-                # methods annotation, generally though lacking get access to an augment means
-                # they won't have write access either.
-
-                # For other error types we raise and bail policy execution.
-                if e.response['Error']['Code'] == 'AccessDenied':
-                    b.setdefault('c7n:DeniedMethods', []).append(m)
+                redirect = e.response.get('ResponseMetadata', {}).get(
+                    'HTTPHeaders', {}).get('x-amz-bucket-region') or get_region(b)
+                if redirect != region:
+                    region = regions[b['Name']] = redirect
                     continue
-                raise
-        # As soon as we learn location (which generally works)
-        if k == 'Location' and v is not None:
-            b_location = v.get('LocationConstraint')
-            # Location == region for all cases but EU
-            # https://docs.aws.amazon.com/AmazonS3/latest/API/RESTBucketGETlocation.html
-            if b_location is None:
-                b_location = "us-east-1"
-            elif b_location == 'EU':
-                b_location = "eu-west-1"
-                v['LocationConstraint'] = 'eu-west-1'
-            if v and v != c_location:
-                c = s.client('s3', region_name=b_location)
-            elif c_location != location:
-                c = s.client('s3', region_name=location)
-        b[k] = v
-    return b
+                log.warning("Bucket:%s unable to invoke method:%s redirected to %s",
+                            b['Name'], m, redirect)
+                return AUGMENT_SKIPPED
+            log.warning(
+                "Bucket:%s unable to invoke method:%s error:%s ",
+                b['Name'], m, e.response['Error']['Message'])
+            # For auth failures, we don't bail out, continue processing if we can.
+            # Note this can lead to missing data, but in general is cleaner than
+            # failing hard, due to the common use of locked down s3 bucket policies
+            # that may cause issues fetching information across a fleet of buckets.
+
+            # This does mean s3 policies depending on augments should check denied
+            # methods annotation, generally though lacking get access to an augment means
+            # they won't have write access either.
+
+            # For other error types we raise and bail policy execution.
+            if code == 'AccessDenied':
+                return AUGMENT_DENIED
+            raise
+    v.pop('ResponseMetadata')
+    if select is not None and select in v:
+        v = v[select]
+    return v
+
+
+def apply_bucket_augment(b, minfo, v, regions):
+    m, k = minfo[:2]
+    if v is AUGMENT_SKIPPED:
+        return
+    elif v is AUGMENT_DENIED:
+        b.setdefault('c7n:DeniedMethods', []).append(m)
+        return
+    # As soon as we learn location (which generally works)
+    if k == 'Location' and v is not None:
+        b_location = v.get('LocationConstraint')
+        # Location == region for all cases but EU
+        # https://docs.aws.amazon.com/AmazonS3/latest/API/RESTBucketGETlocation.html
+        if b_location is None:
+            b_location = "us-east-1"
+        elif b_location == 'EU':
+            b_location = "eu-west-1"
+            v['LocationConstraint'] = 'eu-west-1'
+        regions[b['Name']] = b_location
+    b[k] = v
 
 
 def bucket_client(session, b, kms=False):
@@ -581,6 +682,8 @@ class S3Metrics(MetricsFilter):
     mismatch, and additional required dimension.
     """
 
+    augment_keys = ()
+
     def get_dimensions(self, resource):
         dims = [{'Name': 'BucketName', 'Value': resource['Name']}]
         if (self.data['name'] == 'NumberOfObjects' and
@@ -605,6 +708,7 @@ class S3CrossAccountFilter(CrossAccountAccessFilter):
                 filters:
                   - type: cross-account
     """
+    augment_keys = ('Policy',)
     permissions = ('s3:GetBucketPolicy',)
 
     def get_accounts(self):
@@ -727,6 +831,8 @@ class GlobalGrantsFilter(Filter):
     GLOBAL_ALL = "http://acs.amazonaws.com/groups/global/AllUsers"
     AUTH_ALL = "http://acs.amazonaws.com/groups/global/AuthenticatedUsers"
 
+    augment_keys = ('Acl', 'Website')
+
     def process(self, buckets, event=None):
         with self.executor_factory(max_workers=5) as w:
             results = w.map(self.process_bucket, buckets)
@@ -830,6 +936,8 @@ class BucketFinding(PostFinding):
 
 @S3.filter_registry.register('has-statement')
 class S3HasStatementFilter(HasStatementFilter):
+    augment_keys = ('Policy',)
+
     def get_std_format_args(self, bucket):
         return {
             'account_id': self.manager.config.account_id,
@@ -860,6 +968,7 @@ class S3LockConfigurationFilter(ValueFilter):
 
     """
     schema = type_schema('lock-configuration', rinherit=ValueFilter.schema)
+    augment_keys = ()
     permissions = ('s3:GetBucketObjectLockConfiguration',)
     annotate = True
     annotation_key = 'c7n:ObjectLockConfiguration'
@@ -922,6 +1031,8 @@ class EncryptionEnabledFilter(Filter):
     schema = type_schema(
         'no-encryption-statement')
 
+    augment_keys = ('Policy',)
+
     def get_permissions(self):
         perms = self.manager.get_resource_manager('s3').get_permissions()
         return perms
@@ -975,6 +1086,8 @@ class MissingPolicyStatementFilter(Filter):
         aliases=('missing-statement',),
         statement_ids={'type': 'array', 'items': {'type': 'string'}})
 
+    augment_keys = ('Policy',)
+
     def __call__(self, b):
         p = b.get('Policy')
         if p is None:
@@ -1022,6 +1135,7 @@ class BucketNotificationFilter(ValueFilter):
     schema_alias = False
     annotation_key = 'c7n:MatchedNotificationConfigurationIds'
 
+    augment_keys = ('Notification',)
     permissions = ('s3:GetBucketNotification',)
 
     FIELDS = {
@@ -1089,6 +1203,7 @@ class BucketLoggingFilter(BucketFilterBase):
     schema_alias = False
     account_name = None
 
+    augment_keys = ('Logging',)
     permissions = ("s3:GetBucketLogging", "iam:ListAccountAliases")
 
     def process(self, buckets, event=None):
@@ -1145,6 +1260,7 @@ class DeleteBucketNotification(BucketActionBase):
             {'enum': ['matched']},
             {'type': 'array', 'items': {'type': 'string'}}]})
 
+    augment_keys = ('Notification',)
     permissions = ('s3:PutBucketNotification',)
 
     def process_bucket(self, bucket):
@@ -1175,6 +1291,7 @@ class DeleteBucketNotification(BucketActionBase):
 class NoOp(BucketActionBase):
 
     schema = type_schema('no-op')
+    augment_keys = ()
     permissions = ('s3:ListAllMyBuckets',)
 
     def process(self, buckets):
@@ -1206,6 +1323,7 @@ class SetPolicyStatement(BucketActionBase):
                             "aws:SecureTransport": false
     """
 
+    augment_keys = ('Policy',)
     permissions = ('s3:PutBucketPolicy',)
 
     schema = type_schema(
@@ -1291,6 +1409,7 @@ class RemovePolicyStatement(RemovePolicyBase):
                       - RequiredEncryptedPutObject
     """
 
+    augment_keys = ('Policy',)
     permissions = ("s3:PutBucketPolicy", "s3:DeleteBucketPolicy")
 
     def process(self, buckets):
@@ -1419,6 +1538,7 @@ class FilterPublicBlock(Filter):
         IgnorePublicAcls={'type': 'boolean'},
         BlockPublicPolicy={'type': 'boolean'},
         RestrictPublicBuckets={'type': 'boolean'})
+    augment_keys = ()
     permissions = ("s3:GetBucketPublicAccessBlock",)
     keys = (
         'BlockPublicPolicy', 'BlockPublicAcls', 'IgnorePublicAcls', 'RestrictPublicBuckets')
@@ -1445,7 +1565,7 @@ class FilterPublicBlock(Filter):
                 if error_code == 'NoSuchPublicAccessBlockConfiguration':
                     pass
                 elif error_code == 'AccessDenied':
-                    # Follow the same logic as `assemble_bucket` - log and continue on access
+                    # Follow the same logic as `get_bucket_augment` - log and continue on access
                     # denied errors rather than halting a policy altogether
                     method = 'GetPublicAccessBlock'
                     log.warning(
@@ -1579,6 +1699,7 @@ class ToggleVersioning(BucketActionBase):
     schema = type_schema(
         'toggle-versioning',
         enabled={'type': 'boolean'})
+    augment_keys = ('Versioning',)
     permissions = ("s3:PutBucketVersioning",)
 
     def process_versioning(self, resource, state):
@@ -1651,6 +1772,7 @@ class ToggleLogging(BucketActionBase):
         target_bucket={'type': 'string'},
         target_prefix={'type': 'string'})
 
+    augment_keys = ('Logging',)
     permissions = ("s3:PutBucketLogging", "iam:ListAccountAliases")
 
     def validate(self):
@@ -1830,6 +1952,7 @@ class EncryptionRequiredPolicy(BucketActionBase):
                   - encryption-policy
     """
 
+    augment_keys = ('Policy',)
     permissions = ("s3:GetBucketPolicy", "s3:PutBucketPolicy")
     schema = type_schema('encryption-policy')
 
@@ -2379,6 +2502,8 @@ class LogTarget(Filter):
         self={'type': 'boolean'},
         value={'type': 'boolean'})
 
+    augment_keys = ('Logging',)
+
     def get_permissions(self):
         perms = self.manager.get_resource_manager('elb').get_permissions()
         perms += ('elasticloadbalancing:DescribeLoadBalancerAttributes',)
@@ -2480,6 +2605,7 @@ class RemoveWebsiteHosting(BucketActionBase):
 
     schema = type_schema('remove-website-hosting')
 
+    augment_keys = ()
     permissions = ('s3:DeleteBucketWebsite',)
 
     def process(self, buckets):
@@ -2510,6 +2636,7 @@ class DeleteGlobalGrants(BucketActionBase):
         'delete-global-grants',
         grantees={'type': 'array', 'items': {'type': 'string'}})
 
+    augment_keys = ('Acl', 'Website')
     permissions = ('s3:PutBucketAcl',)
 
     def process(self, buckets):
@@ -2578,6 +2705,8 @@ class BucketTag(Tag):
                     value: us-east-1
     """
 
+    augment_keys = ('Tags',)
+
     def process_resource_set(self, client, resource_set, tags):
         modify_bucket_tags(self.manager.session_factory, resource_set, tags)
 
@@ -2605,6 +2734,7 @@ class MarkBucketForOp(TagDelayedAction):
 
     schema = type_schema(
         'mark-for-op', rinherit=TagDelayedAction.schema)
+    augment_keys = ('Tags',)
 
 
 @actions.register('unmark')
@@ -2626,6 +2756,8 @@ class RemoveBucketTag(RemoveTag):
                     tags: ['BucketOwner']
     """
 
+    augment_keys = ('Tags',)
+
     def process_resource_set(self, client, resource_set, tags):
         modify_bucket_tags(
             self.manager.session_factory, resource_set, remove_tags=tags)
@@ -2640,6 +2772,7 @@ class DataEvents(Filter):
     """
 
     schema = type_schema('data-events', state={'enum': ['present', 'absent']})
+    augment_keys = ()
     permissions = (
         'cloudtrail:DescribeTrails',
         'cloudtrail:GetEventSelectors')
@@ -2695,6 +2828,7 @@ class Inventory(ValueFilter):
     """Filter inventories for a bucket"""
     schema = type_schema('inventory', rinherit=ValueFilter.schema)
     schema_alias = False
+    augment_keys = ()
     permissions = ('s3:GetInventoryConfiguration',)
 
     def process(self, buckets, event=None):
@@ -2877,6 +3011,7 @@ class IntelligentTiering(ListItemFilter):
         count={'type': 'number'},
         count_op={'$ref': '#/definitions/filters_common/comparison_operators'}
     )
+    augment_keys = ()
     permissions = ('s3:GetIntelligentTieringConfiguration',)
     annotation_key = "c7n:IntelligentTiering"
     annotate_items = True
@@ -3493,6 +3628,7 @@ class BucketEncryption(KMSKeyResolverMixin, Filter):
                          key={'type': 'string'},
                          bucket_key_enabled={'type': 'boolean'})
 
+    augment_keys = ()
     permissions = ('s3:GetEncryptionConfiguration', 'kms:DescribeKey', 'kms:ListAliases')
     annotation_key = 'c7n:bucket-encryption'
 
@@ -3777,6 +3913,7 @@ class BucketOwnershipControls(BucketFilterBase, ValueFilter):
         {'type': 'string', 'enum': OWNERSHIP_CONTROLS + VALUE_FILTER_MAGIC_VALUES},
         {'type': 'array', 'items': {
             'type': 'string', 'enum': OWNERSHIP_CONTROLS + VALUE_FILTER_MAGIC_VALUES}}]})
+    augment_keys = ()
     permissions = ('s3:GetBucketOwnershipControls',)
     annotation_key = 'c7n:ownership'
 
@@ -3847,6 +3984,7 @@ class BucketReplication(ListItemFilter):
         count_op={'$ref': '#/definitions/filters_common/comparison_operators'}
     )
 
+    augment_keys = ('Replication',)
     permissions = ("s3:GetReplicationConfiguration",)
     annotation_key = 'Replication'
     annotate_items = True
@@ -74,6 +74,7 @@ class SESConfigurationSetV2(QueryResourceManager):
         service = 'sesv2'
         enum_spec = ('list_configuration_sets', 'ConfigurationSets', None)
         name = id = 'ConfigurationSetName'
+        arn_service = 'ses'
         arn_type = 'configuration-set'
         universal_taggable = object()
         config_type = "AWS::SES::ConfigurationSet"
@@ -359,6 +360,7 @@ class SESDedicatedIpPool(QueryResourceManager):
         service = 'sesv2'
         enum_spec = ('list_dedicated_ip_pools', 'DedicatedIpPools', None)
         name = id = 'PoolName'
+        arn_service = 'ses'
         arn_type = 'dedicated-ip-pool'
         universal_taggable = object()
         config_type = None
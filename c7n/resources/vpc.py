@@ -2120,7 +2120,6 @@ class SubnetRoute(net_filters.SubnetFilter):
         rt_subnet_map = {}
         main_tables = {}
 
-        manager = self.get_resource_manager()
         for r in resources:
             rt_subnet_map[r['RouteTableId']] = []
             for a in r.get('Associations', ()):
@@ -2129,7 +2128,7 @@ class SubnetRoute(net_filters.SubnetFilter):
                 elif a.get('Main'):
                     main_tables[r['VpcId']] = r['RouteTableId']
         explicit_subnet_ids = set(itertools.chain(*rt_subnet_map.values()))
-        subnets = manager.resources()
+        subnets = self.get_related_index().resources
         for s in subnets:
             if s['SubnetId'] in explicit_subnet_ids:
                 continue
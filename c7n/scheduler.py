@@ -0,0 +1,135 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""Parallel policy execution.
+
+Policies are executed on a pool of worker threads. Workers prefer to
+keep executing policies in the region they last ran in, so thread
+local sessions and clients (see :func:`c7n.utils.local_session`) stay
+warm, and only move to another region once their current region's
+queue is drained.
+
+Concurrency is bounded per (region, service) and per region, so that
+a large set of policies against the same api doesn't throttle itself
+into retry backoff.
+"""
+from collections import Counter, OrderedDict, deque
+import logging
+import threading
+
+from c7n.executor import ThreadPoolExecutor
+
+log = logging.getLogger('custodian.scheduler')
+
+
+class PolicyScheduler:
+    """Execute policies concurrently within per service and region budgets.
+
+    :param policies: policies to execute, relative order within a region
+           is preserved for dispatch.
+    :param workers: number of worker threads.
+    :param service_limit: max concurrent policies per (region, service).
+    :param region_limit: max concurrent policies per region.
+    :param fail_fast: stop dispatching policies after the first error,
+           policies already executing run to completion.
+    """
+
+    service_limit = 3
+    region_limit = 8
+
+    def __init__(self, policies, workers, service_limit=None, region_limit=None,
+                 fail_fast=False):
+        self.workers = workers
+        self.fail_fast = fail_fast
+        self.service_limit = service_limit or self.service_limit
+        self.region_limit = region_limit or self.region_limit
+        self.cond = threading.Condition()
+        self.active = Counter()
+        self.pending = OrderedDict()
+        for p in policies:
+            self.pending.setdefault(self.get_region(p), deque()).append(p)
+
+    @staticmethod
+    def get_region(policy):
+        return policy.options.region or ''
+
+    @staticmethod
+    def get_service(policy):
+        rtype = getattr(policy.resource_manager, 'resource_type', None)
+        return getattr(rtype, 'service', None) or policy.resource_type
+
+    def get_budget_keys(self, policy):
+        region = self.get_region(policy)
+        return (
+            (('region', region), self.region_limit),
+            (('service', region, self.get_service(policy)), self.service_limit))
+
+    def has_capacity(self, policy):
+        for k, limit in self.get_budget_keys(policy):
+            if self.active[k] >= limit:
+                return False
+        return True
+
+    def acquire(self, region=None):
+        """Wait for and return the next policy within budget, None when done."""
+        with self.cond:
+            while True:
+                if not self.pending:
+                    return None
+                # prefer the worker's current region, then the most backlogged.
+                regions = sorted(
+                    self.pending, key=lambda r: (r != region, -len(self.pending[r])))
+                for r in regions:
+                    queue = self.pending[r]
+                    for p in queue:
+                        if self.has_capacity(p):
+                            queue.remove(p)
+                            if not queue:
+                                self.pending.pop(r)
+                            for k, _ in self.get_budget_keys(p):
+                                self.active[k] += 1
+                            return p
+                self.cond.wait()
+
+    def release(self, policy):
+        with self.cond:
+            for k, _ in self.get_budget_keys(policy):
+                self.active[k] -= 1
+            self.cond.notify_all()
+
+    def stop(self):
+        """Drop pending policies, workers exit after their current policy."""
+        with self.cond:
+            self.pending.clear()
+            self.cond.notify_all()
+
+    def work(self, execute, errors):
+        region = None
+        while True:
+            p = self.acquire(region)
+            if p is None:
+                return
+            region = self.get_region(p)
+            try:
+                execute(p)
+            except Exception as e:
+                errors.append((p, e))
+                if self.fail_fast:
+                    self.stop()
+                else:
+                    log.exception(
+                        "Error while executing policy %s, continuing" % p.name)
+            finally:
+                self.release(p)
+
+    def run(self, execute):
+        """Run execute(policy) for all policies.
+
+        Returns a list of (policy, exception) for policies that errored.
+        """
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.workers) as w:
+            futures = [
+                w.submit(self.work, execute, errors) for i in range(self.workers)]
+            for f in futures:
+                f.result()
+        return errors
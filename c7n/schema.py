@@ -15,9 +15,15 @@ All filters and actions are annotated with schema typically using
 the utils.type_schema function.
 """
 from collections import Counter
+from functools import lru_cache
+import hashlib
+import importlib.metadata
 import json
 import inspect
 import logging
+import os
+import sys
+import tempfile
 
 from jsonschema import Draft7Validator as JsonSchemaValidator
 from jsonschema.exceptions import best_match
@@ -37,6 +43,9 @@ from c7n.filters.core import (
 from c7n.structure import StructureParser # noqa
 
 
+log = logging.getLogger('custodian.schema')
+
+
 def is_c7n_placeholder(instance):
     """Is this schema element a Custodian variable placeholder?
 
@@ -416,6 +425,111 @@ def generate(resource_types=()):
     return schema
 
 
+class SchemaCache:
+    """Persistent cache of generated schemas and validated policies.
+
+    Entries are content addressed by the installed custodian and provider
+    packages, the extension modules loaded, and the resource types, so
+    an upgrade or source change invalidates them. Schemas are only
+    stored once they pass the metaschema check, and policy content is
+    recorded once it has validated against them.
+
+    The cache is opt-in, its directory is set with the C7N_SCHEMA_CACHE
+    environment variable. Long-running or serverless processes (ie. lambda)
+    validate once per process and shouldn't write to disk for it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get('C7N_SCHEMA_CACHE')
+        if path:
+            return cls(os.path.abspath(os.path.expanduser(path)))
+
+    def get_key(self, *parts):
+        packages = tuple(sorted(
+            {'c7n'} | {p.__module__.split('.')[0] for p in clouds.values()}))
+        return hashlib.sha256(json.dumps([
+            get_source_key(packages),
+            get_loaded_extensions(),
+            parts]).encode('utf8')).hexdigest()
+
+    def get_schema(self, resource_types):
+        path = os.path.join(
+            self.path, 'schema-%s.json' % self.get_key(sorted(resource_types)))
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            pass
+        rt_schema = generate(resource_types)
+        JsonSchemaValidator.check_schema(rt_schema)
+        content = json.dumps(rt_schema)
+        self.write(path, content)
+        # return the same form as later cache hits
+        return json.loads(content)
+
+    def get_valid_path(self, kind, resource_types, content):
+        return os.path.join(
+            self.path, 'valid',
+            self.get_key(kind, sorted(resource_types), content))
+
+    def is_valid(self, kind, resource_types, content):
+        return os.path.exists(
+            self.get_valid_path(kind, resource_types, content))
+
+    def set_valid(self, kind, resource_types, content):
+        self.write(self.get_valid_path(kind, resource_types, content), '')
+
+    def write(self, path, content):
+        # write and rename, as concurrent processes may share the cache.
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w') as fh:
+                fh.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.debug("unable to write schema cache %s: %s", path, e)
+
+
+@lru_cache(maxsize=None)
+def get_source_key(packages):
+    """Fingerprint the installed version and sources of the given packages."""
+    parts = []
+    for pkg in packages:
+        try:
+            version = importlib.metadata.version(pkg)
+        except importlib.metadata.PackageNotFoundError:
+            version = None
+        root = os.path.dirname(sys.modules[pkg].__file__)
+        parts.append((pkg, version))
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names.sort()
+            for f in sorted(file_names):
+                if not f.endswith('.py'):
+                    continue
+                f_path = os.path.join(dir_path, f)
+                parts.append((
+                    os.path.relpath(f_path, root), os.stat(f_path).st_mtime_ns))
+    return hashlib.sha256(json.dumps(parts).encode('utf8')).hexdigest()
+
+
+def get_loaded_extensions():
+    """Get the provider extension modules that have been imported.
+
+    Extensions register elements on reference, so the schema for a set
+    of resource types depends on which of them are loaded.
+    """
+    modules = set()
+    for provider in clouds.values():
+        for elements in provider.extension_map.values():
+            modules.update(elements.values())
+    return tuple(sorted(m for m in modules if m in sys.modules))
+
+
 def process_resource(
         type_name, resource_type, resource_defs, aliases=None,
         definitions=None, provider_name=None):
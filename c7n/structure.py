@@ -102,3 +102,26 @@ class StructureParser:
                 rtype = 'aws.%s' % rtype
             resources.add(rtype)
         return resources
+
+    def get_element_types(self, data):
+        """Get the filter, action and mode type names policies reference."""
+        elements = set()
+        for p in data.get('policies', []):
+            mode = p.get('mode')
+            if isinstance(mode, dict) and isinstance(mode.get('type'), str):
+                elements.add(mode['type'])
+            self._get_element_types(p.get('filters'), elements)
+            self._get_element_types(p.get('actions'), elements)
+        return elements
+
+    def _get_element_types(self, items, elements):
+        # boolean blocks and some filters nest further filters
+        for i in items or ():
+            if isinstance(i, str):
+                elements.add(i)
+            elif isinstance(i, dict):
+                if isinstance(i.get('type'), str):
+                    elements.add(i['type'])
+                for v in i.values():
+                    if isinstance(v, list):
+                        self._get_element_types(v, elements)
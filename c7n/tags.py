@@ -8,18 +8,19 @@ to ec2 (subnets, vpc, security-groups, volumes, instances,
 snapshots) and resources that support Amazon's Resource Groups Tagging API
 
 """
-from collections import Counter
+from collections import ChainMap, Counter
 from concurrent.futures import as_completed
 
 from datetime import datetime, timedelta
 from dateutil import tz as tzutil
 from dateutil.parser import parse
 
+import threading
 import time
 
 from c7n.manager import resources as aws_resources
 from c7n.actions import BaseAction as Action, AutoTagUser
-from c7n.exceptions import PolicyValidationError, PolicyExecutionError
+from c7n.exceptions import ClientError, PolicyValidationError, PolicyExecutionError
 from c7n.resources import load_resources
 from c7n.filters import Filter, OPERATORS
 from c7n.filters.offhours import Time
@@ -77,15 +78,25 @@ def universal_augment(self, resources):
     client = utils.local_session(
         self.session_factory).client('resourcegroupstaggingapi', region_name=region)
 
-    # Lazy for non circular :-(
-    from c7n.query import RetryPageIterator
-    paginator = client.get_paginator('get_resources')
-    paginator.PAGE_ITERATOR_CLS = RetryPageIterator
-
     rfetch = [r for r in resources if 'Tags' not in r]
+    if not rfetch:
+        return resources
+    arns = self.get_arns(rfetch)
+
+    # Pull mode policies share a snapshot of the service's tags, fetched
+    # for more arns than a lookup takes. Event modes, and smaller sets
+    # without a cached snapshot, look up their arns.
+    tag_map = None
+    if get_execution_mode(self) == 'pull':
+        tag_map = tag_cache.get(
+            self, client, arns, fetch=len(arns) > tag_cache.min_fetch_arns)
+
+    if tag_map is not None:
+        for arn, r in zip(arns, rfetch):
+            r['Tags'] = [dict(t) for t in tag_map.get(arn, ())]
+        return resources
 
-    for arn_resource_set in utils.chunks(
-            zip(self.get_arns(rfetch), rfetch), 100):
+    for arn_resource_set in utils.chunks(zip(arns, rfetch), 100):
         arn_resource_map = dict(arn_resource_set)
         resource_tag_results = client.get_resources(
             ResourceARNList=list(arn_resource_map.keys())).get(
@@ -98,6 +109,106 @@ def universal_augment(self, resources):
     return resources
 
 
+def get_execution_mode(manager):
+    policy = getattr(manager.ctx, 'policy', None)
+    return getattr(policy, 'execution_mode', 'pull')
+
+
+class TagSnapshotCache:
+    """Region wide tag snapshots shared by universally tagged resources within a run.
+
+    Snapshots map arn to tags for all of a service's resources, fetched with
+    paginated resource tagging api get_resources calls. They are keyed by
+    account, tagging region, and the service in the resources' arns
+    (which the tagging api filters on, ie. states for step functions), so
+    resource types of the same service (ie. glue jobs, crawlers, and
+    tables) and policies on them share one fetch.
+
+    A snapshot pages through all of the service's resources, so it's only
+    fetched for more arns than a single ResourceARNList lookup takes.
+    """
+
+    # arns per get_resources ResourceARNList lookup
+    min_fetch_arns = 100
+
+    def __init__(self):
+        self.data = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get_key(self, manager, service=None):
+        model = manager.resource_type
+        return (
+            getattr(manager.config, 'account_id', None),
+            utils.get_resource_tagging_region(
+                model, getattr(manager, 'region', manager.config.region)),
+            service)
+
+    def get(self, manager, client, arns, fetch=True):
+        """Get the snapshot for the services of the given arns.
+
+        Returns None if a service's tags couldn't be fetched, or without
+        fetch, if they aren't cached.
+        """
+        if not all(arn.startswith('arn:') for arn in arns):
+            return None
+        tag_maps = []
+        for service in sorted({arn.split(':')[2] for arn in arns}):
+            tag_map = self.get_service(manager, client, service, fetch)
+            if tag_map is None:
+                return None
+            tag_maps.append(tag_map)
+        if len(tag_maps) == 1:
+            return tag_maps[0]
+        return ChainMap(*tag_maps)
+
+    def get_service(self, manager, client, service, fetch=True):
+        key = self.get_key(manager, service)
+        with self.lock:
+            if key in self.data or not fetch:
+                return self.data.get(key)
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self.lock:
+                if key in self.data:
+                    return self.data[key]
+            tag_map = self.fetch(manager, client, service)
+            with self.lock:
+                self.data[key] = tag_map
+            return tag_map
+
+    def fetch(self, manager, client, service):
+        # Lazy for non circular :-(
+        from c7n.query import RetryPageIterator
+        paginator = client.get_paginator('get_resources')
+        paginator.PAGE_ITERATOR_CLS = RetryPageIterator
+        tag_map = {}
+        try:
+            for page in paginator.paginate(ResourceTypeFilters=[service]):
+                for r in page.get('ResourceTagMappingList', ()):
+                    tag_map[r['ResourceARN']] = r.get('Tags', [])
+        except ClientError as e:
+            manager.log.warning(
+                "Unable to fetch %s tags, using arn lookups: %s", service, e)
+            return None
+        return tag_map
+
+    def invalidate(self, manager):
+        """Drop the manager's account and region snapshots, ie. after modifying tags."""
+        account_region = self.get_key(manager)[:2]
+        with self.lock:
+            for key in [k for k in self.data if k[:2] == account_region]:
+                self.data.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.locks.clear()
+
+
+tag_cache = TagSnapshotCache()
+
+
 def _common_tag_processer(executor_factory, batch_size, concurrency, client,
                           process_resource_set, id_key, resources, tags,
                           log):
@@ -412,6 +523,7 @@ class Tag(Action):
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
             self.process_resource_set, self.id_key, resources, tags, self.log)
+        tag_cache.invalidate(self.manager)
 
     def process_resource_set(self, client, resource_set, tags):
         mid = self.manager.get_model().id
@@ -469,6 +581,7 @@ class RemoveTag(Action):
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
             self.process_resource_set, self.id_key, resources, tags, self.log)
+        tag_cache.invalidate(self.manager)
 
     def process_resource_set(self, client, resource_set, tag_keys):
         return self.manager.retry(
@@ -683,6 +796,7 @@ class TagDelayedAction(Action):
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
             self.process_resource_set, self.id_key, resources, tags, self.log)
+        tag_cache.invalidate(self.manager)
 
     def process_resource_set(self, client, resource_set, tags):
         tagger = self.manager.action_registry['tag']({}, self.manager)
@@ -871,6 +985,7 @@ class UniversalTag(Tag):
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
             self.process_resource_set, self.id_key, resources, tags, self.log)
+        tag_cache.invalidate(self.manager)
 
     def process_resource_set(self, client, resource_set, tags):
         arns = self.manager.get_arns(resource_set)
@@ -1039,6 +1154,7 @@ class UniversalTagDelayedAction(TagDelayedAction):
         _common_tag_processer(
             self.executor_factory, batch_size, self.concurrency, client,
             self.process_resource_set, self.id_key, resources, tags, self.log)
+        tag_cache.invalidate(self.manager)
 
     def process_resource_set(self, client, resource_set, tags):
         arns = self.manager.get_arns(resource_set)
@@ -1262,20 +1378,26 @@ def universal_retry(method, ResourceARNList, **kw):
 
     The resource group tagging api typically returns a 200 status code
     with embedded resource specific errors. To enable resource specific
-    retry on throttles, we extract those, perform backoff w/ jitter and
-    continue. Other errors are immediately raised.
+    retry on throttles, we extract those and retry them with backoff, also
+    paced by the api's adaptive rate limiter. Other errors are immediately
+    raised.
 
     We do not aggregate unified resource responses across retries, only the
     last successful response is returned for a subset of the resources if
     a retry is performed.
     """
     max_attempts = 6
+    limiter = utils.rate_controller.get_limiter(method)
 
     for idx, delay in enumerate(
             utils.backoff_delays(1.5, 2 ** 8, jitter=True)):
+        if limiter is not None:
+            limiter.acquire()
         response = method(ResourceARNList=ResourceARNList, **kw)
         failures = response.get('FailedResourcesMap', {})
         if not failures:
+            if limiter is not None:
+                limiter.succeeded()
             return response
 
         errors = {}
@@ -1296,8 +1418,13 @@ def universal_retry(method, ResourceARNList, **kw):
         if idx == max_attempts - 1:
             raise Exception("Resource Tag Throttled %s" % (", ".join(throttles)))
 
-        time.sleep(delay)
         ResourceARNList = list(throttles)
+        # throttles also lower the api's rate for other callers, the
+        # retry waits for the longer of its backoff and the limiter.
+        if limiter is not None:
+            limiter.throttled()
+            delay = max(delay, limiter.wait_time())
+        time.sleep(delay)
 
 
 def coalesce_copy_user_tags(resource, copy_tags, user_tags):
@@ -22,7 +22,8 @@ from c7n import deprecated, policy
 from c7n.exceptions import DeprecationError
 from c7n.loader import PolicyLoader
 from c7n.ctx import ExecutionContext
-from c7n.utils import reset_session_cache, jmespath_search
+from c7n.utils import (
+    rate_controller, reset_run_caches, reset_session_cache, jmespath_search)
 from c7n.config import Bag, Config
 
 
@@ -246,6 +247,11 @@ class TestUtils(unittest.TestCase, CustodianTestCore):
     def cleanUp(self):
         # Clear out thread local session cache
         reset_session_cache()
+        # and metrics, related and parent resources, resource details and tags
+        # shared across policies
+        reset_run_caches()
+        # and api rates learned from throttling
+        rate_controller.clear()
 
 
 class TextTestIO(io.StringIO):
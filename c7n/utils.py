@@ -1,6 +1,8 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
+import contextlib
 import copy
+import functools
 from collections import UserString
 from datetime import datetime, timedelta
 from dateutil.tz import tzutc
@@ -14,6 +16,7 @@ import re
 import sys
 import threading
 import time
+import weakref
 from urllib import parse as urlparse
 from urllib.request import getproxies, proxy_bypass
 
@@ -345,6 +348,25 @@ def reset_session_cache():
     CustodianSession.close()
 
 
+def reset_run_caches():
+    """Clear the process wide caches scoped to a run.
+
+    Metrics, related resource indexes, parent ids, resource details,
+    config aggregate partitions and tag snapshots are shared by the
+    policies of a run (ie. a custodian run, a lambda event, or a c7n-org
+    account and region).
+    """
+    from c7n.filters.metrics import metric_cache
+    from c7n.filters.related import related_index
+    from c7n.query import aggregate_cache, detail_cache, parent_cache
+    from c7n.tags import tag_cache
+
+    for cache in (
+            metric_cache, related_index, parent_cache, detail_cache,
+            aggregate_cache, tag_cache):
+        cache.clear()
+
+
 def annotation(i, k):
     return i.get(k, ())
 
@@ -451,14 +473,18 @@ def get_retry(retry_codes=(), max_attempts=8, min_delay=1, log_retries=False):
     max_delay = max(min_delay, 2) ** max_attempts
 
     def _retry(func, *args, ignore_err_codes=(), **kw):
+        limiter = rate_controller.get_limiter(func)
         for idx, delay in enumerate(
                 backoff_delays(min_delay, max_delay, jitter=True)):
+            if limiter is not None:
+                limiter.acquire()
             try:
-                return func(*args, **kw)
+                result = func(*args, **kw)
             except ClientError as e:
-                if e.response['Error']['Code'] in ignore_err_codes:
+                code = e.response['Error']['Code']
+                if code in ignore_err_codes:
                     return
-                elif e.response['Error']['Code'] not in retry_codes:
+                elif code not in retry_codes:
                     raise
                 elif idx == max_attempts - 1:
                     raise
@@ -466,7 +492,16 @@ def get_retry(retry_codes=(), max_attempts=8, min_delay=1, log_retries=False):
                     retry_log.log(
                         log_retries,
                         "retrying %s on error:%s attempt:%d last delay:%0.2f",
-                        func, e.response['Error']['Code'], idx, delay)
+                        func, code, idx, delay)
+                # throttles also lower the api's rate for other callers, the
+                # retry waits for the longer of its backoff and the limiter.
+                if limiter is not None and code in THROTTLE_CODES:
+                    limiter.throttled()
+                    delay = max(delay, limiter.wait_time())
+            else:
+                if limiter is not None:
+                    limiter.succeeded()
+                return result
             time.sleep(delay)
     return _retry
 
@@ -483,6 +518,145 @@ def backoff_delays(start, stop, factor=2.0, jitter=False):
         cur = cur * factor
 
 
+# error codes of api rate throttling
+THROTTLE_CODES = frozenset((
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown', 'BandwidthLimitExceeded',
+    'EC2ThrottledException'))
+
+
+class RateLimiter:
+    """Token bucket limiting calls to a rate per second."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            delay = self.reserve(time.monotonic())
+        if delay > 0:
+            time.sleep(delay)
+
+    def wait_time(self):
+        """How long until a token is available, without taking it."""
+        with self.lock:
+            if self.rate is None:
+                return 0
+            tokens = min(
+                max(self.rate, 1), self.tokens + (time.monotonic() - self.stamp) * self.rate)
+            return max(0, (1 - tokens) / self.rate)
+
+    def reserve(self, now):
+        """Take a token, returning how long the caller should wait for it."""
+        # the bucket holds at least one token, so rates below one call a
+        # second don't also wait on the bucket's capacity.
+        self.tokens = min(max(self.rate, 1), self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        # callers reserve tokens, waiting out any deficit.
+        self.tokens -= 1
+        return -self.tokens / self.rate
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """Token bucket whose rate is learned from throttling.
+
+    Calls are unlimited until throttled. Each throttle cuts the rate to
+    half of the current (or observed) call rate, at most once a second,
+    and each successful call adds to the rate, so it increases by about
+    one call per second every second (AIMD). Once the rate grows past
+    max_rate calls are unlimited again.
+    """
+
+    min_rate = 0.5
+    max_rate = 500.0
+    increase = 1.0
+    decrease = 0.5
+
+    def __init__(self):
+        super().__init__(None)
+        self.window = self.stamp
+        self.calls = 0
+        self.observed = 0
+        self.decreased = None
+
+    def reserve(self, now):
+        if now - self.window >= 1:
+            self.observed = self.calls / (now - self.window)
+            self.window = now
+            self.calls = 0
+        self.calls += 1
+        if self.rate is None:
+            self.stamp = now
+            return 0
+        return super().reserve(now)
+
+    def throttled(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.decreased is not None and now - self.decreased < 1:
+                return
+            self.decreased = now
+            rate = self.rate
+            if rate is None:
+                rate = max(self.observed, self.calls, self.min_rate / self.decrease)
+                self.tokens = 0
+                self.stamp = now
+            self.rate = max(self.min_rate, rate * self.decrease)
+            self.tokens = min(self.tokens, 0)
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate is None:
+                return
+            self.rate += self.increase / self.rate
+            if self.rate > self.max_rate:
+                self.rate = self.tokens = None
+
+
+class RateController:
+    """Adaptive api rate limits shared by all calls in a process.
+
+    Limits are keyed by the caller's credentials (ie. account), region,
+    service, and operation of boto3 client methods. Sessions register
+    the credentials their clients are created with.
+    """
+
+    def __init__(self):
+        self.limiters = {}
+        self.identities = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def register(self, client, identity):
+        """Record the credentials identity (ie. access key) of a client."""
+        with self.lock:
+            self.identities[client] = identity
+
+    def get_limiter(self, func):
+        """Get the rate limiter for a client method, None for other callables."""
+        client = getattr(func, '__self__', None)
+        meta = getattr(client, 'meta', None)
+        service_model = getattr(meta, 'service_model', None)
+        if service_model is None:
+            return None
+        with self.lock:
+            key = (self.identities.get(client), meta.region_name,
+                   service_model.service_name, func.__name__)
+            if key not in self.limiters:
+                self.limiters[key] = AdaptiveRateLimiter()
+            return self.limiters[key]
+
+    def clear(self):
+        with self.lock:
+            self.limiters.clear()
+
+
+rate_controller = RateController()
+
+
 def parse_cidr(value):
     """Process cidr ranges."""
     if isinstance(value, list) or isinstance(value, set):
@@ -1010,3 +1184,111 @@ def get_path(path: str, resource: dict):
 def jmespath_compile(expression):
     parsed = C7NJMESPathParser().parse(expression)
     return parsed
+
+
+# Field lookups and list indexes, ie. the subset of jmespath most
+# resource keys use, eg. State.Name or BlockDeviceMappings[0].Ebs
+PLAIN_PATH = re.compile(
+    r'[A-Za-z_][A-Za-z0-9_]*(\[-?\d+\])*(\.[A-Za-z_][A-Za-z0-9_]*(\[-?\d+\])*)*')
+PATH_SEGMENT = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)|\[(-?\d+)\]')
+
+
+class PathExpression:
+    """A precompiled plain attribute path, searched without jmespath.
+
+    Matches jmespath semantics for the expressions it accepts, see
+    :func:`compile_path`.
+    """
+
+    def __init__(self, expression, segments):
+        self.expression = expression
+        self.segments = segments
+
+    def search(self, value, options=None):
+        for s in self.segments:
+            if isinstance(s, int):
+                if not isinstance(value, list):
+                    return None
+                try:
+                    value = value[s]
+                except IndexError:
+                    return None
+            else:
+                try:
+                    value = value.get(s)
+                except AttributeError:
+                    return None
+            if value is None:
+                return None
+        return value
+
+
+def parse_path(expression):
+    """Split a plain attribute path into field names and list indexes,
+    None if the expression needs a full jmespath evaluation.
+    """
+    if not PLAIN_PATH.fullmatch(expression):
+        return None
+    return [
+        int(index) if index else field
+        for field, index in PATH_SEGMENT.findall(expression)]
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(expression):
+    """Compile a resource key, plain attribute paths resolve through a
+    precompiled getter and anything else through the jmespath parser.
+    """
+    segments = parse_path(expression)
+    if segments is None:
+        return jmespath_compile(expression)
+    return PathExpression(expression, segments)
+
+
+TAG_INDEX = threading.local()
+
+
+@contextlib.contextmanager
+def tag_index():
+    """Index resource tags for lookups within the block.
+
+    Tag lists are converted to a key/value mapping once per resource
+    rather than scanned for each tag key a filter looks up.
+    """
+    if getattr(TAG_INDEX, 'tags', None) is not None:
+        yield
+        return
+    TAG_INDEX.tags = {}
+    try:
+        yield
+    finally:
+        TAG_INDEX.tags = None
+
+
+def get_tag_value(resource, key):
+    """Get a resource's tag value across aws, gcp and azure tag schemas."""
+    if 'Tags' in resource:
+        tags = resource['Tags']
+        index = getattr(TAG_INDEX, 'tags', None)
+        if index is None:
+            for t in tags:
+                if t.get('Key') == key:
+                    return t.get('Value')
+            return None
+        # entries keep a reference to their tag list, so ids aren't reused
+        # within the block.
+        entry = index.get(id(tags))
+        if entry is None or entry[0] is not tags or entry[1] != len(tags):
+            mapping = {}
+            for t in tags:
+                mapping.setdefault(t.get('Key'), t.get('Value'))
+            entry = index[id(tags)] = (tags, len(tags), mapping)
+        return entry[2].get(key)
+    # GCP schema: 'labels': {'key': 'value'}
+    elif 'labels' in resource:
+        return resource.get('labels', {}).get(key, None)
+    # GCP has a secondary form of labels called tags
+    # as labels without values.
+    # Azure schema: 'tags': {'key': 'value'}
+    elif 'tags' in resource:
+        return (resource.get('tags', {}) or {}).get(key, None)
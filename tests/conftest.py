@@ -10,7 +10,8 @@ from vcr import stubs
 
 try:
     from .zpill import PillTest, ACCOUNT_ID, ORG_ID
-    from c7n.testing import PyTestUtils, reset_session_cache
+    from c7n.testing import (
+        PyTestUtils, rate_controller, reset_run_caches, reset_session_cache)
     from pytest_terraform.tf import LazyPluginCacheDir, LazyReplay
 except ImportError: # noqa
     # docker tests run with minimial deps
@@ -71,4 +72,6 @@ def pytest_configure(config):
 def test(request):
     test_utils = CustodianAWSTesting(request)
     test_utils.addCleanup(reset_session_cache)
+    test_utils.addCleanup(reset_run_caches)
+    test_utils.addCleanup(rate_controller.clear)
     return test_utils
@@ -6,6 +6,8 @@ from mock import patch
 
 from .common import BaseTest, event_data
 from c7n.exceptions import PolicyValidationError
+from c7n.executor import MainThreadExecutor
+from c7n.resources.apigw import ApiGatewayV2Stage, RestResource
 
 from pytest_terraform import terraform
 
@@ -13,6 +15,7 @@ from pytest_terraform import terraform
 @terraform("apigatewayv2_stage")
 def test_apigwv2_stage_query(test, apigatewayv2_stage):
     factory = test.replay_flight_data("test_apigwv2_stage_query")
+    test.patch(ApiGatewayV2Stage, "executor_factory", MainThreadExecutor)
 
     policy = test.load_policy({
       "name": "test-aws-apigwv2-stage",
@@ -293,6 +296,7 @@ class TestRestResource(BaseTest):
 
     def test_rest_resource_query(self):
         session_factory = self.replay_flight_data("test_rest_resource_resource")
+        self.patch(RestResource, "executor_factory", MainThreadExecutor)
         p = self.load_policy(
             {"name": "all-rest-resources", "resource": "rest-resource"},
             session_factory=session_factory,
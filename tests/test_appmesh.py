@@ -4,6 +4,7 @@ from c7n.reports.csvout import Formatter
 from c7n.resources.appmesh import AppmeshMesh, AppmeshVirtualGateway, AppmeshVirtualNode
 from .apicallcaptor import ApiCallCaptor
 from .common import BaseTest, event_data
+from c7n.executor import MainThreadExecutor
 
 
 # during recording create some sample resources in AWS then
@@ -234,6 +235,7 @@ class TestAppmeshMesh(BaseTest):
 class TestAppmeshVirtualGateway(BaseTest):
     def test_appmesh_virtualgateway(self):
         session_factory = self.replay_flight_data('test_appmesh_virtualgateway')
+        self.patch(AppmeshVirtualGateway, 'executor_factory', MainThreadExecutor)
 
         # test data has 2 VGW but only 1 has a port of 123
         p = self.load_policy(
@@ -12,7 +12,7 @@ from unittest.mock import Mock, patch
 from c7n.config import Bag, Config
 from c7n.exceptions import PolicyValidationError, InvalidOutputConfig
 from c7n.resources import aws, load_resources
-from c7n import output
+from c7n import output, xray
 
 # resolver test needs to patch out thread usage
 from c7n.resources.sqs import SQS
@@ -36,7 +36,7 @@ class TraceDoc(Bag):
 class OutputXrayTracerTest(BaseTest):
 
     def test_emitter(self):
-        emitter = aws.XrayEmitter()
+        emitter = xray.XrayEmitter()
         emitter.client = m = Mock()
         doc = TraceDoc({'good': 'morning'})
         emitter.send_entity(doc)
@@ -240,7 +240,7 @@ class UtilTest(BaseTest):
 class TracerTest(BaseTest):
 
     def test_context(self):
-        store = aws.XrayContext()
+        store = xray.XrayContext()
         self.assertEqual(store.handle_context_missing(), None)
         x = Segment('foo')
         y = Segment('foo')
@@ -261,7 +261,7 @@ class TracerTest(BaseTest):
         self.assertFalse(store.end_subsegment(42))
 
     def test_context_worker_thread_main_acquire(self):
-        store = aws.XrayContext()
+        store = xray.XrayContext()
         x = Segment('foo')
         a = Subsegment('bar', 'boo', x)
         store.put_segment(x)
@@ -282,7 +282,7 @@ class TracerTest(BaseTest):
             options=Bag(account_id='644160558196', region='us-east-1',))
         ctx.get_metadata = lambda *args: {}
         config = Bag()
-        tracer = aws.XrayTracer(ctx, config)
+        tracer = xray.XrayTracer(ctx, config)
 
         with tracer:
             try:
@@ -292,6 +292,18 @@ class TracerTest(BaseTest):
                 pass
             self.assertNotEqual(w.cause, {})
 
+    def test_tracer_import_compat(self):
+        self.assertIs(aws.XrayTracer, xray.XrayTracer)
+        self.assertIs(aws.XrayContext, xray.XrayContext)
+        with self.assertRaises(AttributeError):
+            aws.XrayRecorder
+
+    def test_tracer_registered(self):
+        # the xray tracer is selectable without provider initialization
+        self.assertIn('xray', output.tracer_outputs)
+        ctx = Bag(policy=Bag(name='test', resource_type='ec2'), session_factory=None)
+        self.assertIsInstance(aws.xray_tracer(ctx, Bag()), xray.XrayTracer)
+
 
 class OutputMetricsTest(BaseTest):
 
@@ -18,7 +18,7 @@ class TestCache(TestCase):
     def test_factory(self):
         self.assertIsInstance(cache.factory(None), cache.NullCache)
         test_config = Namespace(cache_period=60, cache="test-cloud-custodian.cache")
-        self.assertIsInstance(cache.factory(test_config), cache.SqlKvCache)
+        self.assertIsInstance(cache.factory(test_config), cache.SqlResourceCache)
         test_config.cache = None
         self.assertIsInstance(cache.factory(test_config), cache.NullCache)
 
@@ -99,3 +99,116 @@ def test_sqlkv_convert(tmp_path):
     kv.close()
     with open(cache_path, 'rb') as fh:
         assert fh.read(15) == b"SQLite format 3"
+
+
+def test_sql_resource_cache(tmp_path):
+    rc = cache.SqlResourceCache(config.Bag(cache=tmp_path / "cache.db", cache_period=60))
+    rc.load()
+    k1 = {"account": "12345678901234", "region": "us-west-2", "resource": "ec2"}
+    v1 = [{'id': 'a', 'x': 1}, {'id': 'b', 'x': 2}, {'id': 'c', 'x': 3}]
+
+    assert rc.get(k1) is None
+    assert rc.get_resources(k1, ['a']) is None
+    rc.save(k1, v1, id_key='id')
+    assert rc.get(k1) == v1
+    assert rc.get_resources(k1, ['c', 'a', 'z']) == {'a': v1[0], 'c': v1[2]}
+
+    # non resource set values use the key value table
+    rc.save({'k': 'v'}, {'hello': 'world'})
+    assert rc.get({'k': 'v'}) == {'hello': 'world'}
+    rc.close()
+
+
+def test_sql_resource_cache_update(tmp_path):
+    rc = cache.SqlResourceCache(config.Bag(cache=tmp_path / "cache.db", cache_period=60))
+    rc.load()
+    k1 = {"account": "12345678901234", "region": "us-west-2", "resource": "ec2"}
+    rc.save(k1, [{'id': 'a', 'x': 1}, {'id': 'b', 'x': 2}], id_key='id')
+
+    # stale rows aren't returned by partial lookups
+    stale = datetime.utcnow() - timedelta(days=1)
+    rc.conn.execute('update c7n_resources set create_date = ? where rid = ?', (stale, 'b'))
+    assert rc.get_resources(k1, ['a', 'b']) == {'a': {'id': 'a', 'x': 1}}
+
+    rc.update(k1, [{'id': 'b', 'x': 5}, {'id': 'c', 'x': 6}], 'id')
+    assert rc.get_resources(k1, ['a', 'b', 'c']) == {
+        'a': {'id': 'a', 'x': 1}, 'b': {'id': 'b', 'x': 5}, 'c': {'id': 'c', 'x': 6}}
+    assert [r['id'] for r in rc.get(k1)] == ['a', 'b', 'c']
+
+
+def test_sql_resource_cache_expired(tmp_path):
+    rc = cache.SqlResourceCache(config.Bag(cache=tmp_path / "cache.db", cache_period=60))
+    rc.load()
+    k1 = {"account": "12345678901234", "region": "us-west-2", "resource": "ec2"}
+    rc.save(k1, [{'id': 'a'}], id_key='id', timestamp=datetime.utcnow() - timedelta(days=1))
+    assert rc.get(k1) is None
+    assert rc.get_resources(k1, ['a']) is None
+    # updates don't resurrect expired sets
+    rc.update(k1, [{'id': 'a'}], 'id')
+    assert rc.get(k1) is None
+    rc.close()
+
+    rc.load()
+    assert rc.conn.execute('select count(*) from c7n_resources').fetchone()[0] == 0
+
+
+def test_shared_cache(tmp_path):
+    shared = cache.shared_factory(
+        config.Bag(shared_cache=str(tmp_path / "shared.cache"), cache_period=60))
+    assert shared is cache.shared_factory(
+        config.Bag(shared_cache=str(tmp_path / "shared.cache"), cache_period=60))
+    assert cache.shared_factory(config.Bag(cache_period=60)) is None
+    assert cache.shared_factory(
+        config.Bag(shared_cache=str(tmp_path / "shared.cache"), cache_period=0)) is None
+
+    assert shared.get('a') is None
+    shared.save('a', {'x': 1})
+    assert shared.get('a') == {'x': 1}
+
+    fetched = []
+    assert shared.get_or_fetch('b', lambda: fetched.append(1) or 'bee') == 'bee'
+    assert shared.get_or_fetch('b', lambda: fetched.append(1) or 'bee') == 'bee'
+    assert fetched == [1]
+    shared.close()
+
+
+def test_shared_cache_evict(tmp_path):
+    shared = cache.SharedCache(str(tmp_path / "shared.cache"), 60)
+    shared.max_size = 250
+    shared.save('a', 'a' * 100)
+    shared.save('b', 'b' * 100)
+    # access a so that b is the least recently used
+    shared.connect().execute('update c7n_shared set access_date = 0 where key = ?',
+                             [sqlite3.Binary(cache.encode('b'))])
+    shared.save('c', 'c' * 100)
+    assert shared.get('b') is None
+    assert shared.get('a') == 'a' * 100
+    assert shared.get('c') == 'c' * 100
+
+
+def test_shared_cache_lease(tmp_path):
+    path = str(tmp_path / "shared.cache")
+    holder = cache.SharedCache(path, 60)
+    waiter = cache.SharedCache(path, 60)
+    waiter.poll_interval = 0.01
+
+    assert holder.acquire('key')
+    assert not waiter.acquire('key')
+
+    # the waiter picks up the lease holder's result without fetching
+    polls = []
+
+    def sleep(interval):
+        polls.append(interval)
+        holder.save('key', 'value')
+        holder.release('key')
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(cache.time, 'sleep', sleep)
+        assert waiter.get_or_fetch('key', lambda: 1 / 0) == 'value'
+    assert polls == [0.01]
+
+    # an expired lease is taken over
+    holder.lease_period = -1
+    assert holder.acquire('other')
+    assert waiter.get_or_fetch('other', lambda: 'fetched') == 'fetched'
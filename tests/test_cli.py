@@ -3,12 +3,13 @@
 import json
 import os
 import sys
+import threading
 import argparse
 
 from argparse import ArgumentTypeError
 from datetime import datetime, timedelta
 
-from c7n import cli, version, commands
+from c7n import cli, version, commands, schema
 from c7n.resolver import ValuesFrom
 from c7n.resources import aws
 from c7n.schema import ElementSchema, generate
@@ -177,6 +178,26 @@ class ValidateTest(CliTest):
         # duplicate policy names
         self.run_and_expect_failure(["custodian", "validate", yaml_file, yaml_file], 1)
 
+    def test_validate_cache(self):
+        self.change_environment(C7N_SCHEMA_CACHE=self.get_temp_dir())
+        yaml_file = self.write_policy_file({
+            "policies": [{"name": "foo", "resource": "sqs"}]})
+        self.run_and_expect_success(["custodian", "validate", yaml_file])
+
+        def revalidate(data, schema=None, resource_types=()):
+            self.fail("file revalidated")
+
+        # unchanged files are skipped, but still checked for duplicate names
+        self.patch(schema, "validate", revalidate)
+        self.run_and_expect_success(["custodian", "validate", yaml_file])
+        self.run_and_expect_failure(["custodian", "validate", yaml_file, yaml_file], 1)
+
+        # changed files are revalidated
+        with open(yaml_file, "a") as fh:
+            fh.write("\n")
+        with self.assertRaises(AssertionError):
+            self.run_and_expect_success(["custodian", "validate", yaml_file])
+
     def test_deprecated(self):
 
         deprecated = {
@@ -538,6 +559,40 @@ class RunTest(CliTest):
             ]
         )
 
+    def test_run_prefetch(self):
+        session_factory = self.replay_flight_data(
+            "test_ec2_state_transition_age_filter"
+        )
+
+        from c7n.policy import PolicyCollection
+        from c7n.planner import FetchPlanner
+
+        self.patch(
+            PolicyCollection,
+            "session_factory",
+            staticmethod(lambda x=None: session_factory),
+        )
+        planned = []
+        self.patch(
+            FetchPlanner, "execute",
+            lambda self: planned.extend(self.plan()) or self.snapshots)
+
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {"name": "ec2-running", "resource": "ec2",
+                     "filters": [{"State.Name": "running"}]},
+                    {"name": "ec2-all", "resource": "ec2"},
+                ]
+            }
+        )
+        self.run_and_expect_success(
+            ["custodian", "run", "--prefetch", "--cache", temp_dir + "/cache",
+             "-s", temp_dir, yaml_file])
+        self.assertEqual(len(planned), 1)
+        self.assertEqual(len(planned[0].policies), 2)
+
     def test_error(self):
         from c7n.policy import Policy
 
@@ -591,6 +646,58 @@ class RunTest(CliTest):
             ["custodian", "run", "-s", temp_dir, "--debug", yaml_file], CustomError
         )
 
+    def test_parallel_error(self):
+        from c7n.policy import Policy
+        from c7n.scheduler import PolicyScheduler
+
+        executed = []
+
+        def execute(p):
+            executed.append(p.name)
+            if p.name == 'error':
+                raise Exception("foobar")
+
+        self.patch(Policy, "__call__", execute)
+        temp_dir = self.get_temp_dir()
+        yaml_file = self.write_policy_file(
+            {
+                "policies": [
+                    {"name": "error", "resource": "ec2"},
+                    {"name": "ok", "resource": "ec2"},
+                    {"name": "bucket", "resource": "s3"},
+                ]
+            }
+        )
+        self.run_and_expect_failure(
+            ["custodian", "run", "--parallel", "2", "-s", temp_dir, yaml_file], 2)
+        self.assertEqual(sorted(executed), ["bucket", "error", "ok"])
+
+        # with debug, the first error stops the run and is raised
+        class CustomError(Exception):
+            pass
+
+        import pdb
+
+        self.patch(pdb, "post_mortem", lambda x: (_ for _ in ()).throw(CustomError))
+        stopped = threading.Event()
+        self.patch(
+            PolicyScheduler, "stop",
+            lambda sched, _stop=PolicyScheduler.stop: _stop(sched) or stopped.set())
+
+        def execute_debug(p):
+            executed.append(p.name)
+            if p.name == 'error':
+                raise Exception("foobar")
+            stopped.wait(5)
+
+        self.patch(Policy, "__call__", execute_debug)
+        executed.clear()
+        self.run_and_expect_exception(
+            ["custodian", "run", "--parallel", "2", "--debug", "-s", temp_dir, yaml_file],
+            CustomError)
+        self.assertIn("error", executed)
+        self.assertNotIn("bucket", executed)
+
     def test_session_policy(self):
         parser = argparse.ArgumentParser()
         parser.add_argument('--session-policy', action=LoadSessionPolicyJson)
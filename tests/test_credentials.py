@@ -1,12 +1,16 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import placebo
 
 from c7n import credentials
 from c7n.credentials import (
-    CustodianSession, SessionFactory, assumed_session, get_sts_client
+    CustodianSession, SessionFactory, assumed_session, client_pool, get_sts_client
 )
 from c7n.version import version
 from c7n.utils import local_session
@@ -123,3 +127,73 @@ class Credential(BaseTest):
         client = local_session(factory).client('ec2')
         self.assertTrue(
             'check-ec2' in client._client_config.user_agent)
+
+    def test_client_pool_shared_across_threads(self):
+        self.addCleanup(CustodianSession.close)
+        CustodianSession.close()
+        factory = SessionFactory('us-east-1')
+        barrier = threading.Barrier(4)
+
+        def get_client(i):
+            # each executor thread has its own thread local session
+            session = local_session(factory)
+            barrier.wait()
+            return session, session.client('ec2')
+
+        with ThreadPoolExecutor(max_workers=4) as w:
+            sessions, clients = zip(*w.map(get_client, range(4)))
+        self.assertEqual(len({id(s) for s in sessions}), 4)
+        self.assertEqual(len({id(c) for c in clients}), 1)
+        self.assertEqual(client_pool.stats['created'], 1)
+        self.assertEqual(client_pool.stats['reused'], 3)
+        self.assertEqual(clients[0].meta.config.max_pool_connections, 25)
+        self.assertTrue(clients[0].meta.config.tcp_keepalive)
+
+    def test_client_pool_key(self):
+        self.addCleanup(CustodianSession.close)
+        session = SessionFactory('us-east-1')()
+        client = session.client('ec2')
+        self.assertIs(session.client('ec2', 'us-east-1'), client)
+        self.assertIsNot(session.client('ec2', 'us-west-2'), client)
+        self.assertIsNot(
+            session.client('ec2', endpoint_url='https://ec2.us-east-1.amazonaws.com'),
+            client)
+        self.assertIsNot(session.client('sqs'), session.client('sqs', config=Config()))
+        self.assertIsNot(session.client('ec2', verify=False), client)
+
+        # clients are per credentials
+        self.patch(
+            CustodianSession, '_get_access_key', lambda self: 'AKIDOTHER')
+        self.assertIsNot(session.client('ec2'), client)
+
+        # clients are per factory scope, with the scope's handlers
+        self.assertIsNot(SessionFactory('us-east-1')().client('ec2'), client)
+
+        CustodianSession.close()
+        self.assertEqual(len(client_pool.clients), 0)
+        self.assertIsNot(session.client('ec2'), client)
+
+    def test_client_pool_session_update(self):
+        self.addCleanup(CustodianSession.close)
+        calls = []
+        factory = SessionFactory('us-east-1')
+        session = factory()
+        client = session.client('sqs')
+
+        # a policy's subscribers and user agent apply to clients after an update
+        factory.policy_name = 'check-sqs'
+        factory.set_subscribers((
+            lambda s: s.events.register('c7n-test.*', lambda **kw: calls.append(1)),))
+        factory.update(session)
+        updated = session.client('sqs')
+        self.assertIsNot(updated, client)
+        self.assertIs(session.client('sqs'), updated)
+        # the factory's other sessions share the updated client
+        self.assertIs(factory().client('sqs'), updated)
+        factory.update(session)
+        self.assertIs(session.client('sqs'), updated)
+        self.assertIn('check-sqs', updated.meta.config.user_agent)
+        self.assertNotIn('check-sqs', client.meta.config.user_agent)
+        updated.meta.events.emit('c7n-test.sqs')
+        client.meta.events.emit('c7n-test.sqs')
+        self.assertEqual(calls, [1])
@@ -11,6 +11,7 @@ from dateutil import tz
 
 from c7n.testing import mock_datetime_now
 from c7n.exceptions import PolicyValidationError, ClientError
+from c7n.executor import MainThreadExecutor
 from c7n.resources import ec2
 from c7n.resources.ec2 import actions, QueryFilter
 from c7n import tags, utils
@@ -27,6 +28,7 @@ from pytest_terraform import terraform
 def test_ec2_stop_protection_enabled(test, ec2_stop_protection_enabled):
     aws_region = 'us-east-1'
     session_factory = test.replay_flight_data('ec2_stop_protection_enabled', region=aws_region)
+    test.patch(ec2.EC2, 'executor_factory', MainThreadExecutor)
 
     p = test.load_policy(
         {
@@ -70,6 +72,7 @@ def test_ec2_stop_protection_enabled(test, ec2_stop_protection_enabled):
 def test_ec2_stop_protection_disabled(test, ec2_stop_protection_disabled):
     aws_region = 'us-east-1'
     session_factory = test.replay_flight_data('ec2_stop_protection_disabled', region=aws_region)
+    test.patch(ec2.EC2, 'executor_factory', MainThreadExecutor)
 
     p = test.load_policy(
         {
@@ -358,6 +361,7 @@ class TestDisableApiTermination(BaseTest):
         session_factory = self.replay_flight_data(
             "test_ec2_termination-protected_filter"
         )
+        self.patch(ec2.EC2, "executor_factory", MainThreadExecutor)
         policy = self.load_policy(
             {
                 "name": "ec2-termination-enabled",
@@ -374,6 +378,7 @@ class TestDisableApiTermination(BaseTest):
         session_factory = self.replay_flight_data(
             "test_ec2_termination-protected_filter"
         )
+        self.patch(ec2.EC2, "executor_factory", MainThreadExecutor)
         policy = self.load_policy(
             {
                 "name": "ec2-termination-NOT-enabled",
@@ -2225,6 +2230,8 @@ class TestUserData(BaseTest):
         )
         resources = policy.run()
         self.assertGreater(len(resources), 0)
+        # the raw attribute response isn't kept alongside the decoded user data
+        self.assertTrue(all("c7n:attribute-userData" not in r for r in resources))
 
 
 class TestLaunchTemplate(BaseTest):
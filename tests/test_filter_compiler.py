@@ -0,0 +1,201 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+import copy
+from datetime import datetime, timedelta
+
+from dateutil import tz
+import pytest
+
+from c7n.filters import columnar
+from c7n.filters.compiler import CompiledStep, compile_filters, parse_resource_date
+from c7n.utils import parse_date
+
+from .common import BaseTest
+
+
+def sample_resources():
+    now = datetime.now(tz=tz.tzutc())
+    resources = []
+    for idx in range(24):
+        r = {
+            'InstanceId': 'i-%04d' % idx,
+            'InstanceType': ('t2.micro', 'm5.large', 'c5.xlarge')[idx % 3],
+            'State': {'Name': ('running', 'stopped')[idx % 2]},
+            'LaunchTime': (now - timedelta(days=idx * 5)).isoformat(),
+            'PrivateIpAddress': '10.0.%d.%d' % (idx % 4, idx),
+            'CpuOptions': {'CoreCount': idx % 5},
+            'SecurityGroups': [{'GroupId': 'sg-%d' % j} for j in range(idx % 4)],
+            'ImageId': 'ami-%d' % (idx % 2),
+            'Version': '1.%d.0' % (idx % 7),
+            'Tags': [{'Key': 'Env', 'Value': ('Prod', ' dev ', 'stage')[idx % 3]}],
+        }
+        if idx % 4 == 0:
+            r['Tags'].append({'Key': 'Owner', 'Value': 'team-%d' % idx})
+        if idx % 5 == 0:
+            r['c7n:MatchedFilters'] = ['prior']
+        resources.append(r)
+    return resources
+
+
+FILTERS = [
+    {'State.Name': 'running'},
+    {'tag:Owner': 'absent'},
+    {'tag:Owner': 'present'},
+    {'type': 'value', 'key': 'tag:Env', 'value': 'dev', 'value_type': 'normalize'},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'in', 'value': ['t2.micro', 'c5.xlarge']},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'not-in', 'value': ['t2.micro']},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'regex', 'value': 'T2.*'},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'glob', 'value': 'm5.*'},
+    {'type': 'value', 'key': 'LaunchTime', 'op': 'gt', 'value': 30, 'value_type': 'age'},
+    {'type': 'value', 'key': 'LaunchTime', 'op': 'lt', 'value': 30,
+     'value_type': 'expiration'},
+    {'type': 'value', 'key': 'LaunchTime', 'op': 'gte', 'value_type': 'date',
+     'value': (datetime.now() - timedelta(days=50)).strftime('%Y-%m-%d')},
+    {'type': 'value', 'key': 'PrivateIpAddress', 'op': 'in', 'value': '10.0.1.0/24',
+     'value_type': 'cidr'},
+    {'type': 'value', 'key': 'CpuOptions.CoreCount', 'op': 'gte', 'value': 2,
+     'value_type': 'integer'},
+    {'type': 'value', 'key': 'SecurityGroups', 'op': 'gt', 'value': 1, 'value_type': 'size'},
+    {'type': 'value', 'key': 'SecurityGroups[].GroupId', 'op': 'contains', 'value': 'sg-2'},
+    {'type': 'value', 'key': 'Version', 'op': 'gte', 'value': '1.3.0',
+     'value_type': 'version'},
+    {'type': 'value', 'key': 'InstanceId', 'value_regex': 'i-00(..)', 'value': '01'},
+    {'type': 'value', 'key': 'tag:Env', 'value': 'Prod', 'value_type': 'swap'},
+    {'type': 'value', 'key': 'ImageId', 'value': 'ImageId', 'value_type': 'expr'},
+]
+
+
+class FilterCompilerTest(BaseTest):
+
+    def get_manager(self, filters, resource='ec2', **config):
+        p = self.load_policy({
+            'name': 'compiled', 'resource': resource, 'filters': filters}, config=config)
+        return p.resource_manager
+
+    def assert_parity(self, filters, resources=None, resource='ec2', **config):
+        m = self.get_manager(filters, resource, **config)
+        self.assertIsNotNone(m.filter_plan)
+        interpreted = copy.deepcopy(resources or sample_resources())
+        compiled = copy.deepcopy(interpreted)
+
+        plan, m.filter_plan = m.filter_plan, None
+        expected = m.filter_resources(interpreted)
+        m.filter_plan = plan
+        results = m.filter_resources(compiled)
+
+        key = lambda r: r[m.get_model().id]  # noqa: E731
+        self.assertEqual(sorted(results, key=key), sorted(expected, key=key))
+        # including annotations on resources that didn't match
+        self.assertEqual(compiled, interpreted)
+        return results
+
+    def test_value_filter_parity(self):
+        for f in FILTERS:
+            with self.subTest(filter=f):
+                self.assert_parity([f])
+
+    def test_block_parity(self):
+        self.assertTrue(self.assert_parity([
+            {'or': [FILTERS[0], FILTERS[2], {'and': [FILTERS[4], FILTERS[8]]}]},
+            {'not': [FILTERS[5], FILTERS[12]]},
+            {'and': [FILTERS[3], {'not': [FILTERS[13]]}]},
+        ]))
+        self.assertTrue(self.assert_parity([{'or': FILTERS}]))
+        self.assertTrue(self.assert_parity([{'not': FILTERS}]))
+
+    def test_plan_steps(self):
+        m = self.get_manager([
+            FILTERS[0], FILTERS[1],
+            {'type': 'value', 'value_type': 'resource_count', 'op': 'gt', 'value': 1},
+            {'or': [FILTERS[2], {'type': 'ephemeral'}]},
+            FILTERS[3]])
+        steps = m.filter_plan.steps
+        self.assertEqual(
+            [s.type for s in steps], ['compiled', 'value', 'or', 'compiled'])
+        self.assertEqual(len(steps[0].nodes), 2)
+        self.assertIsInstance(steps[-1], CompiledStep)
+
+        # a plan is only used for the filters it was compiled from
+        self.assertTrue(m.filter_plan.is_current(m.filters))
+        m.filters.pop()
+        self.assertFalse(m.filter_plan.is_current(m.filters))
+
+    def test_no_plan(self):
+        self.assertIsNone(compile_filters([]))
+        m = self.get_manager([{'type': 'ephemeral'}])
+        self.assertIsNone(m.filter_plan)
+
+
+def sample_snapshots():
+    now = datetime.now(tz=tz.tzutc())
+    snapshots = []
+    for idx in range(40):
+        start = now - timedelta(days=idx, hours=idx)
+        snapshots.append({
+            'SnapshotId': 'snap-%04d' % idx,
+            'StartTime': (
+                start, start.replace(tzinfo=None), start.isoformat(),
+                start.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                start.strftime('%Y-%m-%d %H:%M:%S'),
+                start.astimezone(tz.tzoffset(None, -7200)).isoformat())[idx % 6],
+            'VolumeSize': (8, 100.5, '30', None, True, 2 ** 60)[idx % 6],
+            'State': ('completed', 'pending', 'error', None)[idx % 4],
+        })
+    return snapshots
+
+
+@pytest.mark.skipif(columnar.np is None, reason="numpy not installed")
+class ColumnarTest(FilterCompilerTest):
+
+    def setUp(self):
+        super().setUp()
+        self.patch(columnar, 'MIN_RESOURCES', 0)
+
+    def assert_parity(self, filters, resources=None, resource='ec2'):
+        return super().assert_parity(filters, resources, resource, columnar=True)
+
+    def test_columnar_steps(self):
+        m = self.get_manager([
+            FILTERS[0], FILTERS[4], FILTERS[6], FILTERS[8], FILTERS[12],
+            {'or': [FILTERS[1], FILTERS[2]]}], columnar=True)
+        step = m.filter_plan.steps[0]
+        self.assertIsInstance(step, columnar.ColumnarStep)
+        self.assertEqual(
+            [v and v.kind for v in step.vectors],
+            ['string', 'string', None, 'date', 'number', None])
+
+    def test_snapshot_parity(self):
+        filters = [
+            [{'type': 'age', 'days': 10}],
+            [{'type': 'age', 'days': 10, 'op': 'lt'}],
+            [{'type': 'value', 'key': 'StartTime', 'value_type': 'age',
+              'op': 'gte', 'value': 5}],
+            [{'type': 'value', 'key': 'StartTime', 'value_type': 'expiration',
+              'op': 'lt', 'value': -20}],
+            [{'type': 'value', 'key': 'StartTime', 'value_type': 'date', 'op': 'lt',
+              'value': (datetime.now() - timedelta(days=12)).strftime('%Y-%m-%d')}],
+            [{'type': 'value', 'key': 'VolumeSize', 'op': 'gt', 'value': 10}],
+            [{'type': 'value', 'key': 'VolumeSize', 'op': 'ni', 'value': [8, 30]}],
+            [{'type': 'value', 'key': 'VolumeSize', 'op': 'lte', 'value': 30,
+              'value_type': 'integer'}],
+            [{'type': 'value', 'key': 'State', 'op': 'in', 'value': ['pending', 'error']}],
+            [{'type': 'value', 'key': 'State', 'op': 'ne', 'value': 'completed'}],
+            [{'State': 'completed'}, {'type': 'age', 'days': 3}],
+        ]
+        for f in filters:
+            with self.subTest(filter=f):
+                self.assert_parity(f, sample_snapshots(), 'ebs-snapshot')
+
+    def test_invalid_dates(self):
+        snapshots = sample_snapshots()
+        snapshots[2]['StartTime'] = '2023-13-01T00:00:00Z'
+        self.assert_parity(
+            [{'type': 'value', 'key': 'StartTime', 'value_type': 'age',
+              'op': 'gte', 'value': 5}], snapshots, 'ebs-snapshot')
+
+
+def test_parse_resource_date():
+    for v in ('2023-04-01T10:20:30.123Z', '2023-04-01T10:20:30+00:00',
+              '2023-04-01 10:20:30.5-0700', '2023-04-01', '2023-04-01T10:20',
+              'Sat, 01 Apr 2023 10:20:30 GMT', 1680344430, None):
+        assert parse_resource_date(v) == parse_date(v)
@@ -6,10 +6,13 @@ from collections import namedtuple
 from datetime import datetime, timedelta
 from dateutil import tz
 from dateutil.parser import parse as parse_date
+import logging
 import random
 import unittest
 import os
 
+from botocore.exceptions import ClientError
+
 from c7n.exceptions import PolicyValidationError, PolicyExecutionError
 from c7n.executor import MainThreadExecutor
 from c7n import filters as base_filters
@@ -18,7 +21,8 @@ from c7n.resources.elb import ELB
 from c7n.testing import mock_datetime_now
 from c7n.utils import annotation
 from .common import instance, event_data, Bag, BaseTest
-from c7n.filters.core import AnnotationSweeper, ValueRegex, parse_date as core_parse_date
+from c7n.filters.core import (
+    AnnotationSweeper, ValueRegex, block_context, parse_date as core_parse_date)
 
 
 class BaseFilterTest(unittest.TestCase):
@@ -1196,6 +1200,106 @@ class TestMetricsFilter(BaseTest):
                 self.assertEqual(parse_date(expected_start), window.start)
                 self.assertEqual(parse_date(expected_end), window.end)
 
+    def test_metrics_get_metric_data(self):
+        session_factory = self.replay_flight_data("test_metrics_get_metric_data")
+        policy = {
+            "name": "ec2-low-cpu",
+            "resource": "ec2",
+            "filters": [{
+                "type": "metrics",
+                "name": "CPUUtilization",
+                "days": 1,
+                "period": 43200,
+                "value": 10,
+                "op": "less-than"}]}
+        instances = [
+            {"InstanceId": "i-a"}, {"InstanceId": "i-b"}, {"InstanceId": "i-a"}]
+
+        with mock_datetime_now(parse_date("2020-12-03T04:47:15+00:00"), base_filters.metrics):
+            p = self.load_policy(
+                policy, session_factory=session_factory, config={"account_id": "123"})
+            # pages are merged per query, and resources with the same
+            # dimensions share a query.
+            resources = p.resource_manager.filters[0].process(copy.deepcopy(instances))
+            self.assertEqual([r["InstanceId"] for r in resources], ["i-a", "i-a"])
+            datapoints = resources[0]["c7n.metrics"]["AWS/EC2.CPUUtilization.Average.1"]
+            self.assertEqual([d["Average"] for d in datapoints], [3.5, 4.0])
+
+            # other policies in the run reuse fetched metrics
+            p = self.load_policy(
+                dict(policy, name="ec2-low-cpu-2"),
+                session_factory=session_factory, config={"account_id": "123"})
+            self.patch(base_filters.metrics.MetricsFilter, "get_metric_data", None)
+            resources = p.resource_manager.filters[0].process(copy.deepcopy(instances))
+            self.assertEqual(len(resources), 2)
+
+    def test_metrics_get_metric_data_status(self):
+        session_factory = self.replay_flight_data("test_metrics_get_metric_data_status")
+        policy = {
+            "name": "ec2-low-cpu",
+            "resource": "ec2",
+            "filters": [{
+                "type": "metrics",
+                "name": "CPUUtilization",
+                "days": 1,
+                "period": 43200,
+                "value": 10,
+                "op": "less-than"}]}
+        instances = [{"InstanceId": i} for i in ("i-a", "i-b", "i-c")]
+
+        with mock_datetime_now(parse_date("2020-12-03T04:47:15+00:00"), base_filters.metrics):
+            p = self.load_policy(
+                policy, session_factory=session_factory, config={"account_id": "123"})
+            output = self.capture_logging("custodian.filters", level=logging.WARNING)
+            metrics_filter = p.resource_manager.filters[0]
+            resources = metrics_filter.process(copy.deepcopy(instances))
+            # pages are followed past partial data, partial results are
+            # still evaluated, and queries with an internal error are dropped.
+            self.assertEqual([r["InstanceId"] for r in resources], ["i-a", "i-b"])
+            self.assertEqual(
+                [d["Average"] for d in resources[1]["c7n.metrics"][
+                    "AWS/EC2.CPUUtilization.Average.1"]],
+                [2.5, 2.0])
+            self.assertIn("MaxDatapointsExceeded", output.getvalue())
+            self.assertIn("InternalError", output.getvalue())
+
+            # only complete results are shared with other policies
+            cached = [
+                base_filters.metrics.metric_cache.get(metrics_filter.get_metric_key(
+                    metrics_filter.get_dimensions(r) + metrics_filter.get_user_dimensions()))
+                for r in instances]
+            self.assertEqual([c is not None for c in cached], [True, False, False])
+
+    def test_metrics_failed_query_split(self):
+        calls = []
+
+        def get_metric_data(self, query_dimensions):
+            ids = [d[0]["Value"] for d in query_dimensions]
+            calls.append(ids)
+            if "i-bad" in ids:
+                raise ClientError(
+                    {"Error": {"Code": "InvalidParameterValue", "Message": "bad"}},
+                    "GetMetricData")
+            return [([{"Average": 1.0}], True) for _ in ids]
+
+        self.patch(base_filters.metrics.MetricsFilter, "get_metric_data", get_metric_data)
+        p = self.load_policy({
+            "name": "ec2-low-cpu",
+            "resource": "ec2",
+            "filters": [{
+                "type": "metrics",
+                "name": "CPUUtilization",
+                "days": 1,
+                "value": 10,
+                "op": "less-than"}]}, config={"account_id": "123"})
+        instances = [{"InstanceId": i} for i in ("i-a", "i-b", "i-bad", "i-c")]
+        resources = p.resource_manager.filters[0].process(instances)
+        # only the failing query's resource is dropped
+        self.assertEqual([r["InstanceId"] for r in resources], ["i-a", "i-b", "i-c"])
+        self.assertEqual(calls, [
+            ["i-a", "i-b", "i-bad", "i-c"], ["i-a", "i-b"], ["i-bad", "i-c"],
+            ["i-bad"], ["i-c"]])
+
     def test_metric_period_too_long(self):
         """The longest CloudWatch retention period is 455 days. If we specify a period like 900
         days, CloudWatch will happily show us 455 days of data with a start date 900 days ago.
@@ -1783,6 +1887,93 @@ class AnnotationSweeperTest(unittest.TestCase):
         self.assertEqual(len(resources), 2)
         self.assertEqual(resources, swept)
 
+    def test_annotation_sweep_in_place_updates(self):
+        resources = [
+            {"InstanceId": "i-1", "c7n:MatchedFilters": ["a"], "c7n:Meta": {"a": 1}},
+            {"InstanceId": "i-2", "c7n:MatchedFilters": ["a"]},
+        ]
+        sweeper = AnnotationSweeper("InstanceId", resources)
+        for r in resources:
+            r["c7n:MatchedFilters"].append("b")
+            r.setdefault("c7n:Meta", {})["b"] = 2
+        sweeper.sweep(resources[1:])
+        self.assertEqual(
+            resources[0], {"InstanceId": "i-1", "c7n:MatchedFilters": ["a"], "c7n:Meta": {"a": 1}})
+        self.assertEqual(resources[1]["c7n:MatchedFilters"], ["a", "b"])
+        self.assertEqual(resources[1]["c7n:Meta"], {"b": 2})
+
+
+class BlockContextTest(unittest.TestCase):
+
+    def test_block_context_nested(self):
+        r = {"metadata": {"uid": "foo"}}
+        with block_context("metadata.uid") as ctx:
+            self.assertEqual(ctx.resource_id(r), "foo")
+            with block_context("metadata.uid") as nested:
+                self.assertIs(nested, ctx)
+            with block_context("id") as other:
+                self.assertIsNot(other, ctx)
+            with block_context("metadata.uid") as nested:
+                self.assertIs(nested, ctx)
+        with block_context("metadata.uid") as fresh:
+            self.assertIsNot(fresh, ctx)
+
+
+class RelatedIndexTest(BaseTest):
+
+    def test_related_index_shared_across_policies(self):
+        from c7n.filters.related import related_index
+        from c7n.resources.vpc import SecurityGroup
+
+        session_factory = self.replay_flight_data("test_ec2_security_group_filter")
+        self.patch(filters.get("security-group"), "FetchThreshold", 0)
+        fetches = []
+        sg_resources = SecurityGroup.resources
+
+        def resources(manager, *args, **kw):
+            fetches.append(manager)
+            return sg_resources(manager, *args, **kw)
+
+        self.patch(SecurityGroup, "resources", resources)
+
+        for value in ("sg-926a56e8", "sg-411b413c"):
+            p = self.load_policy({
+                "name": "sg-%s" % value,
+                "resource": "ec2",
+                "filters": [
+                    {"type": "security-group", "key": "GroupId", "value": value}]},
+                session_factory=session_factory)
+            p.run()
+        self.assertEqual(len(fetches), 1)
+        index = related_index.get(fetches[0], build=False)
+        self.assertEqual(
+            sorted(index.select(["sg-926a56e8", "sg-411b413c", "sg-absent"])),
+            ["sg-411b413c", "sg-926a56e8"])
+
+        related_index.clear()
+        self.assertIsNone(related_index.get(fetches[0], build=False))
+
+    def test_resource_index_group(self):
+        from c7n.filters.related import ResourceIndex
+
+        resources = [
+            {"Id": "a", "Vpcs": ["vpc-1", "vpc-2"]},
+            {"Id": "b", "Vpcs": ["vpc-2"]},
+            {"Id": "c", "Vpcs": []}]
+        index = ResourceIndex(resources, "Id")
+        calls = []
+
+        def get_keys(r):
+            calls.append(r["Id"])
+            return r["Vpcs"]
+
+        by_vpc = index.group("Vpcs", get_keys)
+        self.assertEqual(
+            {k: [r["Id"] for r in v] for k, v in by_vpc.items()},
+            {"vpc-1": ["a"], "vpc-2": ["a", "b"]})
+        self.assertIs(index.group("Vpcs", get_keys), by_vpc)
+        self.assertEqual(calls, ["a", "b", "c"])
+
 
 if __name__ == "__main__":
     unittest.main()
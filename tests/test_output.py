@@ -11,7 +11,10 @@ from dateutil.parser import parse as date_parse
 
 from c7n.ctx import ExecutionContext
 from c7n.config import Config
-from c7n.output import DirectoryOutput, BlobOutput, LogFile, metrics_outputs
+from c7n import output as blob_output_module
+from c7n.executor import MainThreadExecutor
+from c7n.output import (
+    DirectoryOutput, BlobOutput, BlobUploads, LogFile, load_records, metrics_outputs)
 from c7n.resources.aws import S3Output, MetricsOutput, inspect_bucket_region
 from c7n.testing import mock_datetime_now, TestUtils
 
@@ -45,6 +48,21 @@ class DirOutputTest(BaseTest):
         self.assertEqual(os.listdir(work_dir), ["myoutput"])
         self.assertTrue(os.path.isdir(os.path.join(work_dir, "myoutput")))
 
+    def test_dir_output_resources_jsonl(self):
+        _, output = self.get_dir_output("file://myoutput")
+        resources = [{"InstanceId": "i-1"}, {"InstanceId": "i-2"}]
+        output.write_resources(resources, 'jsonl.gz')
+        path = os.path.join(output.root_dir, "resources.jsonl.gz")
+        with gzip.open(path, "rt") as fh:
+            self.assertEqual(fh.read(), '{"InstanceId": "i-1"}\n{"InstanceId": "i-2"}\n')
+        with open(path, "rb") as fh:
+            self.assertEqual(load_records(fh, path), resources)
+
+    def test_dir_output_resources_json(self):
+        _, output = self.get_dir_output("file://myoutput")
+        output.write_resources([{"InstanceId": "i-1"}])
+        self.assertEqual(os.listdir(output.root_dir), ["resources.json"])
+
 
 class S3OutputTest(TestUtils):
 
@@ -139,6 +157,12 @@ class S3OutputTest(TestUtils):
                 with gzip.open(os.path.join(root, f)) as fh:
                     self.assertEqual(fh.read(), b"abc")
 
+    def test_compress_skips_compressed(self):
+        output = self.get_s3_output()
+        output.write_resources([{"InstanceId": "i-1"}], 'jsonl.gz')
+        output.compress()
+        self.assertEqual(os.listdir(output.root_dir), ["resources.jsonl.gz"])
+
     def test_upload(self):
 
         with mock_datetime_now(date_parse('2018/09/01 13:00'), datetime):
@@ -160,6 +184,27 @@ class S3OutputTest(TestUtils):
             extra_args={"ACL": "bucket-owner-full-control", "ServerSideEncryption": "AES256"},
         )
 
+    def test_stream_upload(self):
+        self.patch(blob_output_module, 'blob_uploads', BlobUploads())
+        self.patch(blob_output_module, 'ThreadPoolExecutor', MainThreadExecutor)
+        output = self.get_s3_output(
+            output_url="s3://cloud-custodian/policies?stream=true", cleanup=False)
+        output._transfer = mock.MagicMock()
+        keys = []
+        output._transfer.upload_file.side_effect = (
+            lambda path, bucket, key, extra_args: keys.append(key))
+
+        with output:
+            output.write_file("metadata.json", "{}")
+            # uploaded as written
+            self.assertEqual(keys, ["%s/metadata.json.gz" % output.key_prefix])
+            with open(os.path.join(output.root_dir, "custodian-run.log"), "w") as fh:
+                fh.write("abc")
+
+        self.assertEqual(keys[1:], ["%s/custodian-run.log.gz" % output.key_prefix])
+        self.assertFalse(os.path.exists(output.root_dir))
+        self.assertFalse(os.path.exists(output.stage_dir))
+
     def test_sans_prefix(self):
         output = self.get_s3_output()
 
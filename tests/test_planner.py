@@ -0,0 +1,61 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+from c7n.planner import FetchPlanner, SnapshotCache
+
+from .common import BaseTest
+
+
+class FetchPlannerTest(BaseTest):
+
+    def get_policies(self, session_factory):
+        policies = [
+            self.load_policy({
+                'name': 'ec2-running',
+                'resource': 'ec2',
+                'filters': [{'State.Name': 'running'}]},
+                session_factory=session_factory),
+            self.load_policy({
+                'name': 'ec2-all',
+                'resource': 'ec2'},
+                session_factory=session_factory),
+            self.load_policy({
+                'name': 'ec2-lambda',
+                'resource': 'ec2',
+                'mode': {'type': 'periodic', 'schedule': 'rate(1 day)'}},
+                session_factory=session_factory),
+        ]
+        return policies
+
+    def test_plan_groups(self):
+        factory = self.replay_flight_data('test_ec2_state_transition_age_filter')
+        policies = self.get_policies(factory)
+        groups = FetchPlanner(policies).plan()
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(
+            [p.name for p in groups[0].policies], ['ec2-running', 'ec2-all'])
+        self.assertEqual(groups[0].key['resource'], 'EC2')
+
+    def test_shared_fetch(self):
+        factory = self.replay_flight_data('test_ec2_state_transition_age_filter')
+        policies = self.get_policies(factory)[:2]
+        fetched = []
+
+        for p in policies:
+            source = p.resource_manager.source
+            self.patch(
+                source, 'resources',
+                lambda query, _f=source.resources: fetched.append(query) or _f(query))
+
+        snapshots = FetchPlanner(policies).execute()
+        self.assertEqual(len(fetched), 1)
+        self.assertEqual(len(snapshots), 1)
+        self.assertIsInstance(policies[0].resource_manager._cache, SnapshotCache)
+
+        running = policies[0].resource_manager.resources()
+        everything = policies[1].resource_manager.resources()
+        self.assertEqual(len(fetched), 1)
+        self.assertEqual(len(snapshots), 0)
+        self.assertTrue(len(everything) >= len(running))
+        self.assertTrue(everything)
+        # the first consumer gets a copy of the shared snapshot
+        self.assertFalse(set(map(id, running)).intersection(map(id, everything)))
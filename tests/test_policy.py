@@ -1056,7 +1056,7 @@ class PolicyMeta(BaseTest):
             {
                 "ec2:DescribeInstances",
                 "ec2:DescribeTags",
-                "cloudwatch:GetMetricStatistics",
+                "cloudwatch:GetMetricData",
             },
         )
 
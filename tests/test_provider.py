@@ -1,11 +1,16 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
-
+import json
+import subprocess
+import sys
 
 from .common import BaseTest
 
+from c7n.policy import execution
 from c7n.provider import get_resource_class, import_resource_classes
 from c7n.resources import load_resources
+from c7n.resources.aws import AWS
+from c7n.resources.extension_map import ExtensionMap
 from c7n.resources.resource_map import ResourceMap
 
 
@@ -33,3 +38,44 @@ class ProviderTest(BaseTest):
         load_resources(('aws.ec2',))
         ec2 = get_resource_class('aws.ec2')
         self.assertEqual(ec2.type, 'ec2')
+
+    def test_extension_map(self):
+        # regenerate with tools/dev/extensionmap.py
+        load_resources(('aws.*',))
+        registries = {
+            'actions': [r.action_registry for r in AWS.resources.values()],
+            'filters': [r.filter_registry for r in AWS.resources.values()]}
+        for kind, elements in ExtensionMap.items():
+            for name, module in elements.items():
+                if kind == 'modes':
+                    self.assertEqual(execution[name].__module__, module)
+                    continue
+                self.assertTrue(
+                    any(name in registry for registry in registries[kind]), name)
+
+    def test_load_extensions(self):
+        # only the modules the policy references are imported
+        script = """
+import json, sys
+from c7n.config import Config
+from c7n.loader import PolicyLoader
+PolicyLoader(Config.empty()).load_data({'policies': [{
+    'name': 'queues', 'resource': 'aws.sqs',
+    'filters': [{'or': [{'type': 'ops-item'}]}]}]}, 'memory://')
+print(json.dumps(sorted(sys.modules)))
+"""
+        modules = set(json.loads(subprocess.check_output([sys.executable, '-c', script])))
+        self.assertIn('c7n.resources.ssm', modules)
+        self.assertNotIn('c7n.resources.sfn', modules)
+        self.assertNotIn('aws_xray_sdk', modules)
+
+    def test_schema_cmd_extensions(self):
+        # the schema command describes generic elements which aren't referenced
+        def schema(*args):
+            return subprocess.check_output(
+                [sys.executable, '-m', 'c7n.cli', 'schema'] + list(args), text=True)
+
+        self.assertIn('invoke-sfn', schema('aws.ec2.actions'))
+        self.assertIn('post-item', schema('ec2.actions'))
+        self.assertIn('json-diff', schema('aws.security-group.filters'))
+        self.assertIn('hub-finding', schema('mode'))
@@ -1,11 +1,19 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
+from datetime import datetime, timedelta
 import json
 import logging
 import os
 
 
-from c7n.query import ResourceQuery, RetryPageIterator, TypeInfo
+from c7n.config import Config as C7NConfig
+from c7n.exceptions import PolicyValidationError
+from c7n.executor import MainThreadExecutor
+from c7n.query import (
+    ChildResourceQuery, ConfigSource, ResourceQuery, RetryPageIterator, TypeInfo,
+    parent_cache)
+from c7n.resources.ec2 import EC2, instance_attribute
+from c7n.resources.ecs import ECSCluster, Service, Task
 from c7n.resources.vpc import InternetGateway
 
 from botocore.config import Config
@@ -73,6 +81,16 @@ class ResourceQueryTest(BaseTest):
         self.assertEqual(len(resources), 1)
         self.assertEqual(resources[0]["InstanceId"], "i-9432cb49")
 
+    def test_query_iter_filter(self):
+        session_factory = self.replay_flight_data('test_query_pagination_retry')
+        p = self.load_policy(
+            {'name': 'log-groups', 'resource': 'log-group'},
+            session_factory=session_factory)
+        q = ResourceQuery(p.session_factory)
+        pages = list(q.iter_filter(p.resource_manager))
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(sum(map(len, pages)), 11)
+
     def test_query_get(self):
         session_factory = self.replay_flight_data("test_query_get")
         p = self.load_policy(
@@ -99,11 +117,185 @@ class ResourceQueryTest(BaseTest):
         assert repr(TypeInfo) == "<TypeInfo TypeInfo>"
 
 
+class ChildResourceQueryTest(BaseTest):
+
+    def test_child_query_shares_parents(self):
+        session_factory = self.replay_flight_data("test_ecs_service_subnet")
+        self.patch(Service, "executor_factory", MainThreadExecutor)
+        fetches = []
+        cluster_resources = ECSCluster.resources
+
+        def resources(manager, *args, **kw):
+            fetches.append(manager)
+            return cluster_resources(manager, *args, **kw)
+
+        self.patch(ECSCluster, "resources", resources)
+        p = self.load_policy(
+            {"name": "ecs-services", "resource": "ecs-service"},
+            session_factory=session_factory)
+        q = ChildResourceQuery(p.session_factory, p.resource_manager, capture_parent_id=True)
+
+        # only the test cluster has services
+        pages = list(q.iter_filter(p.resource_manager))
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(
+            pages[0],
+            [("arn:aws:ecs:us-east-1:644160558196:cluster/test", s) for s in (
+                "arn:aws:ecs:us-east-1:644160558196:service/test/c7n-test",
+                "arn:aws:ecs:us-east-1:644160558196:service/test-no-tag")])
+
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(
+            len(parent_cache.get(p.resource_manager.get_parent_manager())), 4)
+        self.assertEqual(len(fetches), 1)
+
+    def test_child_query_shares_parents_across_types(self):
+        session_factory = self.replay_flight_data("test_child_query_shared_parents")
+        self.patch(Service, "executor_factory", MainThreadExecutor)
+        self.patch(Task, "executor_factory", MainThreadExecutor)
+        fetches = []
+        cluster_resources = ECSCluster.resources
+
+        def resources(manager, *args, **kw):
+            fetches.append(manager)
+            return cluster_resources(manager, *args, **kw)
+
+        self.patch(ECSCluster, "resources", resources)
+        children = {}
+        for resource in ("ecs-service", "ecs-task"):
+            p = self.load_policy(
+                {"name": resource, "resource": resource},
+                session_factory=session_factory)
+            q = ChildResourceQuery(p.session_factory, p.resource_manager)
+            children[resource] = q.filter(p.resource_manager)
+
+        self.assertEqual(children, {
+            "ecs-service": [
+                "arn:aws:ecs:us-east-1:644160558196:service/test/c7n-test",
+                "arn:aws:ecs:us-east-1:644160558196:service/test-no-tag"],
+            "ecs-task": ["arn:aws:ecs:us-east-1:644160558196:task/test/a1b2c3d4"]})
+        # both child types enumerated the clusters through one parent query
+        self.assertEqual(len(fetches), 1)
+
+
+class DetailTest(BaseTest):
+
+    def test_get_details_shared(self):
+        session_factory = self.replay_flight_data("test_ec2_termination-protected_filter")
+        self.patch(EC2, "executor_factory", MainThreadExecutor)
+        calls = []
+        get_detail = EC2._get_detail
+
+        def _get_detail(manager, client, limiter, spec, params):
+            calls.append(params["InstanceId"])
+            return get_detail(manager, client, limiter, spec, params)
+
+        self.patch(EC2, "_get_detail", _get_detail)
+        for f in ({"type": "termination-protected"},
+                  {"type": "instance-attribute", "attribute": "disableApiTermination",
+                   "key": "Value", "value": True}):
+            p = self.load_policy(
+                {"name": "ec2-term", "resource": "ec2", "filters": [f]},
+                session_factory=session_factory)
+            resources = p.run()
+            self.assertEqual(
+                [r["InstanceId"] for r in resources], ["i-092f500eaad726b71"])
+            self.assertEqual(
+                resources[0]["c7n:attribute-disableApiTermination"], {"Value": True})
+        # the second policy's filter reuses the details fetched by the first.
+        self.assertEqual(len(calls), 3)
+
+        # actions modifying an attribute drop its shared detail
+        spec = instance_attribute("disableApiTermination")
+        p.resource_manager.invalidate_details(resources, spec)
+        resources[0].pop(spec.annotation)
+        p.resource_manager.get_details(resources, spec)
+        self.assertEqual(calls[3:], ["i-092f500eaad726b71"])
+
+
 class ConfigSourceTest(BaseTest):
 
     def test_config_select(self):
         pass
 
+    def test_config_batch_unprocessed(self):
+        factory = self.replay_flight_data('test_config_batch_unprocessed')
+        p = self.load_policy(
+            {'name': 'task-defs', 'resource': 'ecs-task-definition', 'source': 'config'},
+            session_factory=factory)
+        resources = p.run()
+        # retried unprocessed keys, in the listed order
+        self.assertEqual(
+            [r['family'] for r in resources], ['TEST', 'app-fargate-task'])
+
+    def test_config_batch_select_tags(self):
+        factory = self.replay_flight_data('test_config_batch_select_tags')
+        selects = []
+        self.patch(
+            ConfigSource, 'select_resource_config',
+            lambda self, client, expr, _s=ConfigSource.select_resource_config: (
+                selects.append(expr) or _s(self, client, expr)))
+        p = self.load_policy(
+            {'name': 'eks', 'resource': 'eks', 'source': 'config'},
+            session_factory=factory, config={'region': 'us-east-2'})
+        # eks tags are only in config's tags field, which batch items lack
+        resources = p.resource_manager.get_resources(['kapil-dev'])
+        self.assertEqual(resources[0]['name'], 'kapil-dev')
+        self.assertEqual(resources[0]['Tags'], [{'Key': 'Env', 'Value': 'dev'}])
+        self.assertEqual(
+            selects,
+            ["select resourceId, tags where resourceType = 'AWS::EKS::Cluster' "
+             "and resourceId in ('kapil-dev')"])
+
+    def test_config_aggregate_source(self):
+        factory = self.replay_flight_data('test_config_aggregate_source')
+        selects = []
+        self.patch(
+            ConfigSource, 'select_aggregate_resources',
+            lambda self, query, _s=ConfigSource.select_aggregate_resources: (
+                selects.append(query) or _s(self, query)))
+        policy = {
+            'name': 'elb-org', 'resource': 'elb', 'source': 'config',
+            'query': [{'aggregator': 'org'}]}
+
+        p = self.load_policy(
+            policy, session_factory=factory, config={'account_id': '644160558196'})
+        self.assertIn(
+            'config:SelectAggregateResourceConfig', p.resource_manager.source.get_permissions())
+        resources = p.run()
+        self.assertEqual([r['LoadBalancerName'] for r in resources], ['web'])
+        self.assertEqual(resources[0]['Tags'], [{'Key': 'App', 'Value': 'web'}])
+
+        p = self.load_policy(
+            policy, session_factory=factory, config={'account_id': '123456789012'})
+        resources = p.run()
+        self.assertEqual([r['LoadBalancerName'] for r in resources], ['api', 'admin'])
+
+        # one select across both accounts
+        self.assertEqual(len(selects), 1)
+        self.assertTrue(selects[0]['expr'].startswith(
+            'select resourceId, accountId, awsRegion, configuration'))
+
+    def test_config_aggregate_source_expr(self):
+        with self.assertRaises(PolicyValidationError):
+            self.load_policy({
+                'name': 'elb-org', 'resource': 'elb', 'source': 'config',
+                'query': [{'aggregator': 'org'}, {'expr': 'select configuration'}]})
+
+    def test_config_aggregate_source_global(self):
+        item = {'resourceId': 'AROADMIN', 'accountId': '644160558196',
+                'awsRegion': 'global', 'supplementaryConfiguration': {},
+                'configuration': {'roleName': 'admin'}}
+        self.patch(
+            ConfigSource, 'select_aggregate_resources',
+            lambda self, query: {('644160558196', 'global'): [json.dumps(item)]})
+        p = self.load_policy(
+            {'name': 'role-org', 'resource': 'iam-role', 'source': 'config',
+             'query': [{'aggregator': 'org'}]},
+            config={'account_id': '644160558196', 'region': 'us-east-1'})
+        resources = p.resource_manager.source.resources()
+        self.assertEqual([r['RoleName'] for r in resources], ['admin'])
+
     def test_config_get_query(self):
         p = self.load_policy({'name': 'x', 'resource': 'ec2'})
         source = p.resource_manager.get_source('config')
@@ -154,6 +346,97 @@ class QueryResourceManagerTest(BaseTest):
         p.run()
         self.assertTrue("Using cached internet-gateway: 3", output.getvalue())
 
+    def test_stream_resources(self):
+        session_factory = self.replay_flight_data("test_query_model")
+        p = self.load_policy(
+            {
+                "name": "igw-check",
+                "resource": "internet-gateway",
+                "filters": [{"not": [{"InternetGatewayId": "igw-3d9e3d56"}]}],
+            },
+            session_factory=session_factory,
+        )
+        self.assertTrue(p.resource_manager.can_stream())
+        batches = []
+        self.patch(p.resource_manager, 'page_batch_size', 2)
+        self.patch(
+            p.resource_manager, 'filter_resources',
+            lambda resources, _f=p.resource_manager.filter_resources: (
+                batches.append(len(resources)) or _f(resources)))
+        resources = p.run()
+        self.assertEqual(len(resources), 2)
+        self.assertEqual(batches, [2, 1])
+        self.assertEqual(p.resource_manager.population_count, 3)
+
+    def test_stream_resources_disabled(self):
+        p = self.load_policy(
+            {
+                "name": "igw-check",
+                "resource": "internet-gateway",
+                "filters": [{"type": "reduce", "limit": 1}],
+            })
+        self.assertFalse(p.resource_manager.can_stream())
+        p = self.load_policy(
+            {
+                "name": "igw-check",
+                "resource": "internet-gateway",
+                "filters": [{
+                    "or": [{"type": "value", "value_type": "resource_count",
+                            "op": "gt", "value": 1}]}],
+            })
+        self.assertFalse(p.resource_manager.can_stream())
+        p = self.load_policy(
+            {"name": "igw-check", "resource": "internet-gateway"},
+            config=C7NConfig.empty(cache='memory', cache_period=300))
+        self.assertFalse(p.resource_manager.can_stream())
+
+    def test_stream_resources_cache(self):
+        session_factory = self.replay_flight_data("test_query_model")
+        policy = {
+            "name": "igw-check",
+            "resource": "internet-gateway",
+            "filters": [{"not": [{"InternetGatewayId": "igw-3d9e3d56"}]}],
+        }
+        p = self.load_policy(policy, session_factory=session_factory, cache=True)
+        self.assertTrue(p.resource_manager.can_stream())
+        self.patch(p.resource_manager, 'page_batch_size', 2)
+        resources = p.run()
+        self.assertEqual(len(resources), 2)
+
+        # the unfiltered set is cached as it streams
+        manager = p.resource_manager
+        cache_key = manager.get_cache_key(manager.source.get_query_params(None))
+        with manager._cache:
+            self.assertEqual(len(manager._cache.get(cache_key)), 3)
+            self.assertEqual(
+                list(manager._cache.get_resources(cache_key, ['igw-3d9e3d56'])),
+                ['igw-3d9e3d56'])
+
+        self.patch(manager.source, 'iter_resources', None)
+        output = self.capture_logging(name=manager.log.name, level=logging.DEBUG)
+        self.assertEqual(len(manager.resources()), 2)
+        self.assertIn("Using cached c7n.resources.vpc.InternetGateway: 3", output.getvalue())
+
+    def test_stream_resources_cache_error(self):
+        session_factory = self.replay_flight_data("test_query_model")
+        p = self.load_policy(
+            {"name": "igw-check", "resource": "internet-gateway"},
+            session_factory=session_factory, cache=True)
+        manager = p.resource_manager
+        self.patch(manager, 'page_batch_size', 2)
+
+        def augment(resources):
+            if len(resources) == 1:
+                raise ValueError("augment error")
+            return resources
+
+        self.patch(manager, 'augment', augment)
+        with self.assertRaises(ValueError):
+            manager.resources()
+        # an interrupted stream doesn't leave a cached resource set
+        with manager._cache:
+            self.assertIsNone(manager._cache.get(manager.get_cache_key(manager.source.get_query_params(None))))
+
     def test_get_resources(self):
         session_factory = self.replay_flight_data("test_query_manager_get")
         p = self.load_policy(
@@ -165,6 +448,57 @@ class QueryResourceManagerTest(BaseTest):
         resources = p.resource_manager.get_resources(["igw-5bce113f"])
         self.assertEqual(resources, [])
 
+    def test_get_cached_resources_refresh(self):
+        session_factory = self.replay_flight_data("test_query_model")
+        p = self.load_policy(
+            {"name": "igw-check", "resource": "internet-gateway"},
+            session_factory=session_factory, cache=True)
+        manager = p.resource_manager
+        self.assertEqual(len(manager.resources()), 3)
+
+        with manager._cache, manager._cache.conn:
+            manager._cache.conn.execute(
+                'update c7n_resources set create_date = ? where rid = ?',
+                (datetime.utcnow() - timedelta(days=1), 'igw-3d9e3d56'))
+        fetched = []
+        self.patch(
+            manager.source, 'get_resources',
+            lambda ids: fetched.extend(ids) or [
+                {'InternetGatewayId': i, 'Refreshed': True} for i in ids
+                if i != 'igw-absent'])
+
+        resources = manager.get_resources(['igw-3d9e3d56', 'igw-missing'])
+        self.assertEqual(fetched, ['igw-3d9e3d56', 'igw-missing'])
+        self.assertEqual(
+            [r['InternetGatewayId'] for r in resources], ['igw-3d9e3d56', 'igw-missing'])
+
+        # refreshed resources are updated in the cached resource set
+        fetched.clear()
+        resources = manager.get_resources(['igw-3d9e3d56'])
+        self.assertEqual(fetched, [])
+        self.assertTrue(resources[0]['Refreshed'])
+        self.assertEqual(len(manager.resources()), 4)
+
+        # ids that aren't found are recorded as absent from the set
+        resources = manager.get_resources(['igw-absent'])
+        self.assertEqual((fetched, resources), (['igw-absent'], []))
+        fetched.clear()
+        self.assertEqual(manager.get_resources(['igw-absent']), [])
+        self.assertEqual(fetched, [])
+        self.assertEqual(len(manager.resources()), 4)
+
+        # unaugmented lookups aren't cached
+        self.patch(
+            manager.source, 'get_resources',
+            lambda ids: fetched.extend(ids) or [{'InternetGatewayId': i} for i in ids])
+        augmented = []
+        self.patch(manager, 'augment', lambda resources: augmented.extend(resources))
+        resources = manager.get_resources(['igw-other'], augment=False)
+        self.assertEqual(resources, [{'InternetGatewayId': 'igw-other'}])
+        self.assertEqual(augmented, [])
+        manager.get_resources(['igw-other'], augment=False)
+        self.assertEqual(fetched, ['igw-other', 'igw-other'])
+
     def test_detail_spec_resource_not_found(self):
         # Test the case where List* API returns a resource that
         # is not found with the Get* API.
@@ -52,6 +52,21 @@ class RegistryTest(unittest.TestCase):
         self.assertEqual(observed[1], (registry, _plugin_impl2))
         self.assertEqual(list(sorted(registry.keys())), ['hot', 'water'])
 
+    def test_late_subscriber(self):
+        registry = PluginRegistry('dummy')
+
+        @registry.register('hot')
+        class _plugin_impl:
+            pass
+
+        registry.notify(_plugin_impl)
+        registry.notify(_plugin_impl)
+
+        # a subscriber from a lazily imported module sees earlier notifications
+        observed = []
+        registry.subscribe(lambda *args: observed.append(args))
+        self.assertEqual(observed, [(registry, _plugin_impl)])
+
     def test_condition(self):
 
         registry = PluginRegistry('dummy')
@@ -1,6 +1,9 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
-from c7n.reports.csvout import Formatter, strip_output_path
+import gzip
+import os
+
+from c7n.reports.csvout import Formatter, fs_record_set, strip_output_path
 from .common import BaseTest, load_data
 
 
@@ -164,3 +167,11 @@ class TestMultiReport(BaseTest):
             strip_output_path(p, policy_name) == f"logs/{policy_name}"
             for p in output_paths
         ))
+
+    def test_fs_record_set_jsonl(self):
+        output_path = self.get_temp_dir()
+        with gzip.open(os.path.join(output_path, "resources.jsonl.gz"), "wt") as fh:
+            fh.write('{"InstanceId": "i-1"}\n{"InstanceId": "i-2"}\n')
+        records = fs_record_set(output_path, "my_c7n_policy")
+        self.assertEqual([r["InstanceId"] for r in records], ["i-1", "i-2"])
+        self.assertTrue(all("CustodianDate" in r for r in records))
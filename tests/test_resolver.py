@@ -11,7 +11,7 @@ from urllib.request import urlopen
 from .common import BaseTest, ACCOUNT_ID, Bag
 from .test_s3 import destroyBucket
 
-from c7n.cache import SqlKvCache
+from c7n.cache import SharedCache, SqlKvCache
 from c7n.config import Config
 from c7n.resolver import ValuesFrom, URIResolver
 
@@ -135,6 +135,14 @@ class ResolverTest(BaseTest):
             fh.flush()
             self.assertEqual(resolver.resolve("file:%s" % fh.name, {'auth': 'token'}), content)
 
+    def test_resolve_shared_cache(self):
+        cache = FakeCache()
+        shared = SharedCache(os.path.join(self.get_temp_dir(), 'shared.cache'), 60)
+        shared.save(("uri-resolver", "http://example.com/data"), "shared")
+        resolver = URIResolver(None, cache, shared)
+        self.assertEqual(resolver.resolve("http://example.com/data", {}), "shared")
+        self.assertEqual(cache.saves, 1)
+
 
 def test_value_from_sqlkv(tmp_path):
 
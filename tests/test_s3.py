@@ -831,8 +831,9 @@ class S3ConfigSource(ConfigTest):
             destroyBucketIfPresent(client, bname)
         client.create_bucket(Bucket=bname)
         self.addCleanup(destroyBucket, client, bname)
+        # without filters the describe source fetches every augment
         p = self.load_policy(
-            {"name": "s3-inv", "resource": "s3", "filters": [{"Name": bname}]},
+            {"name": "s3-inv", "resource": "s3"},
             session_factory=session_factory,
         )
 
@@ -985,8 +986,9 @@ class S3ConfigSource(ConfigTest):
             },
         )
 
+        # without filters the describe source fetches every augment
         p = self.load_policy(
-            {"name": "s3-inv", "resource": "s3", "filters": [{"Name": bname}]},
+            {"name": "s3-inv", "resource": "s3"},
             session_factory=session_factory,
         )
 
@@ -4660,3 +4662,104 @@ class S3ObjectLockFilterTest(BaseTest):
         resources = p.run()
         self.assertEqual(len(resources), 1)
         log_mock.error.assert_called()
+
+
+class BucketAugmentTest(BaseTest):
+
+    def test_augment_keys(self):
+        p = self.load_policy({
+            'name': 's3-augments',
+            'resource': 's3',
+            'filters': [
+                {'tag:Owner': 'absent'},
+                {'or': [
+                    {'type': 'value', 'key': 'Versioning.Status', 'value': 'Enabled'},
+                    {'type': 'global-grants'}]}],
+            'actions': ['no-op']})
+        self.assertEqual(
+            p.resource_manager.get_augment_keys(),
+            {'Location', 'Tags', 'Versioning', 'Acl', 'Website'})
+        self.assertEqual(
+            [a[1] for a in p.resource_manager.get_augments()],
+            ['Location', 'Tags', 'Acl', 'Versioning', 'Website'])
+        self.assertEqual(
+            p.resource_manager.get_cache_key(None)['augments'],
+            ['Acl', 'Location', 'Tags', 'Versioning', 'Website'])
+
+    def test_augment_keys_expr_value(self):
+        p = self.load_policy({
+            'name': 's3-augments',
+            'resource': 's3',
+            'filters': [{
+                'type': 'value', 'key': 'Logging.TargetBucket',
+                'value_type': 'expr', 'value': 'Replication.ReplicationConfiguration.Role'}]})
+        self.assertEqual(
+            p.resource_manager.get_augment_keys(), {'Location', 'Logging', 'Replication'})
+
+    def test_augment_keys_unknown(self):
+        for policy in (
+                {'filters': [{'type': 'value', 'key': 'keys(@)', 'value': 'empty'}]},
+                {'actions': [{'type': 'notify', 'to': ['x'],
+                              'transport': {'type': 'sqs', 'queue': 'q'}}]},
+                {}):
+            p = self.load_policy(dict(name='s3-augments', resource='s3', **policy))
+            self.assertEqual(p.resource_manager.get_augment_keys(), None)
+            self.assertEqual(
+                len(p.resource_manager.get_augments()), len(s3.S3_AUGMENT_TABLE))
+            self.assertNotIn('augments', p.resource_manager.get_cache_key(None))
+
+    def test_augment_region_redirect(self):
+        calls = []
+
+        class Client:
+            def __init__(self, region):
+                self.region = region
+
+            def get_bucket_location(self, Bucket):
+                calls.append((self.region, 'location', Bucket))
+                if Bucket == 'denied':
+                    raise ClientError(
+                        {'Error': {'Code': 'AccessDenied', 'Message': 'denied'}},
+                        'GetBucketLocation')
+                return {'ResponseMetadata': {},
+                        'LocationConstraint': {'eu': 'EU'}.get(Bucket)}
+
+            def get_bucket_tagging(self, Bucket):
+                calls.append((self.region, 'tags', Bucket))
+                if Bucket == 'denied' and self.region != 'ap-south-1':
+                    raise ClientError(
+                        {'Error': {'Code': 'PermanentRedirect', 'Message': 'moved'},
+                         'ResponseMetadata': {
+                             'HTTPHeaders': {'x-amz-bucket-region': 'ap-south-1'}}},
+                        'GetBucketTagging')
+                return {'ResponseMetadata': {},
+                        'TagSet': [{'Key': 'Owner', 'Value': Bucket}]}
+
+        class Session:
+            def client(self, service, region_name=None):
+                return Client(region_name)
+
+        self.patch(s3.S3, 'executor_factory', MainThreadExecutor)
+        p = self.load_policy(
+            {'name': 's3-augments', 'resource': 's3',
+             'filters': [{'tag:Owner': 'present'}]},
+            session_factory=Session)
+        buckets = s3.DescribeS3(p.resource_manager).augment(
+            [{'Name': 'us'}, {'Name': 'eu'}, {'Name': 'denied'}])
+        self.assertEqual(calls, [
+            (None, 'location', 'us'),
+            (None, 'location', 'eu'),
+            (None, 'location', 'denied'),
+            ('us-east-1', 'tags', 'us'),
+            ('eu-west-1', 'tags', 'eu'),
+            (None, 'tags', 'denied'),
+            ('ap-south-1', 'tags', 'denied')])
+        self.assertEqual(
+            [b.get('Location') for b in buckets],
+            [{'LocationConstraint': None},
+             {'LocationConstraint': 'eu-west-1'},
+             None])
+        self.assertEqual(buckets[2]['c7n:DeniedMethods'], ['get_bucket_location'])
+        self.assertEqual(
+            [b['Tags'] for b in buckets],
+            [[{'Key': 'Owner', 'Value': n}] for n in ('us', 'eu', 'denied')])
@@ -0,0 +1,82 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+from collections import Counter
+import threading
+import time
+
+from c7n.config import Bag, Config
+from c7n.scheduler import PolicyScheduler
+
+
+def fake_policy(name, region, service):
+    return Bag(
+        name=name,
+        resource_type='aws.%s' % service,
+        options=Config.empty(region=region),
+        resource_manager=Bag(resource_type=Bag(service=service)))
+
+
+def test_scheduler_service_budget():
+    policies = [fake_policy('ec2-%d' % i, 'us-east-1', 'ec2') for i in range(6)]
+    policies += [fake_policy('s3-%d' % i, 'us-east-1', 's3') for i in range(2)]
+    lock = threading.Lock()
+    active = Counter()
+    peak = Counter()
+    executed = []
+
+    def execute(p):
+        service = p.resource_manager.resource_type.service
+        with lock:
+            active[service] += 1
+            peak[service] = max(peak[service], active[service])
+        time.sleep(0.01)
+        with lock:
+            active[service] -= 1
+            executed.append(p.name)
+
+    errors = PolicyScheduler(policies, 4, service_limit=2).run(execute)
+    assert errors == []
+    assert sorted(executed) == sorted(p.name for p in policies)
+    assert peak['ec2'] <= 2
+    assert peak['s3'] <= 2
+
+
+def test_scheduler_region_affinity():
+    policies = [
+        fake_policy('a', 'us-east-1', 'ec2'),
+        fake_policy('b', 'us-west-2', 'ec2'),
+        fake_policy('c', 'us-east-1', 'sqs'),
+        fake_policy('d', 'us-west-2', 'sqs')]
+    sched = PolicyScheduler(policies, 1)
+    p = sched.acquire()
+    assert p.name == 'a'
+    sched.release(p)
+    # stays in the region it last executed in
+    assert sched.acquire('us-east-1').name == 'c'
+
+
+def test_scheduler_errors():
+    policies = [fake_policy('ok', 'us-east-1', 'ec2'),
+                fake_policy('bad', 'us-east-1', 'ec2')]
+
+    def execute(p):
+        if p.name == 'bad':
+            raise ValueError('bad')
+
+    errors = PolicyScheduler(policies, 2).run(execute)
+    assert [(p.name, str(e)) for p, e in errors] == [('bad', 'bad')]
+
+
+def test_scheduler_fail_fast():
+    policies = [fake_policy('bad', 'us-east-1', 'ec2')]
+    policies += [fake_policy('ok-%d' % i, 'us-east-1', 'ec2') for i in range(4)]
+    executed = []
+
+    def execute(p):
+        executed.append(p.name)
+        if p.name == 'bad':
+            raise ValueError('bad')
+
+    errors = PolicyScheduler(policies, 1, fail_fast=True).run(execute)
+    assert [(p.name, str(e)) for p, e in errors] == [('bad', 'bad')]
+    assert executed == ['bad']
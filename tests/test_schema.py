@@ -1,16 +1,18 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
+import json
 from unittest import mock
 from jsonschema.exceptions import best_match, ValidationError
 
 from c7n.exceptions import PolicyValidationError
 from c7n.filters import ValueFilter
+from c7n.loader import SchemaValidator
 from c7n.registry import PluginRegistry
 from c7n.resources import load_resources
 from c7n.schema import (
     StructureParser, ElementSchema, resource_vocabulary,
     JsonSchemaValidator, validate, generate,
-    specific_error, policy_error_scope)
+    specific_error, policy_error_scope, SchemaCache)
 from c7n import schema
 from .common import BaseTest
 
@@ -121,6 +123,19 @@ class StructureParserTest(BaseTest):
                 {'resource': 'ec2'}, {'resource': 'gcp.instance'}]}),
             {'aws.ec2', 'gcp.instance'})
 
+    def test_get_element_types(self):
+        p = StructureParser()
+        self.assertEqual(
+            p.get_element_types({'policies': [
+                {'resource': 'ec2',
+                 'mode': {'type': 'hub-finding'},
+                 'filters': [
+                     {'tag:App': 'present'},
+                     {'or': [{'type': 'ops-item'}, {'not': [{'type': 'finding'}]}]}],
+                 'actions': ['stop', {'type': 'post-finding'}]},
+                {'resource': 'sqs', 'filters': None}]}),
+            {'hub-finding', 'ops-item', 'finding', 'stop', 'post-finding'})
+
 
 class SchemaTest(BaseTest):
 
@@ -661,3 +676,57 @@ class SchemaTest(BaseTest):
                 for err in validate(data, validator.schema)
             )
             self.assertEqual(failed, expect_failure)
+
+
+class SchemaCacheTest(BaseTest):
+
+    def test_from_env(self):
+        # opt-in
+        self.change_environment()
+        self.assertIsNone(SchemaCache.from_env())
+        self.change_environment(C7N_SCHEMA_CACHE="")
+        self.assertIsNone(SchemaCache.from_env())
+        path = self.get_temp_dir()
+        self.change_environment(C7N_SCHEMA_CACHE=path)
+        self.assertEqual(SchemaCache.from_env().path, path)
+
+    def test_get_schema(self):
+        load_resources(('aws.sqs',))
+        cache = SchemaCache(self.get_temp_dir())
+        rt_schema = cache.get_schema(('aws.sqs',))
+        self.assertEqual(rt_schema, json.loads(json.dumps(generate(('aws.sqs',)))))
+
+        def regenerate(resource_types):
+            self.fail("schema regenerated")
+
+        self.patch(schema, 'generate', regenerate)
+        self.assertEqual(cache.get_schema(('aws.sqs',)), rt_schema)
+        self.assertEqual(SchemaCache(cache.path).get_schema(['aws.sqs']), rt_schema)
+
+        # loading an extension module keys a different schema
+        self.patch(schema, 'get_loaded_extensions', lambda: ('c7n.resources.sfn',))
+        with self.assertRaises(AssertionError):
+            cache.get_schema(('aws.sqs',))
+
+    def test_valid(self):
+        cache = SchemaCache(self.get_temp_dir())
+        self.assertFalse(cache.is_valid('policy', ['aws.sqs'], 'abc'))
+        cache.set_valid('policy', ['aws.sqs'], 'abc')
+        self.assertTrue(cache.is_valid('policy', ['aws.sqs'], 'abc'))
+        self.assertFalse(cache.is_valid('policy', ['aws.sqs'], 'abcd'))
+        self.assertFalse(cache.is_valid('policy', ['aws.sqs', 'aws.ec2'], 'abc'))
+
+    def test_validator_skips_valid(self):
+        self.change_environment(C7N_SCHEMA_CACHE=self.get_temp_dir())
+        load_resources(('aws.sqs',))
+        valid = {'policies': [{'name': 'queues', 'resource': 'aws.sqs'}]}
+        invalid = {'policies': [{'name': 'queues', 'resource': 'aws.sqs', 'filters': [
+            {'type': 'value', 'op': 'xyz'}]}]}
+        self.assertEqual(SchemaValidator().validate(valid, ('aws.sqs',)), [])
+        self.assertTrue(SchemaValidator().validate(invalid, ('aws.sqs',)))
+
+        validator = SchemaValidator()
+        self.patch(validator, 'gen_schema', lambda resource_types: self.fail('validated'))
+        self.assertEqual(validator.validate(valid, ('aws.sqs',)), [])
+        with self.assertRaises(AssertionError):
+            validator.validate(invalid, ('aws.sqs',))
@@ -7,7 +7,8 @@ import time
 from freezegun import freeze_time
 from mock import MagicMock, call
 
-from c7n.tags import universal_retry, coalesce_copy_user_tags
+from c7n.tags import (
+    tag_cache, universal_augment, universal_retry, coalesce_copy_user_tags)
 from c7n.exceptions import PolicyExecutionError, PolicyValidationError
 from c7n.utils import yaml_load
 
@@ -163,6 +164,86 @@ class UniversalTagTest(BaseTest):
         results = policy.run()
         self.assertTrue('Tags' in results[0])
 
+    def get_tagging_session(self, tag_mappings):
+        client = MagicMock()
+        client.get_paginator.return_value.paginate.return_value = [
+            {'ResourceTagMappingList': tag_mappings}]
+        client.get_resources.return_value = {'ResourceTagMappingList': tag_mappings}
+        session = MagicMock()
+        session.client.return_value = client
+        return client, lambda: session
+
+    def test_universal_augment_tag_snapshot(self):
+        self.patch(tag_cache, 'min_fetch_arns', 1)
+        job = self.load_policy({'name': 'jobs', 'resource': 'glue-job'})
+        crawler = self.load_policy({'name': 'crawlers', 'resource': 'glue-crawler'})
+        job_arn, = job.resource_manager.get_arns([{'Name': 'etl'}])
+        client, factory = self.get_tagging_session([
+            {'ResourceARN': job_arn, 'Tags': [{'Key': 'App', 'Value': 'etl'}]}])
+        job.resource_manager.session_factory = factory
+        crawler.resource_manager.session_factory = factory
+
+        jobs = universal_augment(job.resource_manager, [{'Name': 'etl'}, {'Name': 'adhoc'}])
+        crawlers = universal_augment(crawler.resource_manager, [{'Name': 'etl'}])
+        self.assertEqual(
+            [j['Tags'] for j in jobs], [[{'Key': 'App', 'Value': 'etl'}], []])
+        self.assertEqual(crawlers[0]['Tags'], [])
+        # one snapshot of the service serves both resource types
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            ResourceTypeFilters=['glue'])
+        client.get_resources.assert_not_called()
+
+    def test_universal_augment_tag_snapshot_arn_service(self):
+        # snapshots filter on the service in the arns, step function
+        # activities are stepfunctions api resources with states arns.
+        self.patch(tag_cache, 'min_fetch_arns', 0)
+        activity = self.load_policy({'name': 'activities', 'resource': 'sfn-activity'})
+        activity_arn = 'arn:aws:states:us-east-1:644160558196:activity:etl'
+        client, factory = self.get_tagging_session([
+            {'ResourceARN': activity_arn, 'Tags': [{'Key': 'App', 'Value': 'etl'}]}])
+        activity.resource_manager.session_factory = factory
+
+        activities = universal_augment(
+            activity.resource_manager, [{'activityArn': activity_arn}])
+        self.assertEqual(activities[0]['Tags'], [{'Key': 'App', 'Value': 'etl'}])
+        client.get_paginator.return_value.paginate.assert_called_once_with(
+            ResourceTypeFilters=['states'])
+
+    def test_universal_augment_tag_snapshot_small_set(self):
+        job = self.load_policy({'name': 'jobs', 'resource': 'glue-job'})
+        job_arn, = job.resource_manager.get_arns([{'Name': 'etl'}])
+        client, factory = self.get_tagging_session([
+            {'ResourceARN': job_arn, 'Tags': [{'Key': 'App', 'Value': 'etl'}]}])
+        job.resource_manager.session_factory = factory
+
+        # a few arns are looked up rather than fetching a snapshot
+        jobs = universal_augment(job.resource_manager, [{'Name': 'etl'}])
+        self.assertEqual(jobs[0]['Tags'], [{'Key': 'App', 'Value': 'etl'}])
+        client.get_resources.assert_called_once_with(ResourceARNList=[job_arn])
+        client.get_paginator.return_value.paginate.assert_not_called()
+
+        # but use an extant snapshot
+        tag_cache.get(job.resource_manager, client, [job_arn])
+        client.get_resources.reset_mock()
+        jobs = universal_augment(job.resource_manager, [{'Name': 'etl'}])
+        self.assertEqual(jobs[0]['Tags'], [{'Key': 'App', 'Value': 'etl'}])
+        client.get_resources.assert_not_called()
+
+    def test_universal_augment_event_mode(self):
+        job = self.load_policy({
+            'name': 'jobs', 'resource': 'glue-job',
+            'mode': {'type': 'cloudtrail',
+                     'events': [{'ids': 'some', 'source': 'thing', 'event': 'wicked'}]}})
+        job_arn, = job.resource_manager.get_arns([{'Name': 'etl'}])
+        client, factory = self.get_tagging_session([
+            {'ResourceARN': job_arn, 'Tags': [{'Key': 'App', 'Value': 'etl'}]}])
+        job.resource_manager.session_factory = factory
+
+        jobs = universal_augment(job.resource_manager, [{'Name': 'etl'}])
+        self.assertEqual(jobs[0]['Tags'], [{'Key': 'App', 'Value': 'etl'}])
+        client.get_resources.assert_called_once_with(ResourceARNList=[job_arn])
+        client.get_paginator.return_value.paginate.assert_not_called()
+
     def test_retry_no_error(self):
         mock = MagicMock()
         mock.side_effect = [{"Result": 42}]
@@ -12,7 +12,8 @@ from dateutil.parser import parse as parse_date
 
 from c7n import query
 from c7n import utils
-from c7n.config import Config
+from c7n.config import Bag, Config
+from c7n.credentials import CustodianSession
 from .common import BaseTest
 
 
@@ -52,6 +53,116 @@ class Backoff(BaseTest):
         else:
             self.fail("should have raised")
 
+    def patch_clock(self, advance=False):
+        clock = Bag(now=100.0, sleeps=[])
+
+        class Time:
+
+            def monotonic(self):
+                return clock.now
+
+            def sleep(self, delay):
+                clock.sleeps.append(delay)
+                if advance:
+                    clock.now += delay
+
+        self.patch(utils, "time", Time())
+        return clock
+
+    def test_rate_limiter(self):
+        clock = self.patch_clock()
+        limiter = utils.RateLimiter(2)
+        for i in range(4):
+            limiter.acquire()
+        self.assertEqual(clock.sleeps, [0.5, 1.0])
+        clock.now += 10
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [0.5, 1.0])
+
+    def test_adaptive_rate_limiter(self):
+        clock = self.patch_clock()
+        limiter = utils.AdaptiveRateLimiter()
+        for i in range(10):
+            limiter.acquire()
+        self.assertEqual(clock.sleeps, [])
+
+        # decrease to half the observed rate
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 5)
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [0.2])
+        limiter.succeeded()
+        self.assertEqual(limiter.rate, 5.2)
+
+        # at most one decrease a second
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 5.2)
+        clock.now += 2
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 2.6)
+
+        limiter.rate = limiter.max_rate
+        limiter.succeeded()
+        self.assertIsNone(limiter.rate)
+        limiter.acquire()
+        self.assertEqual(clock.sleeps, [0.2])
+
+    def test_retry_throttle_paced(self):
+        clock = self.patch_clock(advance=True)
+        errors = [ClientError({"Error": {"Code": "Throttling"}}, "DescribeInstances")] * 2
+
+        class Client:
+            meta = Bag(region_name="us-east-1", service_model=Bag(service_name="ec2"))
+
+            def describe_instances(self):
+                if errors:
+                    raise errors.pop()
+                return 42
+
+        client = Client()
+        retry = utils.get_retry(("Throttling",))
+        self.assertEqual(retry(client.describe_instances), 42)
+        # retries wait for the longer of their backoff and the api's learned rate
+        self.assertEqual(clock.sleeps, [2.0, 2.0])
+        limiter = utils.rate_controller.get_limiter(client.describe_instances)
+        self.assertEqual(limiter.rate, 2.5)
+        self.assertIsNone(utils.rate_controller.get_limiter(lambda: 42))
+
+    def test_retry_sustained_throttle_backoff(self):
+        clock = self.patch_clock(advance=True)
+
+        class Client:
+            meta = Bag(region_name="us-east-1", service_model=Bag(service_name="ec2"))
+
+            def describe_instances(self):
+                raise ClientError({"Error": {"Code": "Throttling"}}, "DescribeInstances")
+
+        client = Client()
+        # warm the operation's limiter to a high rate
+        limiter = utils.rate_controller.get_limiter(client.describe_instances)
+        for i in range(100):
+            limiter.acquire()
+            clock.now += 0.01
+
+        retry = utils.get_retry(("Throttling",))
+        self.assertRaises(ClientError, retry, client.describe_instances)
+        # every retry still waits at least its exponential backoff
+        self.assertEqual(len(clock.sleeps), 7)
+        for idx, delay in enumerate(clock.sleeps):
+            self.assertGreaterEqual(delay, 0.8 * 2 ** idx)
+
+    def test_rate_key_credentials(self):
+        clients = []
+        for key in ("AKIA1", "AKIA2"):
+            s = CustodianSession(
+                aws_access_key_id=key, aws_secret_access_key="secret",
+                region_name="us-east-1")
+            clients.append(s.client("ec2"))
+        limiters = [utils.rate_controller.get_limiter(c.describe_instances) for c in clients]
+        # limits are per credentials
+        self.assertIsNot(limiters[0], limiters[1])
+        self.assertEqual(utils.rate_controller.identities[clients[0]], "AKIA1")
+
     def test_delays(self):
         self.assertEqual(
             list(utils.backoff_delays(1, 256)),
@@ -761,3 +872,39 @@ def test_jmespath_parse_to_json():
         {'foo': '{"]}'}
     )
     assert result is None
+
+
+def test_compile_path():
+    resource = {
+        'State': {'Name': 'running'},
+        'Mappings': [{'Ebs': {'Size': 8}}, {'Ebs': None}],
+        'Name': 'abc',
+        'Count': 0,
+    }
+    for expr in ('State.Name', 'Mappings[0].Ebs.Size', 'Mappings[-1].Ebs',
+                 'Mappings[2].Ebs', 'Name.Sub', 'Name[0]', 'State[0]', 'Count',
+                 'Missing.Name', 'State.Name.Sub'):
+        compiled = utils.compile_path(expr)
+        assert isinstance(compiled, utils.PathExpression), expr
+        assert compiled.search(resource) == utils.jmespath_search(expr, resource), expr
+
+    for expr in ('Mappings[].Ebs', 'Mappings[*].Ebs', 'State.Name | upper(@)',
+                 '"State".Name', 'State.[Name]'):
+        assert not isinstance(utils.compile_path(expr), utils.PathExpression), expr
+
+
+def test_get_tag_value():
+    resource = {'Tags': [
+        {'Key': 'Env', 'Value': 'dev'}, {'Key': 'Env', 'Value': 'prod'}]}
+    assert utils.get_tag_value(resource, 'Env') == 'dev'
+    assert utils.get_tag_value({'labels': {'env': 'dev'}}, 'env') == 'dev'
+    assert utils.get_tag_value({'tags': None}, 'env') is None
+
+    with utils.tag_index():
+        assert utils.get_tag_value(resource, 'Env') == 'dev'
+        assert utils.get_tag_value(resource, 'Owner') is None
+        resource['Tags'].append({'Key': 'Owner', 'Value': 'me'})
+        assert utils.get_tag_value(resource, 'Owner') == 'me'
+        with utils.tag_index():
+            assert len(utils.TAG_INDEX.tags) == 1
+    assert utils.TAG_INDEX.tags is None
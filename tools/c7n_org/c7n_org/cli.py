@@ -14,6 +14,7 @@ import sys
 import shlex
 
 import multiprocessing
+import queue
 from concurrent.futures import (
     ProcessPoolExecutor,
     as_completed)
@@ -28,13 +29,18 @@ from c7n.credentials import assumed_session, SessionFactory
 from c7n.executor import MainThreadExecutor
 from c7n.exceptions import InvalidOutputConfig
 from c7n.config import Config
+from c7n.output import blob_uploads
 from c7n.policy import PolicyCollection
 from c7n.provider import get_resource_class, clouds as cloud_providers
 from c7n.reports.csvout import Formatter, fs_record_set, record_set, strip_output_path
 from c7n.resources import load_available
 from c7n.utils import (
-    CONN_CACHE, dumps, filter_empty, format_string_values, get_policy_provider, join_output_path)
+    CONN_CACHE, dumps, filter_empty, format_string_values, get_path, get_policy_provider,
+    join_output_path, reset_run_caches)
 
+from c7n_org.reporting import pa, put_records, record_queue, writers
+from c7n_org.scheduler import Task, get_policy_groups, order_tasks
+from c7n_org.telemetry import GROUP_FIELDS, Telemetry
 from c7n_org.utils import environ, account_tags
 
 log = logging.getLogger('c7n_org')
@@ -319,7 +325,13 @@ def filter_policies(policies_config, tags, policies, resource, not_policies=None
     policies_config['policies'] = filtered_policies
 
 
-def report_account(account, region, policies_config, output_path, cache_path, debug):
+def report_account(account, region, policies_config, output_path, cache_path, debug,
+                   records_queue):
+    """Put an account's policy records on the records queue.
+
+    Each policy's records are put together, latest first. Returns the
+    number of records.
+    """
     output_path = os.path.join(output_path, account['name'], region)
     cache_path = os.path.join(cache_path, "%s-%s.cache" % (account['name'], region))
 
@@ -337,7 +349,7 @@ def report_account(account, region, policies_config, output_path, cache_path, de
         config['profile'] = account['profile']
 
     policies = PolicyCollection.from_data(policies_config, config)
-    records = []
+    count = 0
     for p in policies:
         # initializee policy execution context for output access
         p.ctx.initialize()
@@ -369,8 +381,15 @@ def report_account(account, region, policies_config, output_path, cache_path, de
                     if k in r:
                         k = 'tag:' + k
                     r[k] = v
-        records.extend(policy_records)
-    return records
+
+        date_sort = policy_records and (
+            'CustodianDate' in policy_records[0] and 'CustodianDate' or
+            getattr(p.resource_manager.resource_type, 'date', None))
+        if date_sort:
+            policy_records.sort(key=lambda r: get_path(date_sort, r), reverse=True)
+        put_records(records_queue, policy_records)
+        count += len(policy_records)
+    return count
 
 
 @cli.command()
@@ -388,7 +407,7 @@ def report_account(account, region, policies_config, output_path, cache_path, de
 @click.option('-p', '--policy', multiple=True)
 @click.option('-l', '--policytags', 'policy_tags',
               multiple=True, default=None, help="Policy tag filter")
-@click.option('--format', default='csv', type=click.Choice(['csv', 'json']))
+@click.option('--format', default='csv', type=click.Choice(list(writers)))
 @click.option('--resource', default=None)
 @click.option('--cache-path', required=False, type=click.Path(), default="~/.cache/c7n-org")
 def report(config, output, use, output_dir, accounts,
@@ -406,9 +425,24 @@ def report(config, output, use, output_dir, accounts,
         raise ValueError("can only report on one resource type at a time")
     elif not len(custodian_config['policies']) > 0:
         raise ValueError("no matching policies found")
+    elif format == 'parquet' and pa is None:
+        raise ValueError("parquet reports require pyarrow")
 
-    records = []
-    with executor(max_workers=WORKER_COUNT) as w:
+    prefix_fields = OrderedDict(
+        (('Account', 'account'), ('Region', 'region'), ('Policy', 'policy')))
+
+    factory = get_resource_class(list(resource_types)[0])
+    formatter = Formatter(
+        factory.resource_type,
+        extra_fields=field,
+        include_default_fields=not no_default_fields,
+        include_region=False,
+        include_policy=False,
+        fields=prefix_fields)
+    writer = writers[format](output, formatter)
+
+    found = 0
+    with record_queue(debug, WORKER_COUNT) as q, executor(max_workers=WORKER_COUNT) as w:
         futures = {}
         for a in accounts_config.get('accounts', ()):
             for r in resolve_regions(region or a.get('regions', ()), a):
@@ -418,44 +452,83 @@ def report(config, output, use, output_dir, accounts,
                     custodian_config,
                     output_dir,
                     cache_path,
-                    debug)] = (a, r)
+                    debug,
+                    q)] = (a, r)
 
-        for f in as_completed(futures):
-            a, r = futures[f]
-            if f.exception():
-                if debug:
-                    raise
-                log.warning(
-                    "Error running policy in %s @ %s exception: %s",
-                    a['name'], r, f.exception())
-            records.extend(f.result())
+        # write batches as workers put them, until every worker is done
+        # and the batches they put are drained.
+        pending = set(futures)
+        while pending or not q.empty():
+            try:
+                writer.write(q.get(timeout=pending and 1 or 0))
+            except queue.Empty:
+                pass
+            for f in [f for f in pending if f.done()]:
+                pending.remove(f)
+                a, r = futures[f]
+                if f.exception():
+                    if debug:
+                        raise f.exception()
+                    log.warning(
+                        "Error running policy in %s @ %s exception: %s",
+                        a['name'], r, f.exception())
+                    continue
+                found += f.result()
 
+    writer.close()
     log.debug(
-        "Found %d records across %d accounts and %d policies",
-        len(records), len(accounts_config['accounts']),
+        "Found %d records, wrote %d across %d accounts and %d policies",
+        found, writer.count, len(accounts_config['accounts']),
         len(custodian_config['policies']))
 
-    if format == 'json':
-        dumps(records, output, indent=2)
+
+@cli.command()
+@click.option('-f', '--output', type=click.File('w'), default='-', help="Output File")
+@click.option('--cache-path', required=False, type=click.Path(), default="~/.cache/c7n-org")
+@click.option('--group-by', default='task', type=click.Choice(list(GROUP_FIELDS)),
+              help="Aggregate by policy, account, region, resource or task")
+@click.option('--runs', default=5, type=int, help="Number of prior runs to compare with")
+@click.option('--format', default='csv', type=click.Choice(['csv', 'json']))
+def stats(output, cache_path, group_by, runs, format):
+    """report the last run's durations, api calls and throttles"""
+    path = os.path.join(os.path.expanduser(cache_path), 'telemetry.db')
+    if not os.path.exists(path):
+        click.echo("No run history in %s" % cache_path, err=True)
         return
 
-    prefix_fields = OrderedDict(
-        (('Account', 'account'), ('Region', 'region'), ('Policy', 'policy')))
-    config = Config.empty()
+    telemetry = Telemetry(path)
+    run = telemetry.get_run()
+    rows = telemetry.get_stats(group_by, runs)
+    telemetry.close()
+
+    # policy time over available worker time, to inform worker counts
+    if run and run['duration']:
+        policy_time = sum(r['duration'] for r in rows)
+        click.echo(
+            "Last run workers:%d time:%0.2f policy time:%0.2f utilization:%0.2f" % (
+                run['workers'], run['duration'], policy_time,
+                policy_time / (run['duration'] * run['workers'])), err=True)
+
+    for r in rows:
+        r['change'] = None
+        if r['prior_duration']:
+            r['change'] = round(
+                (r['duration'] - r['prior_duration']) / r['prior_duration'] * 100, 1)
 
-    factory = get_resource_class(list(resource_types)[0])
-    formatter = Formatter(
-        factory.resource_type,
-        extra_fields=field,
-        include_default_fields=not no_default_fields,
-        include_region=False,
-        include_policy=False,
-        fields=prefix_fields)
+    if format == 'json':
+        dumps(rows, output, indent=2)
+        return
 
-    rows = formatter.to_csv(records, unique=False)
-    writer = csv.writer(output, formatter.headers(), quoting=csv.QUOTE_ALL)
-    writer.writerow(formatter.headers())
-    writer.writerows(rows)
+    headers = list(GROUP_FIELDS[group_by]) + [
+        'duration', 'prior_duration', 'change', 'api_calls', 'throttles',
+        'resources', 'success']
+    writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+    writer.writerow(headers)
+    for r in rows:
+        for k in ('duration', 'prior_duration'):
+            if r[k] is not None:
+                r[k] = round(r[k], 2)
+        writer.writerow([r[h] for h in headers])
 
 
 def _get_env_creds(account, session, region, env=None):
@@ -608,21 +681,70 @@ def _update(old, new):
     return old
 
 
+# assumed role sessions, reused across the tasks a worker runs.
+worker_sessions = {}
+
+
+def get_worker_session(account, region):
+    key = (account['account_id'], region)
+    if key not in worker_sessions:
+        worker_sessions[key] = get_session(account, 'custodian', region)
+    return worker_sessions[key]
+
+
+def run_task(task, policies_config, output_path,
+             cache_period, cache_path, metrics, dryrun, debug):
+    """Execute a task's policies.
+
+    Returns the policy counts, success, and per policy stats of the task.
+    """
+    stats = {}
+    policy_counts, success = run_account(
+        task.account, task.region, dict(policies_config, policies=task.policies), output_path,
+        cache_period, cache_path, metrics, dryrun, debug, group=task.group, stats=stats)
+    return policy_counts, success, stats
+
+
+def get_policy_stats(policy, resources, duration, success):
+    api_stats = policy.ctx.api_stats
+    return {
+        'resource': policy.resource_type,
+        'duration': duration,
+        'api_calls': sum(getattr(api_stats, 'api_calls', {}).values()),
+        'throttles': sum(getattr(api_stats, 'throttles', {}).values()),
+        'resources': resources and len(resources) or 0,
+        'success': success}
+
+
 def run_account(account, region, policies_config, output_path,
-                cache_period, cache_path, metrics, dryrun, debug):
+                cache_period, cache_path, metrics, dryrun, debug, group=None, stats=None):
     """Execute a set of policies on an account.
+
+    With a resource group, the group's policies run with a cache of their
+    own, so tasks for the same account and region can run concurrently,
+    and role sessions are reused across the worker's tasks.
+
+    If given, stats is updated with each policy's stats.
     """
     logging.getLogger('custodian.output').setLevel(logging.ERROR + 1)
     CONN_CACHE.session = None
     CONN_CACHE.time = None
+    reset_run_caches()
     load_available()
 
     output_path = join_output_path(output_path, account['name'], region)
 
-    cache_path = os.path.join(cache_path, "%s-%s.cache" % (account['account_id'], region))
+    # account independent data (value_from uris) is shared across workers
+    shared_cache_path = os.path.join(cache_path, "shared.cache")
+    if group:
+        cache_path = os.path.join(cache_path, "%s-%s-%s.cache" % (
+            account['account_id'], region, group))
+    else:
+        cache_path = os.path.join(
+            cache_path, "%s-%s.cache" % (account['account_id'], region))
 
     config = Config.empty(
-        region=region, cache=cache_path,
+        region=region, cache=cache_path, shared_cache=shared_cache_path,
         cache_period=cache_period, dryrun=dryrun, output_dir=output_path,
         account_id=account['account_id'], metrics_enabled=metrics,
         log_group=None, profile=None, external_id=None)
@@ -630,7 +752,10 @@ def run_account(account, region, policies_config, output_path,
     env_vars = account_tags(account)
 
     if account.get('role'):
-        if isinstance(account['role'], str):
+        if group and account['provider'] == 'aws':
+            env_vars.update(
+                _get_env_creds(account, get_worker_session(account, region), region))
+        elif isinstance(account['role'], str):
             config['assume_role'] = account['role']
             config['external_id'] = account.get('external_id')
         else:
@@ -648,50 +773,66 @@ def run_account(account, region, policies_config, output_path,
     success = True
     st = time.time()
 
-    with environ(**env_vars):
-        for p in policies:
-            # Extend policy execution conditions with account information
-            p.conditions.env_vars['account'] = account
-            # Variable expansion and non schema validation (not optional)
-            p.expand_variables(p.get_variables(account.get('vars', {})))
-            p.validate()
-            log.debug(
-                "Running policy:%s account:%s region:%s",
-                p.name, account['name'], region)
-            try:
-                resources = p.run()
-                policy_counts[p.name] = resources and len(resources) or 0
-                if not resources:
-                    continue
-                if not config.dryrun and p.execution_mode != 'pull':
-                    log.info("Ran account:%s region:%s policy:%s provisioned time:%0.2f",
-                             account['name'], region, p.name, time.time() - st)
+    try:
+        with environ(**env_vars):
+            for p in policies:
+                # Extend policy execution conditions with account information
+                p.conditions.env_vars['account'] = account
+                # Variable expansion and non schema validation (not optional)
+                p.expand_variables(p.get_variables(account.get('vars', {})))
+                p.validate()
+                log.debug(
+                    "Running policy:%s account:%s region:%s",
+                    p.name, account['name'], region)
+                pst, resources, policy_success = time.time(), None, False
+                try:
+                    resources = p.run()
+                    policy_success = True
+                    policy_counts[p.name] = resources and len(resources) or 0
+                    if not resources:
+                        continue
+                    if not config.dryrun and p.execution_mode != 'pull':
+                        log.info("Ran account:%s region:%s policy:%s provisioned time:%0.2f",
+                                 account['name'], region, p.name, time.time() - st)
+                        continue
+                    log.info(
+                        "Ran account:%s region:%s policy:%s matched:%d time:%0.2f",
+                        account['name'], region, p.name, len(resources),
+                        time.time() - st)
+                except ClientError as e:
+                    success = False
+                    if e.response['Error']['Code'] == 'AccessDenied':
+                        log.warning('Access denied api:%s policy:%s account:%s region:%s',
+                                    e.operation_name, p.name, account['name'], region)
+                        blob_uploads.flush()
+                        return policy_counts, success
+                    log.error(
+                        "Exception running policy:%s account:%s region:%s error:%s",
+                        p.name, account['name'], region, e)
                     continue
-                log.info(
-                    "Ran account:%s region:%s policy:%s matched:%d time:%0.2f",
-                    account['name'], region, p.name, len(resources),
-                    time.time() - st)
-            except ClientError as e:
-                success = False
-                if e.response['Error']['Code'] == 'AccessDenied':
-                    log.warning('Access denied api:%s policy:%s account:%s region:%s',
-                                e.operation_name, p.name, account['name'], region)
-                    return policy_counts, success
-                log.error(
-                    "Exception running policy:%s account:%s region:%s error:%s",
-                    p.name, account['name'], region, e)
-                continue
-            except Exception as e:
+                except Exception as e:
+                    success = False
+                    log.error(
+                        "Exception running policy:%s account:%s region:%s error:%s",
+                        p.name, account['name'], region, e)
+                    if not debug:
+                        continue
+                    import traceback, pdb, sys
+                    traceback.print_exc()
+                    pdb.post_mortem(sys.exc_info()[-1])
+                    raise
+                finally:
+                    if stats is not None:
+                        stats[p.name] = get_policy_stats(
+                            p, resources, time.time() - pst, policy_success)
+
+            # streamed outputs upload with the account's credentials
+            if blob_uploads.flush():
                 success = False
-                log.error(
-                    "Exception running policy:%s account:%s region:%s error:%s",
-                    p.name, account['name'], region, e)
-                if not debug:
-                    continue
-                import traceback, pdb, sys
-                traceback.print_exc()
-                pdb.post_mortem(sys.exc_info()[-1])
-                raise
+    finally:
+        # a worker process runs many tasks, don't carry one account's
+        # resources over to the next.
+        reset_run_caches()
 
     return policy_counts, success
 
@@ -736,11 +877,13 @@ def initialize_provider_output(policies_config, output_dir, regions):
 @click.option("--metrics", default=False, is_flag=True)
 @click.option("--metrics-uri", default=None, help="Configure provider metrics target")
 @click.option("--dryrun", default=False, is_flag=True)
+@click.option('--schedule', default='account', type=click.Choice(['account', 'resource']),
+              help="Schedule tasks per account and region, or per resource type within them")
 @click.option('--debug', default=False, is_flag=True)
 @click.option('-v', '--verbose', default=False, help="Verbose", is_flag=True)
 def run(config, use, output_dir, accounts, not_accounts, tags, region,
         policy, policy_tags, cache_period, cache_path, metrics,
-        dryrun, debug, verbose, metrics_uri):
+        dryrun, schedule, debug, verbose, metrics_uri):
     """run a custodian policy across accounts"""
     accounts_config, custodian_config, executor = init(
         config, use, debug, verbose, accounts, tags, policy, policy_tags=policy_tags,
@@ -765,38 +908,58 @@ def run(config, use, output_dir, accounts, not_accounts, tags, region,
 
     output_dir = initialize_provider_output(custodian_config, output_dir, region)
 
+    groups = get_policy_groups(custodian_config, schedule)
+    tasks = []
+    for a in accounts_config['accounts']:
+        for r in resolve_regions(region or a.get('regions', ()), a):
+            for g, g_policies in groups.items():
+                tasks.append(Task(a, r, g, g_policies))
+
+    # workers take tasks from the executor's queue as they finish
+    # their current one, so submitting the longest tasks first keeps
+    # a few long tasks from trailing the rest of the run.
+    telemetry = Telemetry(os.path.join(cache_path, 'telemetry.db'))
+    tasks = order_tasks(tasks, telemetry.get_runtimes())
+    # tasks carry their policies
+    task_config = {k: v for k, v in custodian_config.items() if k != 'policies'}
+
+    st = time.time()
+    run_id = telemetry.start_run(WORKER_COUNT)
+
     with executor(max_workers=WORKER_COUNT) as w:
         futures = {}
-        for a in accounts_config['accounts']:
-            for r in resolve_regions(region or a.get('regions', ()), a):
-                futures[w.submit(
-                    run_account,
-                    a, r,
-                    custodian_config,
-                    output_dir,
-                    cache_period,
-                    cache_path,
-                    metrics,
-                    dryrun,
-                    debug)] = (a, r)
+        for t in tasks:
+            futures[w.submit(
+                run_task,
+                t,
+                task_config,
+                output_dir,
+                cache_period,
+                cache_path,
+                metrics,
+                dryrun,
+                debug)] = t
 
         for f in as_completed(futures):
-            a, r = futures[f]
+            t = futures[f]
             if f.exception():
                 if debug:
                     raise
                 log.warning(
                     "Error running policy in %s @ %s exception: %s",
-                    a['name'], r, f.exception())
+                    t.account['name'], t.region, f.exception())
                 continue
 
-            account_region_pcounts, account_region_success = f.result()
-            for p in account_region_pcounts:
-                policy_counts[p] += account_region_pcounts[p]
+            task_pcounts, task_success, task_stats = f.result()
+            telemetry.record(run_id, t.account, t.region, task_stats)
+            for p in task_pcounts:
+                policy_counts[p] += task_pcounts[p]
 
-            if not account_region_success:
+            if not task_success:
                 success = False
 
+    telemetry.end_run(run_id, time.time() - st)
+    telemetry.close()
     log.info("Policy resource counts %s" % policy_counts)
 
     if not success:
@@ -0,0 +1,166 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""Streaming output for c7n-org report.
+
+Report workers put batches of records on a queue, and a single writer
+in the main process deduplicates and writes them as they arrive, so a
+report never holds more than a few batches of records at once.
+"""
+import csv
+import multiprocessing
+import queue
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+from c7n.utils import dumps, jmespath_compile
+
+# records per batch put on the queue by workers
+BATCH_SIZE = 1000
+# record ids kept for deduplication
+INDEX_SIZE = 1000000
+
+
+@contextmanager
+def record_queue(debug, workers):
+    """Queue for record batches from report workers.
+
+    Batches queued per worker are bounded, so workers wait on the writer
+    rather than buffering their records.
+    """
+    if debug:
+        # the main thread executor runs workers inline, before the
+        # writer gets a chance to consume.
+        yield queue.Queue()
+        return
+    with multiprocessing.Manager() as manager:
+        yield manager.Queue(maxsize=workers * 2)
+
+
+def put_records(q, records):
+    for i in range(0, len(records), BATCH_SIZE):
+        q.put(records[i:i + BATCH_SIZE])
+
+
+class RecordIndex:
+    """Bounded index of written records, by account, region, policy and id.
+
+    Workers emit a policy's records together, latest first, so evicting
+    the oldest ids only forgets records that won't be seen again.
+    """
+
+    def __init__(self, id_field, size=INDEX_SIZE):
+        self.id_field = id_field
+        self.compiled = '.' in id_field and jmespath_compile(id_field) or None
+        self.size = size
+        self.ids = OrderedDict()
+
+    def add(self, record):
+        """Add a record, returning False if it was already seen."""
+        if self.compiled:
+            rid = self.compiled.search(record)
+        else:
+            rid = record.get(self.id_field)
+        # records without an id can't be told apart, keep them all.
+        if rid is None:
+            return True
+        key = (record['account_id'], record['region'], record['policy'], rid)
+        if key in self.ids:
+            return False
+        self.ids[key] = None
+        if len(self.ids) > self.size:
+            self.ids.popitem(last=False)
+        return True
+
+
+class ReportWriter:
+
+    def __init__(self, output, formatter):
+        self.output = output
+        self.formatter = formatter
+        self.index = RecordIndex(formatter._id_field)
+        self.count = 0
+
+    def write(self, records):
+        records = [r for r in records if self.index.add(r)]
+        if records:
+            self.write_records(records)
+            self.count += len(records)
+
+    def write_records(self, records):
+        raise NotImplementedError()
+
+    def close(self):
+        self.output.flush()
+
+
+class CsvWriter(ReportWriter):
+
+    def __init__(self, output, formatter):
+        super().__init__(output, formatter)
+        self.writer = csv.writer(output, quoting=csv.QUOTE_ALL)
+        self.writer.writerow(formatter.headers())
+
+    def write_records(self, records):
+        self.writer.writerows(map(self.formatter.extract_csv, records))
+        self.output.flush()
+
+
+class JsonWriter(ReportWriter):
+    """Write records as a json array."""
+
+    def __init__(self, output, formatter):
+        super().__init__(output, formatter)
+        self.output.write('[')
+        self.separator = '\n'
+
+    def write_records(self, records):
+        for r in records:
+            self.output.write(self.separator)
+            self.output.write(dumps(r, indent=2))
+            self.separator = ',\n'
+
+    def close(self):
+        self.output.write('\n]\n')
+        super().close()
+
+
+class JsonLinesWriter(ReportWriter):
+
+    def write_records(self, records):
+        for r in records:
+            self.output.write(dumps(r, indent=None))
+            self.output.write('\n')
+
+
+class ParquetWriter(ReportWriter):
+    """Write records' report fields as parquet string columns."""
+
+    def __init__(self, output, formatter):
+        super().__init__(output, formatter)
+        self.headers = list(formatter.headers())
+        self.schema = pa.schema([(h, pa.string()) for h in self.headers])
+        self.writer = pq.ParquetWriter(output.buffer, self.schema)
+
+    def write_records(self, records):
+        columns = list(zip(*map(self.formatter.extract_csv, records)))
+        self.writer.write_table(pa.table(
+            {h: [None if v is None else str(v) for v in values]
+             for h, values in zip(self.headers, columns)}, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        super().close()
+
+
+writers = {
+    'csv': CsvWriter,
+    'json': JsonWriter,
+    'jsonl': JsonLinesWriter,
+    'parquet': ParquetWriter,
+}
@@ -0,0 +1,49 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""Plan c7n-org run work into tasks.
+
+A task is the policies for one account and region, or with resource
+scheduling, the policies for one resource type in an account and
+region. Tasks are ordered by their last recorded runtime, longest
+first, so long tasks start early and idle workers pick up the short
+tasks from the executor's shared queue at the end of a run.
+"""
+from collections import namedtuple
+
+
+Task = namedtuple('Task', ('account', 'region', 'group', 'policies'))
+
+
+def get_policy_groups(policies_config, schedule):
+    """Group policies for scheduling.
+
+    With account scheduling all policies are a single group.
+    """
+    policies = policies_config.get('policies', [])
+    if schedule == 'account':
+        return {None: policies}
+    groups = {}
+    for p in policies:
+        resource = p['resource']
+        if '.' not in resource:
+            resource = 'aws.%s' % resource
+        groups.setdefault(resource, []).append(p)
+    return groups
+
+
+def order_tasks(tasks, runtimes):
+    """Order tasks longest first by their policies' recorded runtimes.
+
+    runtimes maps (account id, region, policy) to the policy's last
+    duration. Tasks with a policy that has no recorded runtime go first,
+    in their given order.
+    """
+    def runtime(t):
+        total = 0
+        for p in t.policies:
+            duration = runtimes.get((t.account['account_id'], t.region, p['name']))
+            if duration is None:
+                return float('inf')
+            total += duration
+        return total
+    return sorted(tasks, key=runtime, reverse=True)
@@ -0,0 +1,133 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""Local history of c7n-org runs.
+
+Each run records, per account, region, and policy, the policy's
+duration, api calls, throttled api responses, and matched resource
+count. The scheduler orders tasks by recorded durations, and
+`c7n-org stats` reports on them.
+"""
+import sqlite3
+import time
+
+
+GROUP_FIELDS = {
+    'policy': ('policy',),
+    'account': ('account',),
+    'region': ('region',),
+    'resource': ('resource',),
+    'task': ('account', 'region', 'policy'),
+}
+
+
+class Telemetry:
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.init()
+
+    def init(self):
+        with self.conn as cursor:
+            cursor.execute(
+                'create table if not exists runs ('
+                ' run_id integer primary key autoincrement,'
+                ' started real, duration real, workers integer)')
+            cursor.execute(
+                'create table if not exists policy_runs ('
+                ' run_id integer, account_id text, account text, region text,'
+                ' policy text, resource text, duration real, api_calls integer,'
+                ' throttles integer, resources integer, success integer)')
+            cursor.execute(
+                'create index if not exists policy_runs_key on policy_runs'
+                ' (account_id, region, policy, run_id)')
+
+    def start_run(self, workers):
+        with self.conn as cursor:
+            return cursor.execute(
+                'insert into runs (started, workers) values (?, ?)',
+                (time.time(), workers)).lastrowid
+
+    def end_run(self, run_id, duration):
+        with self.conn as cursor:
+            cursor.execute(
+                'update runs set duration = ? where run_id = ?', (duration, run_id))
+
+    def record(self, run_id, account, region, policy_stats):
+        """Record the stats of a task's policies, keyed by policy name."""
+        with self.conn as cursor:
+            cursor.executemany(
+                'insert into policy_runs values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, account['account_id'], account['name'], region, name,
+                  s['resource'], s['duration'], s['api_calls'], s['throttles'],
+                  s['resources'], int(s['success']))
+                 for name, s in policy_stats.items()])
+
+    def get_runtimes(self):
+        """Get the last recorded duration of each account, region, and policy."""
+        rows = self.conn.execute(
+            'select account_id, region, policy, duration from policy_runs p'
+            ' where run_id = (select max(run_id) from policy_runs'
+            '  where account_id = p.account_id and region = p.region'
+            '  and policy = p.policy)')
+        return {(account_id, region, policy): duration
+                for account_id, region, policy, duration in rows}
+
+    def get_run(self, run_id=None):
+        """Get a run's start, duration, and workers, defaulting to the last run."""
+        if run_id is None:
+            row = self.conn.execute(
+                'select run_id, started, duration, workers from runs'
+                ' order by run_id desc limit 1').fetchone()
+        else:
+            row = self.conn.execute(
+                'select run_id, started, duration, workers from runs'
+                ' where run_id = ?', (run_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('run_id', 'started', 'duration', 'workers'), row))
+
+    def get_stats(self, group_by='task', runs=5):
+        """Get stats of the last run, grouped and compared to prior runs.
+
+        Each row has the last run's total duration, api calls, throttles,
+        and resources for the group, and the group's average duration over
+        up to `runs` prior runs.
+        """
+        fields = GROUP_FIELDS[group_by]
+        last = self.conn.execute('select max(run_id) from policy_runs').fetchone()[0]
+        if last is None:
+            return []
+        prior = [r for r, in self.conn.execute(
+            'select distinct run_id from policy_runs where run_id < ?'
+            ' order by run_id desc limit ?', (last, runs))]
+
+        columns = ', '.join(fields)
+        # a group's total duration per prior run, averaged over the runs it appears in
+        prior_durations = {}
+        if prior:
+            for row in self.conn.execute(
+                    'select %s, sum(duration) from policy_runs where run_id in (%s)'
+                    ' group by run_id, %s' % (
+                        columns, ', '.join('?' * len(prior)), columns), prior):
+                prior_durations.setdefault(row[:-1], []).append(row[-1])
+
+        results = []
+        for row in self.conn.execute(
+                'select %s, sum(duration), sum(api_calls), sum(throttles),'
+                ' sum(resources), min(success) from policy_runs'
+                ' where run_id = ? group by %s' % (columns, columns), (last,)):
+            key = row[:len(fields)]
+            durations = prior_durations.get(key)
+            stats = dict(zip(fields, key))
+            stats.update(zip(
+                ('duration', 'api_calls', 'throttles', 'resources', 'success'),
+                row[len(fields):]))
+            stats['success'] = bool(stats['success'])
+            stats['prior_duration'] = durations and sum(durations) / len(durations) or None
+            results.append(stats)
+        results.sort(key=lambda s: s['duration'], reverse=True)
+        return results
+
+    def close(self):
+        self.conn.close()
@@ -1,16 +1,24 @@
 # Copyright The Cloud Custodian Authors.
 # SPDX-License-Identifier: Apache-2.0
+import ast
 import copy
+import csv
+import json
 from unittest import mock
 import os
+import re
 
 import pytest
 import yaml
 
+from c7n.filters.related import related_index
+from c7n.policy import Policy
+from c7n.tags import tag_cache
 from c7n.testing import TestUtils
 from click.testing import CliRunner
 
 from c7n_org import cli as org
+from c7n_org import reporting
 
 
 ACCOUNTS_AWS_DEFAULT = yaml.safe_dump({
@@ -184,6 +192,196 @@ class OrgTest(TestUtils):
             log_output.getvalue().strip(),
             "Policy resource counts Counter({'compute': 96, 'serverless': 48})")
 
+    def test_cli_run_schedule_resource(self):
+        run_dir = self.setup_run_dir()
+        logger = mock.MagicMock()
+
+        def run_account(a, r, policies_config, *args, stats=None, **kw):
+            for p in policies_config['policies']:
+                stats[p['name']] = {
+                    'resource': p['resource'], 'duration': 2.5, 'api_calls': 3,
+                    'throttles': 1, 'resources': 1, 'success': True}
+            return {p['name']: 1 for p in policies_config['policies']}, True
+
+        run_account = mock.MagicMock(side_effect=run_account)
+        self.patch(org, 'logging', logger)
+        self.patch(org, 'run_account', run_account)
+        self.change_cwd(run_dir)
+        log_output = self.capture_logging('c7n_org')
+        runner = CliRunner()
+        result = runner.invoke(
+            org.cli,
+            ['run', '-c', 'accounts.yml', '-u', 'policies.yml',
+             '--debug', '-s', 'output', '--cache-path', 'cache',
+             '--schedule', 'resource'],
+            catch_exceptions=False)
+
+        self.assertEqual(result.exit_code, 0)
+        # tasks complete in any order, so tied counts do too
+        counts = re.match(
+            r"Policy resource counts Counter\((.*)\)$", log_output.getvalue().strip())
+        self.assertEqual(
+            ast.literal_eval(counts.group(1)), {'compute': 4, 'serverless': 4})
+        # a task per account, region and resource type
+        self.assertEqual(run_account.call_count, 8)
+        self.assertEqual(
+            {c.kwargs['group'] for c in run_account.call_args_list},
+            {'aws.ec2', 'aws.lambda'})
+
+        telemetry = org.Telemetry(os.path.join(run_dir, 'cache', 'telemetry.db'))
+        self.addCleanup(telemetry.close)
+        runtimes = telemetry.get_runtimes()
+        self.assertEqual(len(runtimes), 8)
+        self.assertEqual(runtimes[('112233445566', 'us-east-1', 'compute')], 2.5)
+        self.assertEqual(telemetry.get_run()['workers'], org.WORKER_COUNT)
+
+        result = runner.invoke(
+            org.cli,
+            ['stats', '--cache-path', 'cache', '--group-by', 'policy',
+             '--format', 'json', '-f', 'stats.json'],
+            catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0)
+        with open(os.path.join(run_dir, 'stats.json')) as fh:
+            stats = json.load(fh)
+        self.assertEqual(
+            stats[0],
+            {'policy': 'compute', 'duration': 10.0, 'api_calls': 12, 'throttles': 4,
+             'resources': 4, 'success': True, 'prior_duration': None, 'change': None})
+
+    def test_run_account_clears_run_caches(self):
+        # worker processes are reused across tasks, run caches are scoped
+        # to an account and region.
+        tag_cache.data[('112233445566', 'us-east-1', 'ec2')] = {}
+        related_index.data[('112233445566', 'us-east-1', 'aws.vpc')] = {}
+
+        def run(p):
+            self.assertEqual(tag_cache.data, {})
+            self.assertEqual(related_index.data, {})
+            tag_cache.data[('002244668899', 'us-east-1', 'ec2')] = {}
+            return []
+
+        self.patch(Policy, 'run', run)
+        counts, success = org.run_account(
+            {'name': 'dev', 'account_id': '002244668899'}, 'us-east-1',
+            {'policies': [{'name': 'compute', 'resource': 'aws.ec2'}]},
+            self.get_temp_dir(), 0, self.get_temp_dir(), False, False, False)
+        self.assertEqual((counts, success), ({'compute': 0}, True))
+        self.assertEqual(tag_cache.data, {})
+
+    def test_telemetry_stats(self):
+        telemetry = org.Telemetry(os.path.join(self.get_temp_dir(), 'telemetry.db'))
+        self.addCleanup(telemetry.close)
+        account = {'account_id': '112233445566', 'name': 'dev'}
+
+        def policy_stats(duration, success=True):
+            return {'resource': 'aws.ec2', 'duration': duration, 'api_calls': 10,
+                    'throttles': 0, 'resources': 2, 'success': success}
+
+        for durations in ((10, 2), (20, 4), (45, 3)):
+            run_id = telemetry.start_run(4)
+            telemetry.record(run_id, account, 'us-east-1', {
+                'compute': policy_stats(durations[0]),
+                'instances': policy_stats(durations[1], durations[1] != 3)})
+            telemetry.end_run(run_id, 60)
+
+        self.assertEqual(
+            telemetry.get_runtimes(),
+            {('112233445566', 'us-east-1', 'compute'): 45,
+             ('112233445566', 'us-east-1', 'instances'): 3})
+        self.assertEqual(telemetry.get_run()['run_id'], 3)
+
+        stats = telemetry.get_stats('task', runs=5)
+        self.assertEqual(
+            [(s['policy'], s['duration'], s['prior_duration'], s['success']) for s in stats],
+            [('compute', 45, 15, True), ('instances', 3, 3, False)])
+        stats = telemetry.get_stats('account', runs=1)
+        self.assertEqual(
+            [(s['account'], s['duration'], s['prior_duration'], s['api_calls']) for s in stats],
+            [('dev', 48, 24, 20)])
+
+    def test_order_tasks(self):
+        account = {'account_id': '112233445566', 'name': 'dev'}
+        tasks = [org.Task(account, r, 'aws.ec2', [{'name': 'compute'}, {'name': 'instances'}])
+                 for r in ('us-east-1', 'us-east-2', 'us-west-1', 'us-west-2')]
+        runtimes = {}
+        for region, durations in (
+                ('us-east-1', (10, 5)), ('us-east-2', (120, 1)),
+                ('us-west-1', (300,)), ('us-west-2', (20, 10))):
+            for p, d in zip(('compute', 'instances'), durations):
+                runtimes[('112233445566', region, p)] = d
+        self.assertEqual(
+            [t.region for t in org.order_tasks(tasks, runtimes)],
+            ['us-west-1', 'us-east-2', 'us-west-2', 'us-east-1'])
+
+    def test_get_policy_groups(self):
+        policies = yaml.safe_load(POLICIES_AWS_DEFAULT)
+        policies['policies'].append({'name': 'instances', 'resource': 'ec2'})
+        self.assertEqual(
+            list(org.get_policy_groups(policies, 'account')), [None])
+        groups = org.get_policy_groups(policies, 'resource')
+        self.assertEqual(
+            {g: [p['name'] for p in gp] for g, gp in groups.items()},
+            {'aws.ec2': ['compute', 'instances'], 'aws.lambda': ['serverless']})
+
+    def test_cli_report_stream(self):
+        run_dir = self.setup_run_dir()
+        instances = {
+            'dev': [{'InstanceId': 'i-1', 'LaunchTime': '2023-01-01T00:00:00+00:00'},
+                    {'InstanceId': 'i-2', 'LaunchTime': '2023-01-03T00:00:00+00:00'},
+                    {'InstanceId': 'i-1', 'LaunchTime': '2023-01-01T00:00:00+00:00'}],
+            'qa': [{'InstanceId': 'i-1', 'LaunchTime': '2023-01-02T00:00:00+00:00'}]}
+        for account, records in instances.items():
+            policy_dir = os.path.join(run_dir, 'output', account, 'us-east-1', 'compute')
+            os.makedirs(policy_dir)
+            with open(os.path.join(policy_dir, 'resources.json'), 'w') as fh:
+                json.dump(records, fh)
+        self.change_cwd(run_dir)
+        runner = CliRunner()
+
+        result = runner.invoke(
+            org.cli,
+            ['report', '-c', 'accounts.yml', '-u', 'policies.yml', '-p', 'compute',
+             '-r', 'us-east-1', '--debug', '-s', 'output', '--cache-path', 'cache',
+             '--format', 'jsonl', '-f', 'report.jsonl'],
+            catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0)
+        with open(os.path.join(run_dir, 'report.jsonl')) as fh:
+            records = [json.loads(line) for line in fh]
+        # deduplicated within an account and policy
+        self.assertEqual(
+            [(r['account'], r['InstanceId']) for r in records],
+            [('dev', 'i-1'), ('dev', 'i-2'), ('qa', 'i-1')])
+
+        result = runner.invoke(
+            org.cli,
+            ['report', '-c', 'accounts.yml', '-u', 'policies.yml', '-p', 'compute',
+             '-r', 'us-east-1', '--debug', '-s', 'output', '--cache-path', 'cache',
+             '-f', 'report.csv'],
+            catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0)
+        with open(os.path.join(run_dir, 'report.csv')) as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(
+            rows[0][:5], ['Account', 'Region', 'Policy', 'CustodianDate', 'InstanceId'])
+        self.assertEqual(
+            [r[:3] + r[4:5] for r in rows[1:]],
+            [['dev', 'us-east-1', 'compute', 'i-1'],
+             ['dev', 'us-east-1', 'compute', 'i-2'],
+             ['qa', 'us-east-1', 'compute', 'i-1']])
+
+    def test_record_index_bounded(self):
+        index = reporting.RecordIndex('InstanceId', size=2)
+        records = [{'account_id': '112233445566', 'region': 'us-east-1', 'policy': 'compute',
+                    'InstanceId': i} for i in ('i-1', 'i-2', 'i-1', 'i-3', 'i-1')]
+        self.assertEqual(
+            [index.add(r) for r in records], [True, True, False, True, True])
+
+    def test_record_index_missing_id(self):
+        index = reporting.RecordIndex('Tags.Name')
+        records = [{'account_id': '112233445566', 'region': 'us-east-1', 'policy': 'compute',
+                    'InstanceId': i} for i in ('i-1', 'i-2')]
+        self.assertEqual([index.add(r) for r in records], [True, True])
+
     def test_filter_policies(self):
         d = {'policies': [
             {'name': 'find-ml',
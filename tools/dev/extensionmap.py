@@ -0,0 +1,56 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Generate the aws extension map, c7n/resources/extension_map.py
+
+Modules that register filters and actions across resource types (via
+resource registry subscribers) or policy execution modes are imported
+on reference. This records the type names each of them provides,
+relative to the modules imported when the aws provider loads.
+"""
+import json
+import sys
+
+import click
+
+from c7n.actions import Action
+from c7n.policy import execution
+from c7n.resources import load_providers, load_resources
+from c7n.resources.aws import AWS
+
+
+HEADER = """\
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+# generated by tools/dev/extensionmap.py
+ExtensionMap = """
+
+
+def get_extension_map():
+    load_providers(('aws',))
+    core = set(sys.modules)
+    load_resources(('aws.*',))
+
+    emap = {'actions': {}, 'filters': {}, 'modes': {}}
+    for subscriber in AWS.resources._subscribers:
+        klass = subscriber.__self__
+        if klass.__module__ in core:
+            continue
+        kind = issubclass(klass, Action) and 'actions' or 'filters'
+        emap[kind][klass.type] = klass.__module__
+    for name, klass in execution.items():
+        if klass.__module__ not in core:
+            emap['modes'][name] = klass.__module__
+    return emap
+
+
+@click.command()
+@click.option('-o', '--output', type=click.File('w'), default='-')
+def main(output):
+    output.write(HEADER)
+    output.write(json.dumps(get_extension_map(), indent=2, sort_keys=True))
+    output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Benchmark compiled filter plans against the interpreted filter path.
+
+Generates a synthetic ec2 resource set and evaluates a policy with a
+set of value filters, once through the interpreted filters and once
+through the filter plan compiled at policy validation, optionally
+with columnar evaluation.
+"""
+import copy
+from datetime import datetime, timedelta
+import time
+
+import click
+from dateutil.tz import tzutc
+
+from c7n.config import Config
+from c7n.policy import Policy
+from c7n.resources import load_resources
+
+
+FILTERS = [
+    {'State.Name': 'running'},
+    {'tag:Owner': 'present'},
+    {'type': 'value', 'key': 'tag:Env', 'value': 'prod', 'value_type': 'normalize'},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'in',
+     'value': ['t2.micro', 'm5.large', 'c5.xlarge', 'r5.large']},
+    {'type': 'value', 'key': 'InstanceType', 'op': 'regex', 'value': '^(t2|m5|c5|r5)\\..*'},
+    {'type': 'value', 'key': 'LaunchTime', 'op': 'gt', 'value': 1, 'value_type': 'age'},
+    {'type': 'value', 'key': 'PrivateIpAddress', 'op': 'in', 'value': '10.0.0.0/8',
+     'value_type': 'cidr'},
+    {'type': 'value', 'key': 'CpuOptions.CoreCount', 'op': 'gte', 'value': 0,
+     'value_type': 'integer'},
+    {'type': 'value', 'key': 'SecurityGroups', 'op': 'gte', 'value': 1,
+     'value_type': 'size'},
+    {'type': 'value', 'key': 'Placement.Tenancy', 'value': 'default'},
+    {'type': 'value', 'key': 'Monitoring.State', 'op': 'ne', 'value': 'pending'},
+    {'type': 'value', 'key': 'ImageId', 'op': 'glob', 'value': 'ami-*'},
+    {'type': 'value', 'key': 'IamInstanceProfile', 'value': 'absent'},
+    {'or': [
+        {'type': 'value', 'key': 'VpcId', 'op': 'ne', 'value': 'vpc-0'},
+        {'type': 'value', 'key': 'SubnetId', 'value': 'subnet-1'}]},
+    {'not': [{'type': 'value', 'key': 'tag:Skip', 'value': 'present'}]},
+]
+
+
+def generate(count):
+    now = datetime.now(tz=tzutc())
+    types = ('t2.micro', 'm5.large', 'c5.xlarge', 'r5.large')
+    for idx in range(count):
+        yield {
+            'InstanceId': 'i-%012x' % idx,
+            'InstanceType': types[idx % len(types)],
+            'ImageId': 'ami-%08x' % (idx % 17),
+            'State': {'Name': 'running'},
+            'LaunchTime': (now - timedelta(days=2 + idx % 300)).isoformat(),
+            'PrivateIpAddress': '10.%d.%d.%d' % (idx % 250, idx % 200, idx % 100),
+            'CpuOptions': {'CoreCount': 1 + idx % 8},
+            'SecurityGroups': [{'GroupId': 'sg-%d' % idx}],
+            'Placement': {'Tenancy': 'default'},
+            'Monitoring': {'State': 'disabled'},
+            'VpcId': 'vpc-%d' % (idx % 3 + 1),
+            'SubnetId': 'subnet-%d' % (idx % 5),
+            'Tags': [
+                {'Key': 'Env', 'Value': ' Prod '},
+                {'Key': 'Owner', 'Value': 'team-%d' % (idx % 11)},
+                {'Key': 'Name', 'Value': 'instance-%d' % idx}],
+        }
+
+
+def timed(manager, resources):
+    t = time.time()
+    results = manager.filter_resources(resources)
+    return time.time() - t, len(results)
+
+
+@click.command()
+@click.option('-c', '--count', type=int, default=100000, help="number of resources")
+@click.option('-f', '--filters', type=int, default=len(FILTERS), help="number of filters")
+@click.option('-r', '--rounds', type=int, default=3)
+@click.option('--columnar', is_flag=True, help="evaluate compiled filters over columns")
+def main(count, filters, rounds, columnar):
+    """Compare interpreted and compiled filter evaluation."""
+    load_resources(('aws.ec2',))
+    policy = Policy(
+        {'name': 'filter-bench', 'resource': 'aws.ec2', 'filters': FILTERS[:filters]},
+        Config.empty(columnar=columnar))
+    policy.validate()
+    manager = policy.resource_manager
+    plan = manager.filter_plan
+    resources = list(generate(count))
+
+    for i in range(rounds):
+        manager.filter_plan = None
+        interpreted, matched = timed(manager, copy.deepcopy(resources))
+        manager.filter_plan = plan
+        compiled, compiled_matched = timed(manager, copy.deepcopy(resources))
+        assert matched == compiled_matched
+        click.echo(
+            "round:%d resources:%d filters:%d matched:%d "
+            "interpreted:%0.2fs compiled:%0.2fs speedup:%0.1fx" % (
+                i, count, filters, matched, interpreted, compiled,
+                interpreted / compiled))
+
+
+if __name__ == '__main__':
+    main()
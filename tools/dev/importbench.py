@@ -0,0 +1,73 @@
+# Copyright The Cloud Custodian Authors.
+# SPDX-License-Identifier: Apache-2.0
+"""
+Benchmark the imports of loading a policy file.
+
+Loads and validates a policy file in a fresh interpreter with python's
+import time tracing, as custodian run does before any api call, and
+reports the total import time, the custodian modules imported, and the
+slowest imports.
+"""
+import subprocess
+import sys
+
+import click
+
+
+SCRIPT = """
+from c7n.config import Config
+from c7n.loader import PolicyLoader
+PolicyLoader(Config.empty()).load_file({path!r})
+"""
+
+HANDLER_SCRIPT = """
+import json
+import c7n.handler
+from c7n.resources import load_resources
+from c7n.structure import StructureParser
+with open({path!r}) as fh:
+    data = json.load(fh)
+structure = StructureParser()
+load_resources(
+    structure.get_resource_types(data), structure.get_element_types(data))
+"""
+
+
+def parse_importtime(output):
+    """Get (module, self us, cumulative us) for each import."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(self_us), int(cumulative)))
+    return imports
+
+
+@click.command()
+@click.option('-p', '--policy', required=True, type=click.Path(exists=True))
+@click.option('--handler', is_flag=True, help="import as the lambda handler does")
+@click.option('--top', default=15, help="number of slowest imports to show")
+def main(policy, handler, top):
+    script = (handler and HANDLER_SCRIPT or SCRIPT).format(path=policy)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True)
+    if result.returncode:
+        raise click.ClickException(result.stderr)
+    imports = parse_importtime(result.stderr)
+
+    c7n_modules = sorted(m for m, _, _ in imports if m.split('.')[0].startswith('c7n'))
+    click.echo("total import time: %0.3fs" % (
+        sum(self_us for _, self_us, _ in imports) / 1e6))
+    click.echo("modules: %d custodian modules: %d" % (len(imports), len(c7n_modules)))
+    click.echo("slowest imports (cumulative):")
+    for module, _, cumulative in sorted(imports, key=lambda i: -i[2])[:top]:
+        click.echo("  %0.3fs %s" % (cumulative / 1e6, module))
+    click.echo("custodian modules:")
+    for module in c7n_modules:
+        click.echo("  %s" % module)
+
+
+if __name__ == '__main__':
+    main()